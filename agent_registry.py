@@ -0,0 +1,251 @@
+"""
+Bounded registry of per-session chat agents
+Keeps the most recently used agents live, evicts idle and least recently
+used ones, and rebuilds agents from state saved in a StateStore, which may
+be shared with other worker processes
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from state_store import StateStore, MemoryStateStore
+
+DEFAULT_MAX_AGENTS = 100
+DEFAULT_IDLE_TTL = 30 * 60
+# Saved states kept by the default in-memory store, per live agent allowed
+DORMANT_PER_AGENT = 10
+
+
+class AgentRegistry:
+    """LRU map of session ID to CalendarChatAgent with an idle TTL
+
+    At most max_agents agents are live. An agent unused for idle_ttl
+    seconds, or pushed out by newer sessions, is dropped along with its
+    Calendar service and Gemini model; only agent.export_state() is kept,
+    in store. The next request for that session builds a fresh agent with
+    factory and hands it the saved state, so conversation history, event
+    aliases, the event mirror and cached parses carry over.
+
+    With a store shared between processes (e.g. SQLiteStateStore), call
+    save() after each request: any worker then picks up the session warm,
+    and a worker whose live agent is behind the store reloads it first.
+
+    on_evict(session_id, agent) is called for every agent dropped, e.g. to
+    close its clients, after its state is saved.
+
+    Idle agents are only noticed on the next request unless start() runs
+    sweep() in the background, every idle_ttl / 2 seconds.
+
+    The registry lock only guards the live map: exporting, restoring and
+    store I/O happen outside it, so one session's large reload or save
+    doesn't hold up requests for the others.
+    """
+
+    def __init__(self, factory: Callable[[str], Any], max_agents: int = DEFAULT_MAX_AGENTS,
+                 idle_ttl: float = DEFAULT_IDLE_TTL, store: Optional[StateStore] = None,
+                 on_evict: Optional[Callable[[str, Any], None]] = None):
+        self.factory = factory
+        self.on_evict = on_evict
+        self.max_agents = max_agents
+        self.idle_ttl = idle_ttl
+        if store is None:
+            store = MemoryStateStore(max_sessions=max_agents * DORMANT_PER_AGENT)
+        self.store = store
+        # session_id -> (agent, last used, store version the agent matches)
+        self.live: 'OrderedDict[str, Tuple[Any, float, int]]' = OrderedDict()
+        self.stats = {'created': 0, 'rehydrated': 0, 'hits': 0, 'reloaded': 0,
+                      'evicted_lru': 0, 'evicted_idle': 0}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def get(self, session_id: str, gemini_api_key: str) -> Tuple[Optional[Any], Optional[str]]:
+        """Return (agent, None) for a session, or (None, error) if it can't be built"""
+        now = time.monotonic()
+        with self._lock:
+            dropped = self._expire(now)
+            entry = self.live.get(session_id)
+            if entry is not None:
+                self.live[session_id] = (entry[0], now, entry[2])
+                self.live.move_to_end(session_id)
+                self.stats['hits'] += 1
+        self._retire(dropped)
+        if entry is not None:
+            agent, _, version = entry
+            if self.store.version(session_id) > version:
+                # Another worker has served this session since
+                self._reload(session_id, agent)
+            return agent, None
+        parts, version = self.store.load(session_id)
+
+        # Build outside the lock; authentication can be slow
+        try:
+            agent = self.factory(gemini_api_key)
+            if parts:
+                agent.restore_state(parts)
+        except Exception as e:
+            return None, str(e)
+
+        with self._lock:
+            existing = self.live.get(session_id)
+            if existing is None:
+                self.stats['rehydrated' if parts else 'created'] += 1
+                dropped = self._insert(session_id, agent, now, version)
+        if existing is not None:
+            # Another request built it first
+            return existing[0], None
+        self._retire(dropped)
+        return agent, None
+
+    def _reload(self, session_id: str, agent: Any):
+        """Bring a live agent up to the store's state, once per version"""
+        parts, version = self.store.load(session_id)
+        with self._lock:
+            entry = self.live.get(session_id)
+            if entry is None or entry[0] is not agent or entry[2] >= version:
+                # Evicted, replaced, or reloaded by a concurrent request
+                return
+            self.live[session_id] = (agent, entry[1], version)
+            self.stats['reloaded'] += 1
+        agent.restore_state(parts)
+
+    def register(self, session_id: str, agent: Any):
+        """Add an already built agent for a session"""
+        version = self.store.version(session_id)
+        with self._lock:
+            self.live.pop(session_id, None)
+            dropped = self._insert(session_id, agent, time.monotonic(), version)
+        self._retire(dropped)
+
+    def save(self, session_id: str):
+        """Write a live agent's changed state to the store, e.g. after a request"""
+        with self._lock:
+            entry = self.live.get(session_id)
+        if entry is None:
+            return
+        agent = entry[0]
+        version = self._save(session_id, agent)
+        if version is None:
+            return
+        with self._lock:
+            entry = self.live.get(session_id)
+            if entry is not None and entry[0] is agent and entry[2] < version:
+                self.live[session_id] = (agent, entry[1], version)
+
+    def _save(self, session_id: str, agent: Any) -> Optional[int]:
+        """Export and store an agent's changed state; the new version, or None"""
+        try:
+            parts = agent.export_state(changed_only=True)
+        except AttributeError:
+            return None
+        return self.store.save(session_id, parts)
+
+    def _insert(self, session_id: str, agent: Any, now: float,
+                version: int) -> List[Tuple[str, Any]]:
+        """Add an agent and pop the least recently used past max_agents; hold the lock"""
+        self.live[session_id] = (agent, now, version)
+        dropped = []
+        while len(self.live) > self.max_agents:
+            dropped.append(self._evict(next(iter(self.live))))
+            self.stats['evicted_lru'] += 1
+        return dropped
+
+    def _expire(self, now: float) -> List[Tuple[str, Any]]:
+        """Pop agents idle for longer than the TTL (oldest first); hold the lock"""
+        dropped = []
+        while self.live:
+            session_id, (_, last_used, _) = next(iter(self.live.items()))
+            if now - last_used < self.idle_ttl:
+                break
+            dropped.append(self._evict(session_id))
+            self.stats['evicted_idle'] += 1
+        return dropped
+
+    def _evict(self, session_id: str) -> Tuple[str, Any]:
+        """Pop a live agent; hold the lock, then _retire() it without"""
+        agent, _, _ = self.live.pop(session_id)
+        return session_id, agent
+
+    def _retire(self, dropped: List[Tuple[str, Any]]):
+        """Save popped agents' state and let on_evict close them"""
+        for session_id, agent in dropped:
+            try:
+                self._save(session_id, agent)
+            except Exception as e:
+                # The agent goes anyway; its last saved state is what comes back
+                print(f"Saving session state failed: {str(e)}")
+            self._dropped(session_id, agent)
+
+    def _dropped(self, session_id: str, agent: Any):
+        if self.on_evict is not None:
+            try:
+                self.on_evict(session_id, agent)
+            except Exception as e:
+                print(f"Closing agent failed: {str(e)}")
+
+    def mark_stale(self, session_id: str):
+        """Record that a session's calendar changed, e.g. on a push notification
+
+        Bumps the session's version in the store, so whichever worker holds
+        it live reloads it on the next request and syncs its mirror first.
+        Sessions the store doesn't know are left alone; they sync when built.
+        """
+        if self.store.version(session_id):
+            self.store.save(session_id, {'calendar_changed': time.time()})
+
+    def sweep(self):
+        """Evict idle agents now instead of on the next request"""
+        with self._lock:
+            dropped = self._expire(time.monotonic())
+        self._retire(dropped)
+
+    def _run(self):
+        """Background loop that sweeps every idle_ttl / 2 seconds"""
+        while not self._stopped.wait(self.idle_ttl / 2):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Agent sweep failed: {str(e)}")
+
+    def start(self):
+        """Start the background sweep thread once, so idle agents go without traffic"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name='agent-sweep', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Stop the background sweep thread"""
+        self._stopped.set()
+
+    def clear(self):
+        """Evict every live agent, e.g. at shutdown; their state stays in the store"""
+        with self._lock:
+            dropped = [self._evict(session_id) for session_id in list(self.live)]
+        self._retire(dropped)
+
+    def remove(self, session_id: str):
+        """Forget a session entirely, e.g. on logout"""
+        with self._lock:
+            entry = self.live.pop(session_id, None)
+        self.store.delete(session_id)
+        if entry is not None:
+            self._dropped(session_id, entry[0])
+
+    def peek(self, session_id: str) -> Optional[Any]:
+        """The live agent for a session, without counting it as a use"""
+        entry = self.live.get(session_id)
+        return entry[0] if entry else None
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.live
+
+    def metrics(self) -> Dict[str, int]:
+        """Live and saved session counts plus lifetime counters"""
+        stored = len(self.store)
+        with self._lock:
+            return dict(self.stats, live=len(self.live), stored=stored)
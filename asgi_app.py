@@ -0,0 +1,323 @@
+"""
+Google Calendar Chat Agent - ASGI Web Interface
+Async version of web_app.py: the same routes and templates, served by Quart
+with handlers that await the Calendar and Gemini clients, so one process
+can hold hundreds of chats that are waiting on Gemini
+
+Run with: uvicorn asgi_app:app --port 5000
+"""
+
+import asyncio
+import os
+import secrets
+from datetime import datetime
+
+from dotenv import load_dotenv
+from quart import (
+    Quart, render_template, request, jsonify, session, redirect, url_for, Response
+)
+
+from calendar_chat import events_etag
+from watch_channels import open_watch_channels
+from web_common import (
+    EVENTS_MAX_AGE, EVENT_STREAM_HEARTBEAT, SSE_HEADERS, EventStream, StreamSlots,
+    format_events, not_modified, open_agent_registry, sse, streams_full
+)
+
+# Load environment variables
+load_dotenv()
+
+app = Quart(__name__)
+app.secret_key = os.getenv('FLASK_SECRET_KEY', secrets.token_hex(16))
+
+# The server's event loop, where agents' async clients live
+server_loop = None
+# Client closes scheduled on it by evictions, awaited at shutdown
+pending_closes = set()
+
+
+def close_agent(session_id: str, agent):
+    """Close an evicted agent's async Calendar client on the server's event loop
+    
+    Evictions happen in worker threads (see get_or_create_agent), so the
+    close is handed to the loop rather than awaited here.
+    """
+    if server_loop is None or server_loop.is_closed():
+        return
+    future = asyncio.run_coroutine_threadsafe(agent.aclose(), server_loop)
+    pending_closes.add(future)
+    future.add_done_callback(pending_closes.discard)
+
+
+# Same registry and state store settings as web_app.py
+chat_agents = open_agent_registry(on_evict=close_agent)
+
+# Open event streams only cost a task each here, so the default is higher
+event_streams = StreamSlots(int(os.getenv('MAX_EVENT_STREAMS', '1000')))
+
+
+def live_calendar(session_id: str):
+    """CalendarService of a session's live agent, None if it isn't live here"""
+    return getattr(chat_agents.peek(session_id), 'calendar', None)
+
+
+# Calendar push notifications, as in web_app.py
+watch_channels = open_watch_channels(live_calendar)
+
+
+def _get_agent(session_id: str, gemini_api_key: str):
+    agent, error = chat_agents.get(session_id, gemini_api_key)
+    if agent is not None and watch_channels:
+        watch_channels.ensure(session_id, agent.calendar)
+    return agent, error
+
+
+async def get_or_create_agent(session_id: str, gemini_api_key: str):
+    """Get existing agent or create new one for session"""
+    # Building an agent authenticates with Google, which blocks
+    return await asyncio.to_thread(_get_agent, session_id, gemini_api_key)
+
+
+async def save_agent(session_id: str):
+    """Write the session's state to the store off the event loop"""
+    await asyncio.to_thread(chat_agents.save, session_id)
+
+
+@app.before_serving
+async def startup():
+    """Note the event loop evicted agents' clients are closed on, and start sweeping"""
+    global server_loop
+    server_loop = asyncio.get_running_loop()
+    # Drop idle agents even when no requests come in
+    chat_agents.start()
+
+
+@app.after_serving
+async def shutdown():
+    """Save every live agent and close its async Calendar client"""
+    chat_agents.stop()
+    await asyncio.to_thread(chat_agents.clear)
+    await asyncio.gather(*(asyncio.wrap_future(future) for future in list(pending_closes)),
+                         return_exceptions=True)
+
+
+@app.route('/')
+async def index():
+    """Main page"""
+    has_api_key = 'gemini_api_key' in session and session['gemini_api_key']
+    return await render_template('index.html', has_api_key=has_api_key)
+
+
+@app.route('/setup', methods=['GET', 'POST'])
+async def setup():
+    """Setup page for API key configuration"""
+    if request.method == 'POST':
+        form = await request.form
+        gemini_api_key = form.get('gemini_api_key', '').strip()
+        
+        if not gemini_api_key:
+            return await render_template('setup.html',
+                                         error='Please provide a valid Gemini API key')
+        
+        session['gemini_api_key'] = gemini_api_key
+        session['session_id'] = secrets.token_hex(16)
+        
+        agent, error = await get_or_create_agent(session['session_id'], gemini_api_key)
+        if error:
+            return await render_template('setup.html', error=f'Failed to initialize: {error}')
+        
+        return redirect(url_for('chat'))
+    
+    return await render_template('setup.html')
+
+
+@app.route('/chat')
+async def chat():
+    """Chat interface"""
+    if 'gemini_api_key' not in session:
+        return redirect(url_for('setup'))
+    
+    return await render_template('chat.html')
+
+
+async def read_message():
+    """Return (agent, message, None) for a chat request, or an error response"""
+    if 'gemini_api_key' not in session or 'session_id' not in session:
+        return None, None, (jsonify({'error': 'Not authenticated'}), 401)
+    
+    data = await request.get_json()
+    user_message = (data or {}).get('message', '').strip()
+    if not user_message:
+        return None, None, (jsonify({'error': 'Empty message'}), 400)
+    
+    agent, error = await get_or_create_agent(session['session_id'], session['gemini_api_key'])
+    if error:
+        app.logger.error(f"Agent creation error: {error}")
+        return None, None, (jsonify({'error': 'Failed to initialize calendar agent'}), 500)
+    return agent, user_message, None
+
+
+@app.route('/api/message', methods=['POST'])
+async def send_message():
+    """Handle chat messages"""
+    agent, user_message, failure = await read_message()
+    if failure:
+        return failure
+    
+    try:
+        response = await agent.process_query_async(user_message)
+        await save_agent(session['session_id'])
+        return jsonify({
+            'response': response,
+            'timestamp': datetime.utcnow().isoformat()
+        })
+    except Exception as e:
+        app.logger.error(f"Error processing message: {str(e)}")
+        return jsonify({'error': 'Failed to process your message. Please try again.'}), 500
+
+
+@app.route('/api/message/stream', methods=['POST'])
+async def stream_message():
+    """Handle chat messages, streaming the reply as Server-Sent Events"""
+    agent, user_message, failure = await read_message()
+    if failure:
+        return failure
+    session_id = session['session_id']
+    
+    async def generate():
+        yield ": stream open\n\n"
+        try:
+            async for delta in agent.process_query_stream_async(user_message):
+                yield sse({'delta': delta})
+            await save_agent(session_id)
+            yield sse({'timestamp': datetime.utcnow().isoformat()}, event='done')
+        except Exception as e:
+            app.logger.error(f"Error processing message: {str(e)}")
+            yield sse({'error': 'Failed to process your message. Please try again.'},
+                      event='error')
+    
+    response = Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+    response.timeout = None
+    return response
+
+
+@app.route('/api/events')
+async def get_events():
+    """Get calendar events"""
+    if 'gemini_api_key' not in session or 'session_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    agent, error = await get_or_create_agent(session['session_id'], session['gemini_api_key'])
+    if error:
+        app.logger.error(f"Agent creation error: {error}")
+        return jsonify({'error': 'Failed to initialize calendar agent'}), 500
+    
+    try:
+        snapshot = await agent.take_snapshot_async(projection='display', max_age=EVENTS_MAX_AGE)
+        await save_agent(session['session_id'])
+        etag = events_etag(snapshot.events)
+        mirror = getattr(agent.calendar, 'mirror', None)
+        # Off the event loop, like every other mirror scan here
+        last_modified = (await asyncio.to_thread(mirror.last_modified, datetime.utcnow())
+                         if mirror else None)
+        if not_modified(request, etag, last_modified):
+            response = Response(status=304)
+        else:
+            response = jsonify({'events': format_events(snapshot.events)})
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = last_modified
+        # Let the browser keep a copy, but check with us before using it
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    except Exception as e:
+        app.logger.error(f"Error fetching events: {str(e)}")
+        return jsonify({'error': 'Failed to fetch calendar events. Please try again.'}), 500
+
+
+@app.route('/api/events/stream')
+async def stream_events():
+    """Push changes to the sidebar event list as Server-Sent Events"""
+    if 'gemini_api_key' not in session or 'session_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    agent, error = await get_or_create_agent(session['session_id'], session['gemini_api_key'])
+    if error:
+        app.logger.error(f"Agent creation error: {error}")
+        return jsonify({'error': 'Failed to initialize calendar agent'}), 500
+    session_id = session['session_id']
+    if not event_streams.acquire():
+        return streams_full()
+    
+    async def generate():
+        try:
+            async for message in stream_messages():
+                yield message
+        finally:
+            event_streams.release()
+    
+    async def stream_messages():
+        stream = EventStream(chat_agents, session_id, agent)
+        seen = agent.event_feed.version
+        try:
+            snapshot = await agent.take_snapshot_async(projection='display',
+                                                       max_age=EVENTS_MAX_AGE)
+        except Exception as e:
+            app.logger.error(f"Error fetching events: {str(e)}")
+            yield sse({'error': 'Failed to fetch calendar events.'}, event='error')
+            return
+        yield stream.first(snapshot)
+        
+        while stream.running():
+            seen = await agent.event_feed.wait_async(seen, EVENT_STREAM_HEARTBEAT)
+            if not stream.running():
+                return
+            yield stream.update(await agent.take_snapshot_async(projection='display',
+                                                                max_age=float('inf')))
+    
+    response = Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+    response.timeout = None
+    return response
+
+
+@app.route('/api/calendar/notifications', methods=['POST'])
+async def calendar_notification():
+    """Receive a Google Calendar push notification and sync the affected session"""
+    if watch_channels is None:
+        return '', 404
+    
+    # The sync goes through the blocking client, like the renewal thread's calls
+    outcome, session_id = await asyncio.to_thread(watch_channels.receive, request.headers)
+    if outcome == 'rejected':
+        return '', 403
+    if outcome == 'synced':
+        await save_agent(session_id)
+    elif outcome == 'changed':
+        await asyncio.to_thread(chat_agents.mark_stale, session_id)
+    return '', 200
+
+
+@app.route('/logout')
+async def logout():
+    """Clear session and logout"""
+    session_id = session.get('session_id')
+    if session_id:
+        if watch_channels:
+            await asyncio.to_thread(watch_channels.close, session_id,
+                                    live_calendar(session_id))
+        await asyncio.to_thread(chat_agents.remove, session_id)
+    
+    session.clear()
+    return redirect(url_for('index'))
+
+
+if __name__ == '__main__':
+    import uvicorn
+    
+    print("\n" + "="*60)
+    print("  Google Calendar Chat Agent - Web UI (ASGI)")
+    print("="*60)
+    print("\nOpen your browser and navigate to: http://localhost:5000")
+    print("\nPress Ctrl+C to stop the server\n")
+    
+    uvicorn.run(app, host='127.0.0.1', port=5000)
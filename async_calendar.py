@@ -0,0 +1,124 @@
+"""
+Async Google Calendar client
+Non-blocking counterpart of CalendarService for asyncio-based chat pipelines
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+import httplib2
+import httpx
+from google.auth.transport.requests import Request
+from googleapiclient.errors import HttpError
+
+from calendar_chat import CalendarService, HTTP_TIMEOUT, merge_events, project_event
+
+# In-flight Calendar requests allowed per user
+MAX_IN_FLIGHT = 8
+
+
+class AsyncCalendarService:
+    """Calendar reads awaited over httpx instead of blocking a thread
+
+    Requests are still built by the wrapped CalendarService's discovery
+    Resource, so URLs, parameters, field masks and response parsing match
+    the blocking client exactly; only the transport differs. The event
+    mirror and credentials are shared with that client, and syncs go
+    through it. A semaphore caps
+    in-flight requests per user, and cancelling the awaiting task aborts
+    its HTTP call.
+
+    Only the reads that build a chat turn's context live here: the
+    timezone and the event window, fanned out across calendars. Writes
+    run in the agent's command handlers, which the ASGI app calls through
+    asyncio.to_thread with the blocking client.
+    """
+
+    def __init__(self, calendar: CalendarService, max_in_flight: int = MAX_IN_FLIGHT,
+                 timeout: float = HTTP_TIMEOUT):
+        self.calendar = calendar
+        self.mirror = calendar.mirror
+        self.credentials = calendar.credentials
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_in_flight)
+        )
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def _execute(self, request) -> Any:
+        """Send a googleapiclient HttpRequest and parse its response"""
+        if not self.credentials.valid:
+            # Normally kept fresh in the background by CredentialsManager
+            await asyncio.to_thread(self.credentials.refresh, Request())
+        headers = dict(request.headers)
+        self.credentials.apply(headers)
+        body = request.body.encode('utf-8') if isinstance(request.body, str) else request.body
+
+        async with self._in_flight:
+            response = await self.client.request(
+                request.method, request.uri, content=body, headers=headers)
+
+        info = {key.lower(): value for key, value in response.headers.items()}
+        # httpx has already decoded the body
+        info.pop('content-encoding', None)
+        info['status'] = str(response.status_code)
+        # Raises HttpError for error statuses, like HttpRequest.execute()
+        return request.postproc(httplib2.Response(info), response.content)
+
+    async def sync(self, max_age: float = 0.0) -> bool:
+        """Bring the shared event mirror up to date, unless synced within max_age seconds
+
+        Runs CalendarService.sync() in a thread, so a sync started here and
+        one started by the blocking client (a request thread, a push
+        notification) are serialized by the same lock and never write the
+        mirror at once.
+        """
+        if self.mirror.fresh(max_age):
+            return True
+        return await asyncio.to_thread(self.calendar.sync, max_age)
+
+    async def timezone(self) -> str:
+        """IANA timezone used to read relative dates and times"""
+        if self.calendar._timezone is None:
+            self.calendar._timezone = os.getenv('CALENDAR_TIMEZONE')
+        if self.calendar._timezone is None:
+            try:
+                setting = await self._execute(
+                    self.calendar.service.settings().get(setting='timezone'))
+                self.calendar._timezone = setting.get('value') or 'UTC'
+            except HttpError as error:
+                print(f"An error occurred: {error}")
+                return 'UTC'
+        return self.calendar._timezone
+
+    async def list_events(self, max_results: int = 10, time_min: Optional[datetime] = None,
+                          time_max: Optional[datetime] = None,
+                          projection: str = 'full',
+                          max_age: float = 0.0) -> List[Dict[str, Any]]:
+        """List calendar events, served from the local mirror when possible"""
+        if time_min is None:
+            time_min = datetime.utcnow()
+
+        if (projection != 'full' and await self.sync(max_age)
+                and self.mirror.covers(time_min)):
+            events = self.mirror.window(time_min, time_max, max_results)
+            return [project_event(event, projection) for event in events]
+
+        async def fetch(calendar_id: str) -> List[Dict[str, Any]]:
+            try:
+                result = await self._execute(self.calendar._window_request(
+                    max_results, time_min, time_max, projection, calendar_id))
+                return result.get('items', [])
+            except HttpError as error:
+                print(f"An error occurred: {error}")
+                return []
+
+        streams = await asyncio.gather(*(fetch(calendar_id)
+                                         for calendar_id in self.calendar.calendar_ids()))
+        return merge_events(list(streams), max_results)
+
+    async def aclose(self):
+        """Close the underlying HTTP client"""
+        await self.client.aclose()
@@ -0,0 +1,209 @@
+"""
+Concurrent chat load test: Flask (web_app) vs. ASGI (asgi_app)
+Serves each app from one process over real HTTP, with stubbed Calendar and
+Gemini clients where Gemini takes a fixed time to answer, and sends
+messages from an increasing number of simultaneous chats. Flask runs on a
+fixed thread pool like a gunicorn gthread worker; the ASGI app runs on
+uvicorn's single event loop.
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+import asgi_app
+import web_app
+from calendar_chat import CalendarChatAgent
+
+# Seconds Gemini takes per answer, scaled by argv[1]
+MODEL_LATENCY = 1.0
+FLASK_THREADS = 32
+MESSAGES_PER_CHAT = 2
+
+
+class StubCalendar:
+    """CalendarService stand-in with an empty calendar"""
+
+    def timezone(self):
+        return 'UTC'
+
+    def list_events(self, **kwargs):
+        return []
+
+
+class StubAsyncCalendar:
+    """AsyncCalendarService stand-in with an empty calendar"""
+
+    async def timezone(self):
+        return 'UTC'
+
+    async def list_events(self, **kwargs):
+        return []
+
+
+class StubGemini:
+    """GeminiAgent stand-in that waits like the model, blocking or not"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def parse_calendar_command(self, user_input, calendar_context):
+        return {'action': 'unknown'}
+
+    async def parse_calendar_command_async(self, user_input, calendar_context):
+        return {'action': 'unknown'}
+
+    def generate_response(self, prompt, context=""):
+        time.sleep(self.latency)
+        return "Your week looks light."
+
+    async def generate_response_async(self, prompt, context=""):
+        await asyncio.sleep(self.latency)
+        return "Your week looks light."
+
+
+def make_agent(latency: float) -> CalendarChatAgent:
+    agent = CalendarChatAgent(None, calendar=StubCalendar(), ai=StubGemini(latency),
+                              pipelined=False)
+    agent._async_calendar = StubAsyncCalendar()
+    return agent
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args):
+        pass
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server handing requests to a fixed pool, like gunicorn --threads"""
+
+    # Listen backlog, so waiting chats queue instead of being refused
+    request_queue_size = 2048
+
+    def __init__(self, host, port, app, threads):
+        super().__init__(host, port, app, handler=QuietHandler)
+        self.pool = ThreadPoolExecutor(threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def start_flask(port: int):
+    server = PooledWSGIServer('127.0.0.1', port, web_app.app, FLASK_THREADS)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.shutdown
+
+
+def start_asgi(port: int):
+    config = uvicorn.Config(asgi_app.app, host='127.0.0.1', port=port, log_level='error',
+                            backlog=2048, timeout_keep_alive=600)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+    return stop
+
+
+def session_cookie(app, session_id: str) -> str:
+    """Signed session cookie for a chat, as /setup would have issued"""
+    serializer = app.session_interface.get_signing_serializer(app)
+    return serializer.dumps({'gemini_api_key': 'benchmark', 'session_id': session_id})
+
+
+async def post_message(port: int, cookie: str, message: str) -> int:
+    """POST one chat message over a fresh connection and return the status
+
+    Plain asyncio streams rather than an HTTP client library, so the client
+    costs little CPU next to the server under test.
+    """
+    body = json.dumps({'message': message}).encode('utf-8')
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write((f"POST /api/message HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n"
+                  f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                  f"Cookie: {cookie}\r\nConnection: close\r\n\r\n").encode('ascii') + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b' ', 2)[1]) if response else 0
+
+
+async def run_chats(module, port: int, chats: int, latency: float) -> dict:
+    """Send MESSAGES_PER_CHAT messages from each of chats concurrent chats"""
+    cookie_name = module.app.config.get('SESSION_COOKIE_NAME', 'session')
+    latencies, errors = [], 0
+
+    async def chat(index: int):
+        nonlocal errors
+        session_id = f"{module.__name__}-{chats}-{index}"
+        module.chat_agents.register(session_id, make_agent(latency))
+        cookie = f"{cookie_name}={session_cookie(module.app, session_id)}"
+        for _ in range(MESSAGES_PER_CHAT):
+            start = time.perf_counter()
+            status = await post_message(port, cookie, 'how does my week look?')
+            latencies.append(time.perf_counter() - start)
+            errors += status != 200
+
+    start = time.perf_counter()
+    await asyncio.gather(*(chat(index) for index in range(chats)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {'throughput': len(latencies) / elapsed,
+            'p50': statistics.median(latencies),
+            'p95': latencies[int(len(latencies) * 0.95) - 1],
+            'errors': errors}
+
+
+def main():
+    """Run the load test"""
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    levels = [int(arg) for arg in sys.argv[2:]] or [16, 64, 256, 512]
+    latency = MODEL_LATENCY * scale
+    for module in (web_app, asgi_app):
+        module.chat_agents.max_agents = max(levels) + 10
+
+    print("="*60)
+    print(f"Concurrent chats, one process, Gemini answers in {latency:.2f}s")
+    print(f"Flask: {FLASK_THREADS} threads; ASGI: one uvicorn event loop")
+    print("="*60 + "\n")
+    print(f"{'server':<8}{'chats':>7}{'msg/s':>9}{'p50 s':>9}{'p95 s':>9}{'errors':>8}")
+
+    for label, module, start_server, port in [("flask", web_app, start_flask, 5091),
+                                              ("asgi", asgi_app, start_asgi, 5092)]:
+        stop = start_server(port)
+        try:
+            for chats in levels:
+                result = asyncio.run(run_chats(module, port, chats, latency))
+                print(f"{label:<8}{chats:>7}{result['throughput']:>9.1f}{result['p50']:>9.2f}"
+                      f"{result['p95']:>9.2f}{result['errors']:>8}")
+        finally:
+            stop()
+    print(f"\nIdeal: every message answered in {latency:.2f}s, "
+          f"throughput = chats / {latency:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
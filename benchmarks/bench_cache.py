@@ -0,0 +1,114 @@
+"""
+Gemini response cache benchmark
+Replays a stream of paraphrased questions from several users against a
+stubbed Gemini model, with occasional calendar writes, and reports model
+calls, hit rates and wrong answers with no cache, the exact tier, and the
+exact plus similarity tiers.
+"""
+
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calendar_chat import GeminiAgent
+from response_cache import ResponseCache
+
+MODEL_LATENCY = 0.4
+
+# Each group is one question phrased several ways; answers must stay in-group
+QUESTIONS = [
+    ["what's on today", "What's on today?", "what do I have today?", "anything on today?",
+     "what's on my calendar today"],
+    ["what's on tomorrow", "what do I have tomorrow?", "anything planned tomorrow?",
+     "What's on tomorrow"],
+    ["am I busy this afternoon?", "am i busy in the afternoon", "Am I busy this afternoon"],
+    ["when is my next meeting?", "when's my next meeting", "When is my next meeting"],
+    ["how many meetings do I have on friday?", "how many meetings on friday",
+     "How many meetings do I have on Friday"],
+    ["what's on monday", "what do I have on monday?", "anything on monday?"],
+]
+
+
+class StubModel:
+    """Gemini model stand-in that answers with the question's group"""
+
+    def __init__(self, scale: float):
+        self.scale = scale
+        self.calls = 0
+        self.groups = {q: i for i, group in enumerate(QUESTIONS) for q in group}
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        time.sleep(MODEL_LATENCY * self.scale)
+        question = prompt.rsplit('\n\n', 1)[-1]
+        return type('Response', (), {'text': f"answer-{self.groups[question]}"})()
+
+
+def replay(cache_options: dict, scale: float, messages: int, users: int,
+           write_rate: float) -> dict:
+    """Send the message stream and count model calls and wrong answers"""
+    rng = random.Random(7)
+    agents = []
+    for _ in range(users):
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent = GeminiAgent('offline-benchmark', cache=ResponseCache(**cache_options))
+        agent.model = StubModel(scale)
+        agents.append(agent)
+
+    wrong = 0
+    started = time.perf_counter()
+    for _ in range(messages):
+        agent = rng.choice(agents)
+        group = rng.randrange(len(QUESTIONS))
+        question = rng.choice(QUESTIONS[group])
+        if rng.random() < write_rate:
+            # A calendar write in CalendarChatAgent clears this user's cache
+            agent.cache.invalidate()
+        context = "You are a calendar assistant. Here's the current calendar:\n..."
+        if agent.generate_response(question, context=context) != f"answer-{group}":
+            wrong += 1
+    elapsed = time.perf_counter() - started
+
+    stats = [agent.cache.snapshot_stats() for agent in agents]
+    lookups = sum(s['exact_hits'] + s['similar_hits'] + s['misses'] for s in stats)
+    return {
+        'calls': sum(agent.model.calls for agent in agents),
+        'exact': sum(s['exact_hits'] for s in stats) / lookups,
+        'similar': sum(s['similar_hits'] for s in stats) / lookups,
+        'wrong': wrong,
+        'ms_per_message': elapsed * 1000 / messages,
+    }
+
+
+def main():
+    """Run the cache benchmark"""
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 0.01
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    print("="*60)
+    print(f"Response cache ({messages} messages from 20 users, 5% followed by a write)")
+    print("="*60 + "\n")
+
+    configs = [
+        ("no cache", {'ttl': 0}),
+        ("exact", {}),
+        ("exact+similar", {'similarity_threshold': 0.9}),
+    ]
+    failed = False
+    for label, options in configs:
+        result = replay(options, scale, messages, users=20, write_rate=0.05)
+        print(f"{label:<14} Gemini calls {result['calls']:5d}   "
+              f"exact hits {result['exact']:5.1%}   similar hits {result['similar']:5.1%}   "
+              f"wrong {result['wrong']}   {result['ms_per_message']:.2f} ms/msg")
+        failed = failed or result['wrong'] > 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Prompt size benchmark for calendar context
+Builds the intent-extraction prompt for windows of synthetic events with
+the original ISO/ID listing and with the compact, budgeted encoding, and
+reports locally counted tokens per message.
+"""
+
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calendar_chat import COMMAND_INSTRUCTIONS, CONTEXT_TOKEN_BUDGET
+from context_builder import ContextBuilder, EventAliases, count_tokens
+from datetime_resolver import load_timezone
+
+TITLES = ["Standup", "Lunch with Sam", "1:1 with manager", "Design review",
+          "Dentist appointment", "Quarterly planning sync", "Gym", "Team offsite"]
+MESSAGE = "move the design review to friday afternoon"
+
+
+def make_events(count: int, now: datetime) -> list:
+    """Events spread over the next two weeks, like a busy calendar"""
+    rng = random.Random(count)
+    events = []
+    for i in range(count):
+        start = now + timedelta(hours=rng.randrange(1, 14 * 24))
+        start = start.replace(minute=rng.choice([0, 15, 30, 45]), second=0, microsecond=0)
+        end = start + timedelta(minutes=rng.choice([15, 30, 60, 90]))
+        events.append({
+            'id': ''.join(rng.choice('abcdefghijklmnopqrstuv0123456789') for _ in range(26)),
+            'summary': rng.choice(TITLES),
+            'start': {'dateTime': start.isoformat()},
+            'end': {'dateTime': end.isoformat()},
+        })
+    return sorted(events, key=lambda event: event['start']['dateTime'])
+
+
+def legacy_context(events: list) -> str:
+    """The original 'Upcoming events' listing with ISO times and ID prefixes"""
+    lines = [f"- {e['start']['dateTime']}: {e['summary']} (ID: {e['id'][:8]}...)"
+             for e in events]
+    return "Upcoming events:\n" + "\n".join(lines)
+
+
+def prompt(context: str) -> str:
+    """The intent-extraction prompt as sent to Gemini"""
+    return (f"{COMMAND_INSTRUCTIONS}{context}\n\nUser request: {MESSAGE}\n\n"
+            "Provide your analysis as JSON only, no additional text.")
+
+
+def main():
+    """Run the context size benchmark"""
+    tz = load_timezone('America/New_York')
+    now = datetime(2026, 10, 15, 16, 0, tzinfo=tz)
+
+    print("="*60)
+    print(f"Calendar context tokens per message (budget {CONTEXT_TOKEN_BUDGET})")
+    print("="*60 + "\n")
+    print(f"{'events':>6}  {'legacy ctx':>10}  {'compact ctx':>11}  "
+          f"{'legacy prompt':>13}  {'compact prompt':>14}  saved")
+
+    for count in (5, 10, 25, 50, 100):
+        events = make_events(count, now.astimezone(timezone.utc))
+        builder = ContextBuilder(EventAliases(), CONTEXT_TOKEN_BUDGET)
+        legacy = legacy_context(events)
+        compact = builder.build(events, tz, now)
+        legacy_prompt, compact_prompt = count_tokens(prompt(legacy)), count_tokens(prompt(compact))
+        print(f"{count:>6}  {count_tokens(legacy):>10}  {count_tokens(compact):>11}  "
+              f"{legacy_prompt:>13}  {compact_prompt:>14}  "
+              f"{1 - compact_prompt / legacy_prompt:5.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
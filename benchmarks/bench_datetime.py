@@ -0,0 +1,142 @@
+"""
+Datetime resolver benchmark
+Resolves thousands of generated date/time phrasings against a fixed clock,
+checks them against expected datetimes, and reports resolution throughput
+with and without the per-request phrase cache.
+"""
+
+import itertools
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime_resolver import DateTimeResolver, load_timezone
+
+TIMEZONE = 'America/New_York'
+# Thursday afternoon, so "thursday" and "next thursday" differ from "today"
+NOW = datetime(2026, 10, 15, 16, 0, tzinfo=load_timezone(TIMEZONE))
+
+# (phrase, expected date relative to NOW)
+DATES = [
+    ('today', 0), ('tomorrow', 1), ('tmrw', 1), ('day after tomorrow', 2),
+    ('in 3 days', 3), ('friday', 1), ('fri', 1), ('this sat', 2), ('next tue', 5),
+    ('next monday', 4), ('sunday', 3), ('Oct 20', 5), ('october 31st', 16),
+    ('20th of October', 5), ('10/22', 7), ('2026-11-02', 18), ('the 25th', 10),
+]
+# (phrase, expected start (hour, minute), expected length in minutes)
+TIMES = [
+    ('3pm', (15, 0), 60), ('3:30 pm', (15, 30), 60), ('9am', (9, 0), 60),
+    ('noon', (12, 0), 60), ('17:45', (17, 45), 60), ('3-4:30pm', (15, 0), 90),
+    ('11-1pm', (11, 0), 120), ('9:15 to 10am', (9, 15), 45), ('at 5', (17, 0), 60),
+    ('in the morning', (9, 0), 60), ('evening', (18, 0), 60),
+]
+DURATIONS = [('', None), (' for 30 minutes', 30), (' for 2 hours', 120), (' for an hour', 60)]
+# Gemini's separate start_time/end_time: (start time, end time, expected minutes).
+# A date-less end falls on the start's day, or the next one if it would come first.
+END_TIMES = [('3pm', '4:30pm', 90), ('9am', 'noon', 180), ('11pm', '1am', 120),
+             ('10:15am', '11am', 45), ('2pm', '2026-10-30T09:00:00', None)]
+# duration_minutes as the JSON reply may carry it: (value, expected minutes)
+DURATION_VALUES = [(90, 90), ('90', 90), ('45', 45), ('soon', 60), (None, 60)]
+TEMPLATES = ['{date} {time}{duration}', '{date} at {time}{duration}',
+             'at {time} {date}{duration}', 'lunch {date} {time}{duration}']
+
+
+def generate_cases() -> list:
+    """Every combination of date, time, duration and word order, with answers"""
+    cases = []
+    for (date_phrase, days), (time_phrase, (hour, minute), length), (suffix, duration), \
+            template in itertools.product(DATES, TIMES, DURATIONS, TEMPLATES):
+        if template.startswith('at') and time_phrase.startswith(('at', 'in')):
+            continue
+        text = template.format(date=date_phrase, time=time_phrase, duration=suffix)
+        start = expected_start(days, hour, minute, date_phrase)
+        # An explicit range wins over a stated duration
+        is_range = length != 60 or '-' in time_phrase or ' to ' in time_phrase
+        minutes = length if is_range or duration is None else duration
+        cases.append((text, start, start + timedelta(minutes=minutes)))
+    return cases
+
+
+def expected_start(days: int, hour: int, minute: int, date_phrase: str) -> datetime:
+    """Start NOW plus days at hour:minute, a week later for a weekday already past"""
+    start = datetime.combine(NOW.date() + timedelta(days=days),
+                             datetime.min.time(), NOW.tzinfo).replace(hour=hour, minute=minute)
+    if start <= NOW and date_phrase in ('friday', 'fri', 'sunday'):
+        start += timedelta(weeks=1)
+    return start
+
+
+def generate_intent_cases() -> list:
+    """start_time/end_time pairs and duration values as Gemini returns them"""
+    resolver = DateTimeResolver(TIMEZONE, now=NOW)
+    cases = []
+    for (date_phrase, days), (start_phrase, end_phrase, minutes) in itertools.product(
+            DATES, END_TIMES):
+        clock = resolver.resolve_time(start_phrase)[0]
+        start = expected_start(days, clock.hour, clock.minute, date_phrase)
+        end = (start + timedelta(minutes=minutes) if minutes
+               else resolver.parse_iso(end_phrase))
+        if end <= start:
+            # An absolute end before the start is ignored for the default length
+            end = start + timedelta(hours=1)
+        cases.append(({'start_time': f"{date_phrase} {start_phrase}",
+                       'end_time': end_phrase}, start, end))
+    for (date_phrase, days), (value, minutes) in itertools.product(DATES, DURATION_VALUES):
+        start = expected_start(days, 12, 0, date_phrase)
+        cases.append(({'start_time': f"{date_phrase} at noon", 'duration_minutes': value},
+                      start, start + timedelta(minutes=minutes)))
+    return cases
+
+
+def main():
+    """Run the datetime benchmark"""
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    cases = generate_cases()
+
+    print("="*60)
+    print(f"Datetime resolver benchmark ({len(cases)} phrasings, now {NOW:%a %Y-%m-%d %H:%M %Z})")
+    print("="*60 + "\n")
+
+    resolver = DateTimeResolver(TIMEZONE, now=NOW)
+    wrong = []
+    for text, start, end in cases:
+        resolved = resolver.resolve_phrase(text)
+        if resolved != (start, end):
+            wrong.append((text, resolved, (start, end)))
+    intent_cases = generate_intent_cases()
+    for intent, start, end in intent_cases:
+        resolved = resolver.resolve_intent(intent)
+        if resolved != (start, end):
+            wrong.append((intent, resolved, (start, end)))
+
+    # Cold: a fresh resolver per phrase, as if every message were new
+    began = time.perf_counter()
+    for _ in range(rounds):
+        for text, _, _ in cases:
+            DateTimeResolver(TIMEZONE, now=NOW).resolve_phrase(text)
+    cold = (time.perf_counter() - began) * 1e6 / (rounds * len(cases))
+
+    # Warm: one resolver reused, so date and time phrases hit its cache
+    began = time.perf_counter()
+    for _ in range(rounds):
+        for text, _, _ in cases:
+            resolver.resolve_phrase(text)
+    warm = (time.perf_counter() - began) * 1e6 / (rounds * len(cases))
+
+    total = len(cases) + len(intent_cases)
+    correct = total - len(wrong)
+    print(f"Correct:            {correct}/{total} ({correct / total:.1%}), "
+          f"{len(intent_cases)} of them start/end pairs and durations")
+    print(f"Fresh resolver:     {cold:.1f} µs per phrase ({1e6 / cold:,.0f}/s)")
+    print(f"Reused resolver:    {warm:.1f} µs per phrase ({1e6 / warm:,.0f}/s)")
+    for text, got, expected in wrong[:20]:
+        print(f"  ❌ {text!r} -> {got} (expected {expected})")
+    return 0 if not wrong else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Sidebar update benchmark: reload after every message vs. pushed deltas
+Counts the HTTP requests and bytes a chat page causes with the old
+reload-one-second-after-each-reply behaviour and with /api/events/stream,
+and measures how long a calendar change takes to reach an open page.
+"""
+
+import os
+import queue
+import random
+import statistics
+import sys
+import threading
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import web_app
+from bench_events_etag import FakeCalendar, StubGemini
+from calendar_chat import CalendarChatAgent
+
+
+def open_session(session_id: str):
+    """Agent with a fake calendar plus a logged-in test client"""
+    calendar = FakeCalendar(random.Random(9))
+    agent = CalendarChatAgent(None, calendar=calendar, ai=StubGemini(), pipelined=False)
+    web_app.chat_agents.register(session_id, agent)
+    client = web_app.app.test_client()
+    with client.session_transaction() as session:
+        session['gemini_api_key'] = 'benchmark'
+        session['session_id'] = session_id
+    return calendar, client
+
+
+def reload_traffic(messages: int) -> dict:
+    """Old page: every reply is followed by a full /api/events reload"""
+    calendar, client = open_session('reload')
+    web_app.EVENTS_MAX_AGE = 0.0
+    requests, sent = 1, len(client.get('/api/events').data)
+    for _ in range(messages):
+        client.post('/api/message', json={'message': 'how is my week?'})
+        sent += len(client.get('/api/events').data)
+        requests += 2
+    return {'requests': requests, 'bytes': sent}
+
+
+def push_traffic(messages: int, changes: int) -> dict:
+    """New page: one event stream; only real changes send data"""
+    calendar, client = open_session('push')
+    web_app.EVENTS_MAX_AGE = 5.0
+    response = client.get('/api/events/stream', buffered=False)
+    frames = queue.Queue()
+
+    def read():
+        for chunk in response.response:
+            frames.put(chunk)
+    threading.Thread(target=read, daemon=True).start()
+
+    sent = len(frames.get())
+    change_every = max(1, messages // max(changes, 1))
+    latencies = []
+    for index in range(messages):
+        client.post('/api/message', json={'message': 'how is my week?'})
+        if index % change_every == 0:
+            # A write lands in the mirror, as create_event() does after the API call
+            event = dict(calendar.events[f"event{index % 10}"])
+            event['summary'] = f"Moved {index}"
+            event['etag'] = f'"w{index}"'
+            started = time.perf_counter()
+            calendar.mirror.upsert(event)
+            while True:
+                chunk = frames.get()
+                sent += len(chunk)
+                if chunk.startswith(b'event: delta'):
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    break
+    return {'requests': messages + 1, 'bytes': sent, 'latencies': latencies}
+
+
+def main():
+    """Run the sidebar update benchmark"""
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    changes = messages // 5
+    web_app.EVENT_STREAM_HEARTBEAT = 60.0
+
+    print("="*60)
+    print(f"Sidebar updates over {messages} messages, {changes} of them changing an event")
+    print("="*60 + "\n")
+
+    reload = reload_traffic(messages)
+    push = push_traffic(messages, changes)
+    print(f"{'page':<28}{'requests':>9}{'KB sent':>9}")
+    print(f"{'reload 1 s after each reply':<28}{reload['requests']:>9}"
+          f"{reload['bytes'] / 1024:>9.1f}")
+    print(f"{'pushed deltas':<28}{push['requests']:>9}{push['bytes'] / 1024:>9.1f}")
+    latencies = push['latencies']
+    print(f"\nChange to page: median {statistics.median(latencies):.2f} ms, "
+          f"max {max(latencies):.2f} ms (reload: 1000 ms after the reply)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Sidebar refresh benchmark for /api/events
+Replays the requests chat.js makes (page load, a reload one second after
+each message, manual refreshes) while the calendar occasionally changes
+elsewhere, and counts Calendar API calls, full responses, 304s and bytes
+sent, without and with ETag revalidation and the sync max age.
+"""
+
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calendar_chat
+import web_app
+from calendar_chat import CalendarChatAgent, CalendarService, EventMirror
+
+EVENTS = 40
+
+
+class Clock:
+    """Simulated monotonic time, so half an hour of browsing runs in seconds"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeCalendar(CalendarService):
+    """CalendarService whose sync queries are answered locally and counted"""
+
+    def __init__(self, rng: random.Random):
+        self.mirror = EventMirror()
+        self._sync_lock = calendar_chat.threading.Lock()
+        self._timezone = 'UTC'
+        self.rng = rng
+        self.api_calls = 0
+        self.revision = 0
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        self.events = {}
+        for index in range(EVENTS):
+            begin = start + timedelta(hours=5 * index + 2)
+            self.events[f"event{index}"] = {
+                'id': f"event{index}", 'etag': '"0"', 'summary': f"Meeting {index}",
+                'start': {'dateTime': begin.isoformat()},
+                'end': {'dateTime': (begin + timedelta(hours=1)).isoformat()}}
+        self.pending = []
+
+    def change_elsewhere(self):
+        """Rename an event, as another device would"""
+        self.revision += 1
+        event = dict(self.events[f"event{self.rng.randrange(EVENTS)}"])
+        event['summary'] = f"Renamed {self.revision}"
+        event['etag'] = f'"{self.revision}"'
+        self.events[event['id']] = event
+        self.pending.append(event)
+
+    def _fetch_pages(self, **params):
+        self.api_calls += 1
+        if 'syncToken' in params:
+            items, self.pending = self.pending, []
+        else:
+            items, self.pending = list(self.events.values()), []
+        return {'items': items, 'nextSyncToken': f"token{self.api_calls}"}
+
+
+class StubGemini:
+    def parse_calendar_command(self, user_input, calendar_context):
+        return {'action': 'unknown'}
+
+    def generate_response(self, prompt, context=""):
+        return "ok"
+
+
+def browse(conditional: bool, minutes: int) -> dict:
+    """One user's half hour of chatting, returning request and API counts"""
+    rng = random.Random(3)
+    clock = Clock()
+    calendar_chat.time.monotonic = clock
+    web_app.EVENTS_MAX_AGE = 5.0 if conditional else 0.0
+
+    calendar = FakeCalendar(rng)
+    agent = CalendarChatAgent(None, calendar=calendar, ai=StubGemini(), pipelined=False)
+    web_app.chat_agents.register('bench', agent)
+    client = web_app.app.test_client()
+    with client.session_transaction() as session:
+        session['gemini_api_key'] = 'benchmark'
+        session['session_id'] = 'bench'
+
+    # (time, what) for each message and every sidebar load chat.js would make
+    loads = [(0.0, 'page')]
+    t = 0.0
+    while t < minutes * 60:
+        t += rng.uniform(20, 70)
+        loads.append((t, 'message'))
+        loads.append((t + 1.0, 'after message'))
+        if rng.random() < 0.3:
+            loads.append((t + rng.uniform(5, 15), 'refresh'))
+    changes = sorted(rng.uniform(0, minutes * 60) for _ in range(minutes // 5))
+
+    counts = {'requests': 0, 'full': 0, 'not_modified': 0, 'bytes': 0, 'stale': 0}
+    etag, shown = None, None
+    messages = sum(what == 'message' for _, what in loads)
+    for at, what in sorted(loads):
+        while changes and changes[0] <= at:
+            calendar.change_elsewhere()
+            changes.pop(0)
+        clock.now = at
+        if what == 'message':
+            client.post('/api/message', json={'message': 'how is my week?'})
+            continue
+        headers = {'If-None-Match': etag} if conditional and etag else {}
+        response = client.get('/api/events', headers=headers)
+        counts['requests'] += 1
+        counts['bytes'] += len(response.data)
+        if response.status_code == 304:
+            counts['not_modified'] += 1
+        else:
+            counts['full'] += 1
+            etag, shown = response.headers.get('ETag'), response.get_json()['events']
+        truth = sorted(event['summary'] for event in calendar.events.values()
+                       if event['id'] in {e['id'] for e in shown})
+        counts['stale'] += truth != sorted(e['summary'] for e in shown)
+    # Syncs made for /api/events itself, not for the chat messages
+    counts['api_calls'] = calendar.api_calls - messages
+    return counts
+
+
+def main():
+    """Run the sidebar refresh benchmark"""
+    minutes = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+
+    print("="*60)
+    print(f"/api/events over {minutes} minutes of chatting ({EVENTS} events)")
+    print("="*60 + "\n")
+    print(f"{'mode':<26}{'requests':>9}{'200':>6}{'304':>6}{'KB sent':>9}"
+          f"{'API calls':>11}{'stale':>7}")
+    for label, conditional in [("always refetch", False),
+                               ("ETag + 5 s sync max age", True)]:
+        counts = browse(conditional, minutes)
+        print(f"{label:<26}{counts['requests']:>9}{counts['full']:>6}"
+              f"{counts['not_modified']:>6}{counts['bytes'] / 1024:>9.1f}"
+              f"{counts['api_calls']:>11}{counts['stale']:>7}")
+    print("\nstale: responses whose titles lag the calendar (changes under 5 s old)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Command parsing benchmark: JSON scraping vs. function calling
+Drives GeminiAgent.parse_calendar_command with a stubbed model that
+misformats a given share of its replies, and reports how often each mode
+needs another round trip (a re-ask or a clarification turn) and how many
+characters the model had to generate.
+
+The error rate is an input, not a measurement of Gemini; the benchmark
+shows how each mode turns the same bad replies into extra turns.
+"""
+
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.generativeai import protos
+
+from calendar_chat import GeminiAgent
+from response_cache import ResponseCache
+
+INTENTS = [
+    ('create_events', {'events': [{'summary': 'Lunch with Sam', 'start_time': 'tomorrow at noon'}]}),
+    ('create_events', {'events': [{'summary': 'Standup', 'start_time': 'mon 9:30am',
+                                   'duration_minutes': 15}]}),
+    ('delete_events', {'event_ids': ['a1b2c3d4']}),
+    ('update_event', {'event_id': 'e5f6a7b8', 'start_time': 'friday 4pm'}),
+    ('list_events', {'date': 'tomorrow'}),
+    ('no_calendar_action', {}),
+]
+
+# Typical JSON-in-prose reply for the same intents
+PROSE = "Sure! Here is the analysis of your request:\n```json\n{}\n```\nLet me know if you need anything else."
+
+
+def json_reply(name: str, args: dict) -> dict:
+    """The intent as the JSON prompt asks for it"""
+    if name == 'create_events':
+        return dict(args['events'][0], action='create', confidence='high')
+    if name == 'delete_events':
+        return {'action': 'delete', 'event_ids': args['event_ids'], 'confidence': 'high'}
+    if name == 'update_event':
+        return {'action': 'update', 'event_ids': [args['event_id']],
+                'start_time': args['start_time'], 'confidence': 'high'}
+    if name == 'list_events':
+        return {'action': 'list', 'confidence': 'high'}
+    return {'action': 'unknown', 'confidence': 'high'}
+
+
+class StubModel:
+    """Gemini model stand-in that garbles a share of its replies"""
+
+    def __init__(self, error_rate: float, seed: int):
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.intent = None
+        self.calls = 0
+        self.output_chars = 0
+
+    def generate_content(self, prompt, tools=None, tool_config=None):
+        self.calls += 1
+        name, args = self.intent
+        broken = self.rng.random() < self.error_rate
+        if tools:
+            if broken:
+                # Typical function-calling slip: a required argument left out
+                args = {}
+            self.output_chars += len(name) + len(json.dumps(args))
+            call = protos.FunctionCall(name=name, args=args)
+            return protos.GenerateContentResponse(candidates=[protos.Candidate(
+                content=protos.Content(parts=[protos.Part(function_call=call)]))])
+
+        text = PROSE.format(json.dumps(json_reply(name, args), indent=4))
+        if broken:
+            # Typical JSON slips: truncated output or a trailing comma
+            text = (text[:len(text) // 2] if self.rng.random() < 0.5
+                    else text.replace('"confidence"', '"confidence": "high",\n    "x"', 1)
+                             .replace('"high"\n}', '"high",\n}', 1))
+        self.output_chars += len(text)
+        return type('Response', (), {'text': text})()
+
+
+def run(function_calling: bool, error_rate: float, messages: int) -> dict:
+    """Parse a stream of commands and collect the agent's parse stats"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = GeminiAgent('offline-benchmark', cache=ResponseCache(ttl=0),
+                            function_calling=function_calling)
+    agent.model = StubModel(error_rate, seed=3)
+    rng = random.Random(5)
+    for i in range(messages):
+        agent.model.intent = rng.choice(INTENTS)
+        agent.parse_calendar_command(f"message {i}", "")
+    stats = dict(agent.parse_stats)
+    stats['retry_rate'] = agent.retry_rate
+    stats['model_calls'] = agent.model.calls
+    stats['chars'] = agent.model.output_chars / messages
+    return stats
+
+
+def main():
+    """Run the command parsing benchmark"""
+    error_rate = float(sys.argv[1]) if len(sys.argv) > 1 else 0.08
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    print("="*60)
+    print(f"Command parsing ({messages} commands, {error_rate:.0%} of replies misformatted)")
+    print("="*60 + "\n")
+
+    for label, function_calling in [("JSON scraping", False), ("function calling", True)]:
+        stats = run(function_calling, error_rate, messages)
+        print(f"{label:<17} retry rate {stats['retry_rate']:5.1%}   "
+              f"re-asks {stats['retries']:4d}   clarification turns {stats['failures']:4d}   "
+              f"output {stats['chars']:4.0f} chars/command")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Intent parser benchmark
+Runs the rule-based parser over the labeled corpus and reports how many
+messages skip the Gemini call, how accurate those fast-path parses are,
+and how long a parse takes.
+"""
+
+import json
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_parser import parse_intent, CONFIDENCE_THRESHOLD
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intent_corpus.jsonl')
+SLOTS = ('summary', 'date', 'time')
+
+
+def load_corpus(path: str = CORPUS) -> list:
+    """Read the labeled messages"""
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def matches_label(intent: dict, label: dict) -> bool:
+    """Check the parsed action and every labeled slot"""
+    if intent['action'] != label['action']:
+        return False
+    for slot in SLOTS:
+        if slot in label and (intent.get(slot) or '').lower() != label[slot].lower():
+            return False
+    return True
+
+
+def main():
+    """Run the intent benchmark"""
+    corpus = load_corpus()
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    print("="*60)
+    print(f"Intent parser benchmark ({len(corpus)} labeled messages, "
+          f"threshold {CONFIDENCE_THRESHOLD})")
+    print("="*60 + "\n")
+
+    fast, correct, wrong = 0, 0, []
+    for label in corpus:
+        intent = parse_intent(label['text'])
+        if intent['score'] < CONFIDENCE_THRESHOLD:
+            continue
+        fast += 1
+        if matches_label(intent, label):
+            correct += 1
+        else:
+            wrong.append((label['text'], intent['action'], intent.get('summary')))
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for label in corpus:
+            parse_intent(label['text'])
+    per_parse = (time.perf_counter() - start) * 1e6 / (rounds * len(corpus))
+
+    print(f"LLM calls avoided:   {fast}/{len(corpus)} ({fast / len(corpus):.0%})")
+    print(f"Fast-path accuracy:  {correct}/{fast} ({correct / max(fast, 1):.0%})")
+    print(f"Parse latency:       {per_parse:.1f} µs per message")
+    for text, action, summary in wrong:
+        print(f"  ❌ {text!r} -> {action} {summary!r}")
+    return 0 if not wrong else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Interval index benchmark at 100k mirrored events
+Times the queries the chat makes against the event mirror (the upcoming
+window, a conflict check before booking, a day's agenda) with the old scan
+over every event and with the interval index, plus what keeping the index
+costs on a full sync and on single writes.
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calendar_chat import EventMirror, as_utc, parse_event_time
+
+EVENTS = 100_000
+QUERIES = 200
+
+
+def make_events(count: int, start: datetime, rng: random.Random) -> list:
+    """A busy calendar: mostly meetings, some all-day and multi-day events"""
+    span = timedelta(days=3 * 365)
+    events = []
+    for index in range(count):
+        begin = start + timedelta(minutes=15 * rng.randrange(int(span.total_seconds() // 900)))
+        kind = rng.random()
+        if kind < 0.03:
+            day = begin.date()
+            times = {'start': {'date': day.isoformat()},
+                     'end': {'date': (day + timedelta(days=rng.choice([1, 1, 3, 14]))).isoformat()}}
+        else:
+            length = timedelta(minutes=rng.choice([15, 30, 30, 45, 60, 60, 90, 120, 240]))
+            times = {'start': {'dateTime': begin.isoformat()},
+                     'end': {'dateTime': (begin + length).isoformat()}}
+        events.append(dict(times, id=f"event{index}", etag=f'"{index}"',
+                           summary=f"Event {index}"))
+    return events
+
+
+def scan_window(mirror: EventMirror, time_min: datetime, time_max=None,
+                max_results=None) -> list:
+    """The mirror's previous window(): parse and filter every event"""
+    time_min = as_utc(time_min)
+    time_max = as_utc(time_max) if time_max else None
+    matches = []
+    for event in list(mirror.events.values()):
+        start = parse_event_time(event['start'])
+        end = parse_event_time(event['end'])
+        if end <= time_min or (time_max and start >= time_max):
+            continue
+        matches.append((start, event))
+    matches.sort(key=lambda match: match[0])
+    return [event for _, event in matches[:max_results]]
+
+
+def timed(function, arguments: list) -> tuple:
+    """Median milliseconds per call, and the results"""
+    times, results = [], []
+    for args in arguments:
+        started = time.perf_counter()
+        results.append(function(*args))
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), results
+
+
+def main():
+    """Run the interval index benchmark"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else EVENTS
+    rng = random.Random(4)
+    origin = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    events = make_events(count, origin, rng)
+
+    print("="*60)
+    print(f"Mirror queries over {count:,} events")
+    print("="*60 + "\n")
+
+    mirror = EventMirror()
+    started = time.perf_counter()
+    mirror.apply(events)
+    print(f"Full sync into the mirror, index included: "
+          f"{(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def moment():
+        return origin + timedelta(minutes=15 * rng.randrange(4 * 365 * 24 * 2))
+
+    cases = [
+        ("upcoming 10 (snapshot)", [(t, None, 10) for t in (moment() for _ in range(QUERIES))]),
+        ("2 h conflict check", [(t, t + timedelta(hours=2), None)
+                                for t in (moment() for _ in range(QUERIES))]),
+        ("one day's agenda", [(t, t + timedelta(days=1), None)
+                              for t in (moment() for _ in range(QUERIES))]),
+    ]
+    print(f"\n{'query':<24}{'scan ms':>10}{'index ms':>10}{'speedup':>9}{'same':>6}")
+    for label, arguments in cases:
+        # The scan is slow; a sample is enough for its median
+        scan_ms, scanned = timed(lambda *args: scan_window(mirror, *args), arguments[:10])
+        index_ms, indexed = timed(mirror.overlapping, arguments)
+        # Events starting together may come back in either order
+        same = all([parse_event_time(e['start']) for e in a]
+                   == [parse_event_time(e['start']) for e in b]
+                   and (args[2] or {e['id'] for e in a} == {e['id'] for e in b})
+                   for a, b, args in zip(scanned, indexed, arguments))
+        print(f"{label:<24}{scan_ms:>10.2f}{index_ms:>10.3f}{scan_ms / index_ms:>8.0f}x"
+              f"{'yes' if same else 'NO':>6}")
+
+    writes = [dict(rng.choice(events), summary="Moved") for _ in range(QUERIES)]
+    for event in writes:
+        begin = moment()
+        event['start'] = {'dateTime': begin.isoformat()}
+        event['end'] = {'dateTime': (begin + timedelta(minutes=30)).isoformat()}
+    upsert_ms, _ = timed(mirror.upsert, [(event,) for event in writes])
+    print(f"\nSingle upsert, index kept current: {upsert_ms:.3f} ms median")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
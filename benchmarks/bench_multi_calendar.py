@@ -0,0 +1,140 @@
+"""
+Multi-calendar benchmark with simulated per-calendar API latency
+Mirrors the primary calendar plus team, shared and resource calendars and
+times a full sync, an incremental sync and a remote window listing with
+the calendars queried one at a time and concurrently, against the slowest
+calendar and the sum of all of them. Also times the merged "next 10
+events" read from the mirrors, k-way merge vs. sorting every calendar's
+matches.
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calendar_chat
+from calendar_chat import CalendarService, EventMirror, PRIMARY, parse_event_time
+
+EVENTS_PER_CALENDAR = 5_000
+RUNS = 5
+
+
+class Request:
+    def __init__(self, latency: float, result: dict):
+        self.latency = latency
+        self.result = result
+
+    def execute(self):
+        time.sleep(self.latency)
+        return self.result
+
+
+class MultiCalendar(CalendarService):
+    """CalendarService over generated calendars, each answering after its own latency"""
+
+    def __init__(self, rng: random.Random, latencies: dict):
+        self.mirror = EventMirror()
+        self._sync_lock = calendar_chat.threading.Lock()
+        self._timezone = 'UTC'
+        self.latencies = latencies
+        self.api_calls = 0
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        self.events = {}
+        for calendar_id in latencies:
+            events = []
+            for index in range(EVENTS_PER_CALENDAR):
+                begin = start + timedelta(minutes=15 * rng.randrange(4 * 24 * 365))
+                events.append({
+                    'id': f"{calendar_id}-{index}", 'etag': '"0"',
+                    'summary': f"{calendar_id} {index}",
+                    'start': {'dateTime': begin.isoformat()},
+                    'end': {'dateTime': (begin + timedelta(minutes=30)).isoformat()}})
+            self.events[calendar_id] = events
+        self.use_calendars(','.join(latencies))
+
+    def _fetch_pages(self, **params):
+        self.api_calls += 1
+        calendar_id = params['calendarId']
+        items = [] if 'syncToken' in params else self.events[calendar_id]
+        return Request(self.latencies[calendar_id],
+                       {'items': items, 'nextSyncToken': 'token'}).execute()
+
+    def _window_request(self, max_results, time_min, time_max, projection='full',
+                        calendar_id=PRIMARY):
+        self.api_calls += 1
+        matches = sorted((e for e in self.events[calendar_id]
+                          if parse_event_time(e['end']) > time_min),
+                         key=lambda e: parse_event_time(e['start']))
+        return Request(self.latencies[calendar_id], {'items': matches[:max_results]})
+
+
+def timed(function, runs: int = RUNS) -> float:
+    """Median milliseconds per call"""
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def sorted_window(calendar: MultiCalendar, time_min: datetime, limit: int) -> list:
+    """Merged read without the k-way merge: every calendar's matches, sorted"""
+    matches = []
+    for mirror in calendar.mirror.members():
+        matches.extend(mirror.overlapping(time_min))
+    matches.sort(key=lambda event: parse_event_time(event['start']))
+    return matches[:limit]
+
+
+def main():
+    """Run the multi-calendar benchmark"""
+    rng = random.Random(25)
+    print("="*60)
+    print(f"Primary plus shared calendars, {EVENTS_PER_CALENDAR:,} events each")
+    print("="*60 + "\n")
+    print(f"{'calendars':<10}{'operation':<18}{'one by one':>11}{'concurrent':>11}"
+          f"{'slowest':>9}{'sum':>7}")
+
+    now = datetime.now(timezone.utc)
+    for count in (1, 3, 6, 12):
+        latencies = {PRIMARY: 0.08}
+        for index in range(1, count):
+            latencies[f"team{index}@group.calendar.google.com"] = rng.uniform(0.04, 0.15)
+        calendar = MultiCalendar(rng, latencies)
+        slowest = max(latencies.values()) * 1000
+        total = sum(latencies.values()) * 1000
+
+        operations = [
+            ("full sync", lambda: [mirror.reset() for mirror in calendar.mirror.members()]
+             and calendar.sync_changes()),
+            ("incremental sync", calendar.sync_changes),
+            ("remote window", lambda: calendar._list_remote(10, now, None, 'context')),
+        ]
+        for label, operation in operations:
+            # The calendars queried one at a time, as separate calls would
+            calendar_chat._fanout_pool = ThreadPoolExecutor(max_workers=1)
+            sequential_ms = timed(operation)
+            calendar_chat._fanout_pool = None
+            concurrent_ms = timed(operation)
+            print(f"{count:<10}{label:<18}{sequential_ms:>9.0f}ms{concurrent_ms:>9.0f}ms"
+                  f"{slowest:>7.0f}ms{total:>5.0f}ms")
+
+    merge_ms = timed(lambda: calendar.mirror.window(now, None, 10), runs=50)
+    sort_ms = timed(lambda: sorted_window(calendar, now, 10), runs=5)
+    same = ([e['id'] for e in calendar.mirror.window(now, None, 10)]
+            == [e['id'] for e in sorted_window(calendar, now, 10)])
+    print(f"\nNext 10 events across {len(latencies)} mirrors: k-way merge {merge_ms:.2f} ms, "
+          f"sort all matches {sort_ms:.1f} ms, same {'yes' if same else 'NO'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
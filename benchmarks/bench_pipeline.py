@@ -0,0 +1,133 @@
+"""
+Pipeline latency benchmark for CalendarChatAgent.process_query
+Runs a mix of chat messages against stubbed Calendar and Gemini backends
+with realistic latencies, sequentially and pipelined, and reports p50/p95
+per-message latency.
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calendar_chat import CalendarChatAgent, parse_event_time
+from slot_finder import find_slots
+
+# Backend latencies in seconds, scaled by the first command line argument
+CALENDAR_LATENCY = 0.15
+PARSE_LATENCY = 0.45
+GENERATE_LATENCY = 0.8
+
+MESSAGES = [
+    "show my upcoming events",
+    "create lunch with Sam tomorrow at noon",
+    "how busy am I this week?",
+    "delete standup",
+    "am I free on Friday afternoon?",
+]
+
+
+def pause(latency: float, scale: float, rng: random.Random):
+    """Sleep for a jittered backend latency"""
+    time.sleep(max(rng.gauss(latency, latency * 0.2), 0) * scale)
+
+
+class StubCalendar:
+    """CalendarService stand-in with fixed latencies"""
+
+    def __init__(self, scale: float):
+        self.scale = scale
+        self.rng = random.Random(1)
+
+    def timezone(self):
+        return 'UTC'
+
+    def list_events(self, max_results=10, projection='full', **kwargs):
+        pause(CALENDAR_LATENCY, self.scale, self.rng)
+        return [{'id': f'event{i}', 'summary': f'Meeting {i}',
+                 'start': {'dateTime': f'2030-01-0{i + 1}T10:00:00Z'},
+                 'end': {'dateTime': f'2030-01-0{i + 1}T11:00:00Z'}}
+                for i in range(5)]
+
+    def conflicts(self, start_time, end_time, max_age=0.0):
+        pause(CALENDAR_LATENCY, self.scale, self.rng)
+        return []
+
+    def find_free_slots(self, first_day, end_day, duration, tz, max_age=0.0, **options):
+        # list_events() pays the calendar latency
+        busy = [(parse_event_time(event['start']), parse_event_time(event['end']))
+                for event in self.list_events()]
+        return find_slots(busy, first_day, end_day, duration, tz, **options)
+
+    def create_event(self, **kwargs):
+        pause(CALENDAR_LATENCY, self.scale, self.rng)
+        return {'id': 'created'}
+
+    def delete_events(self, event_ids):
+        pause(CALENDAR_LATENCY, self.scale, self.rng)
+        return [{'ok': True, 'event_id': event_id} for event_id in event_ids]
+
+
+class StubGemini:
+    """GeminiAgent stand-in with fixed latencies and canned intents"""
+
+    def __init__(self, scale: float):
+        self.scale = scale
+        self.rng = random.Random(2)
+
+    def parse_calendar_command(self, user_input, calendar_context):
+        pause(PARSE_LATENCY, self.scale, self.rng)
+        if user_input.startswith('create'):
+            return {'action': 'create', 'summary': 'Lunch with Sam'}
+        if user_input.startswith('delete'):
+            return {'action': 'delete', 'event_ids': ['Meeting 1']}
+        return {'action': 'unknown'}
+
+    def generate_response(self, prompt, context=""):
+        pause(GENERATE_LATENCY, self.scale, self.rng)
+        return "Here is what I found."
+
+
+def measure(pipelined: bool, scale: float, rounds: int) -> list:
+    """Return per-message latencies in milliseconds"""
+    agent = CalendarChatAgent(None, calendar=StubCalendar(scale), ai=StubGemini(scale),
+                              pipelined=pipelined)
+    latencies = []
+    for _ in range(rounds):
+        for message in MESSAGES:
+            start = time.perf_counter()
+            agent.process_query(message)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def main():
+    """Run the pipeline benchmark"""
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 0.1
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    print("="*60)
+    print(f"process_query latency ({rounds} rounds of {len(MESSAGES)} messages, "
+          f"latency scale {scale})")
+    print("="*60 + "\n")
+
+    for label, pipelined in [("sequential", False), ("pipelined", True)]:
+        latencies = measure(pipelined, scale, rounds)
+        print(f"{label:<12} p50 {percentile(latencies, 0.5):7.1f} ms   "
+              f"p95 {percentile(latencies, 0.95):7.1f} ms   "
+              f"mean {statistics.mean(latencies):7.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Agent registry memory benchmark
+Simulates long-running web traffic where most sessions are abandoned
+without logging out, and tracks live agents and traced memory with the
+old unbounded dict and with AgentRegistry. Returning sessions check that
+conversation history survives eviction.
+"""
+
+import os
+import random
+import sys
+import tracemalloc
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agent_registry
+from agent_registry import AgentRegistry
+from calendar_chat import CalendarChatAgent
+
+# Stand-in for the Calendar Resource, HTTP session and Gemini model an
+# agent keeps alive
+AGENT_FOOTPRINT = 64 * 1024
+
+
+class StubCalendar:
+    """CalendarService stand-in holding a realistic amount of memory"""
+
+    def __init__(self):
+        self.ballast = bytearray(AGENT_FOOTPRINT)
+
+    def timezone(self):
+        return 'UTC'
+
+    def list_events(self, **kwargs):
+        return []
+
+
+class StubGemini:
+    """GeminiAgent stand-in that never needs the model"""
+
+    def parse_calendar_command(self, user_input, calendar_context):
+        return {'action': 'unknown'}
+
+    def generate_response(self, prompt, context=""):
+        return "ok"
+
+
+def make_agent(gemini_api_key):
+    return CalendarChatAgent(None, calendar=StubCalendar(), ai=StubGemini(), pipelined=False)
+
+
+class Clock:
+    """Simulated time, so an hour of traffic runs in seconds"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def simulate(use_registry: bool, sessions: int, max_agents: int, idle_ttl: float) -> list:
+    """Run the traffic and return (session count, live agents, MB traced) samples"""
+    clock = Clock()
+    agent_registry.time.monotonic = clock
+    rng = random.Random(11)
+    registry = AgentRegistry(make_agent, max_agents=max_agents, idle_ttl=idle_ttl)
+    plain = {}
+
+    def get(session_id):
+        if use_registry:
+            return registry.get(session_id, 'key')[0]
+        if session_id not in plain:
+            plain[session_id] = make_agent('key')
+        return plain[session_id]
+
+    tracemalloc.start()
+    samples, lost = [], 0
+    for index in range(sessions):
+        session_id = f"session-{index}"
+        for turn in range(rng.randint(1, 4)):
+            # A new visitor arrives every few seconds
+            clock.now += rng.uniform(1, 5)
+            get(session_id).process_query(f"hello {turn}")
+        # Some users come back to an older session
+        if index > 50 and rng.random() < 0.1:
+            returning = f"session-{rng.randrange(index)}"
+            agent = get(returning)
+            lost += not agent.conversation_history
+            agent.process_query("back again")
+        if (index + 1) % (sessions // 5) == 0:
+            live = len(registry.live) if use_registry else len(plain)
+            samples.append((index + 1, live, tracemalloc.get_traced_memory()[0] / 1e6))
+    tracemalloc.stop()
+    return samples, lost, registry.metrics()
+
+
+def main():
+    """Run the registry benchmark"""
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 2500
+    max_agents, idle_ttl = 100, 10 * 60
+
+    print("="*60)
+    print(f"Agents kept in memory ({sessions} sessions, max {max_agents}, "
+          f"idle TTL {idle_ttl // 60:.0f} min)")
+    print("="*60 + "\n")
+
+    for label, use_registry in [("dict", False), ("registry", True)]:
+        samples, lost, metrics = simulate(use_registry, sessions, max_agents, idle_ttl)
+        print(label)
+        for count, live, megabytes in samples:
+            print(f"  after {count:5d} sessions: {live:5d} live agents, {megabytes:7.1f} MB")
+        if use_registry:
+            print(f"  evicted idle {metrics['evicted_idle']}, LRU {metrics['evicted_lru']}, "
+                  f"rehydrated {metrics['rehydrated']}, returns past the saved-state limit: {lost}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Free-slot finder benchmark on dense calendars
+Times "find me time" searches over 1, 3 and 6 months of a calendar with
+about 16 meetings every workday, answered from the mirror's interval index
+and from a single freebusy().query call, and checks every answer against a
+brute-force scan. Before the slot finder these requests went to Gemini with
+only the next 10 events as context; the last column shows how little of the
+range that context covered.
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calendar_chat
+from calendar_chat import CalendarService, EventMirror, blocks_time, parse_event_time
+from datetime_resolver import DateTimeResolver
+from slot_finder import DEFAULT_WORKDAYS, DEFAULT_WORKING_HOURS, SLOT_STEP, working_window
+
+EVENTS_PER_DAY = 16
+DAYS = 200
+QUERIES = 20
+
+
+class FreeBusyRequest:
+    def __init__(self, calendar, body):
+        self.calendar = calendar
+        self.body = body
+
+    def execute(self):
+        """Busy periods like the API returns them: blocking events, merged"""
+        self.calendar.api_calls += 1
+        time_min = parse_event_time({'dateTime': self.body['timeMin']})
+        time_max = parse_event_time({'dateTime': self.body['timeMax']})
+        busy = []
+        for start, end in sorted(
+                (parse_event_time(event['start']), parse_event_time(event['end']))
+                for event in self.calendar.events.values() if blocks_time(event)):
+            if end <= time_min or start >= time_max:
+                continue
+            if busy and start <= busy[-1][1]:
+                busy[-1][1] = max(busy[-1][1], end)
+            else:
+                busy.append([start, end])
+        return {'calendars': {'primary': {'busy': [
+            {'start': start.isoformat(), 'end': end.isoformat()} for start, end in busy]}}}
+
+
+class FreeBusyService:
+    def __init__(self, calendar):
+        self.calendar = calendar
+
+    def freebusy(self):
+        return self
+
+    def query(self, body):
+        return FreeBusyRequest(self.calendar, body)
+
+
+class DenseCalendar(CalendarService):
+    """CalendarService over generated events, with freebusy() answered locally"""
+
+    def __init__(self, rng: random.Random, start: datetime, days: int = DAYS):
+        self.mirror = EventMirror()
+        self._sync_lock = calendar_chat.threading.Lock()
+        self._timezone = 'UTC'
+        self.service = FreeBusyService(self)
+        self.api_calls = 0
+        self.events = {}
+        for day in range(days):
+            midnight = start + timedelta(days=day)
+            if midnight.weekday() not in DEFAULT_WORKDAYS:
+                continue
+            self._add({'start': {'date': midnight.date().isoformat()},
+                       'end': {'date': (midnight + timedelta(days=1)).date().isoformat()}})
+            for _ in range(EVENTS_PER_DAY):
+                begin = midnight + timedelta(minutes=15 * rng.randrange(8 * 4, 18 * 4))
+                length = timedelta(minutes=rng.choice([15, 30, 30, 45, 60]))
+                event = {'start': {'dateTime': begin.isoformat()},
+                         'end': {'dateTime': (begin + length).isoformat()}}
+                if rng.random() < 0.1:
+                    # "Show as available", e.g. a focus-time hold
+                    event['transparency'] = 'transparent'
+                self._add(event)
+
+    def _add(self, event: dict):
+        index = len(self.events)
+        self.events[f"event{index}"] = dict(event, id=f"event{index}", etag='"0"',
+                                            summary=f"Meeting {index}")
+
+    def _fetch_pages(self, **params):
+        self.api_calls += 1
+        return {'items': list(self.events.values()), 'nextSyncToken': 'token'}
+
+
+def brute_force(calendar: DenseCalendar, first_day, end_day, duration, tz, buffer, not_before):
+    """Earliest free start on the SLOT_STEP grid, checking every event"""
+    busy = [(parse_event_time(e['start']), parse_event_time(e['end']))
+            for e in calendar.events.values() if blocks_time(e)]
+    day = first_day
+    while day < end_day:
+        if day.weekday() in DEFAULT_WORKDAYS:
+            start, end = working_window(day, tz, DEFAULT_WORKING_HOURS)
+            while start + duration <= end:
+                if start >= not_before and not any(
+                        b_start - buffer < start + duration and b_end + buffer > start
+                        for b_start, b_end in busy):
+                    return start
+                start += SLOT_STEP
+        day += timedelta(days=1)
+    return None
+
+
+def all_free(calendar: DenseCalendar, slots, buffer) -> bool:
+    """Whether no slot comes within buffer of a blocking event"""
+    busy = [(parse_event_time(e['start']), parse_event_time(e['end']))
+            for e in calendar.events.values() if blocks_time(e)]
+    return all(not any(b_start - buffer < end and b_end + buffer > start
+                       for b_start, b_end in busy)
+               for start, end in slots)
+
+
+def timed(function, calls: int = QUERIES) -> tuple:
+    """Median milliseconds per call, and the last result"""
+    times = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        result = function()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), result
+
+
+def main():
+    """Run the free-slot finder benchmark"""
+    rng = random.Random(24)
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    calendar = DenseCalendar(rng, today)
+    resolver = DateTimeResolver('UTC', now=today + timedelta(hours=8))
+    calendar.sync()
+
+    print("="*60)
+    print(f"Free-slot search over {len(calendar.events):,} events "
+          f"({EVENTS_PER_DAY} meetings per workday)")
+    print("="*60 + "\n")
+
+    # What Gemini saw before: the next 10 events
+    context = calendar.mirror.window(resolver.now, None, 10)
+    context_hours = (parse_event_time(context[-1]['end'])
+                     - resolver.now).total_seconds() / 3600
+
+    print(f"{'range':<10}{'length':>8}{'buffer':>8}{'index ms':>10}{'freebusy ms':>13}"
+          f"{'calls':>7}{'valid':>7}{'earliest':>10}{'context':>9}")
+    for months in (1, 3, 6):
+        first_day, end_day = resolver.resolve_range(f"the next {months} months")
+        range_hours = (end_day - first_day).days * 24
+        for minutes, buffer_minutes in ((30, 0), (60, 10), (90, 15)):
+            duration = timedelta(minutes=minutes)
+            buffer = timedelta(minutes=buffer_minutes)
+            options = {'buffer': buffer, 'not_before': resolver.now}
+
+            index_ms, slots = timed(lambda: calendar.find_free_slots(
+                first_day, end_day, duration, resolver.tz, max_age=3600, **options))
+            # A cold mirror (or one whose sync failed) asks the API once
+            horizon, calendar.mirror.horizon = calendar.mirror.horizon, None
+            calls_before = calendar.api_calls
+            freebusy_ms, remote = timed(lambda: calendar.find_free_slots(
+                first_day, end_day, duration, resolver.tz, max_age=3600, **options))
+            calls = (calendar.api_calls - calls_before) / QUERIES
+            calendar.mirror.horizon = horizon
+
+            earliest = brute_force(calendar, first_day, end_day, duration, resolver.tz,
+                                   buffer, resolver.now)
+            valid = remote == slots and all_free(calendar, slots, buffer)
+            same = bool(slots) and slots[0][0] == earliest
+            label = f"{months} month{'s' if months > 1 else ''}"
+            print(f"{label:<10}{minutes:>7}m{buffer_minutes:>7}m"
+                  f"{index_ms:>10.2f}{freebusy_ms:>13.2f}{calls:>7.0f}"
+                  f"{'yes' if valid else 'NO':>7}{'yes' if same else 'NO':>10}"
+                  f"{context_hours / range_hours:>8.1%}")
+
+    print("\nfreebusy ms includes the simulated server; add a network round trip")
+    print("calls: Calendar API calls per search when the mirror can't answer")
+    print("valid: index and freebusy agree, and no slot touches a busy event")
+    print("earliest: the first slot is the earliest free one a full scan finds")
+    print("context: share of the range the 10-event Gemini context covered")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Startup benchmark for CalendarService
+Compares building a Calendar Resource with googleapiclient's build() against
+the shared CalendarResourceFactory, which parses the discovery document once.
+"""
+
+import os
+import sys
+import time
+
+from google.auth.credentials import AnonymousCredentials
+from googleapiclient.discovery import build
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calendar_chat import CalendarResourceFactory
+
+
+def time_builds(label: str, make_resource, rounds: int) -> float:
+    """Time repeated Resource construction and return ms per build"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        make_resource()
+    per_build = (time.perf_counter() - start) * 1000 / rounds
+    print(f"{label:<28} {per_build:8.3f} ms per build")
+    return per_build
+
+
+def main():
+    """Run the startup benchmark"""
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    credentials = AnonymousCredentials()
+    factory = CalendarResourceFactory()
+
+    print("="*60)
+    print(f"CalendarService startup benchmark ({rounds} builds each)")
+    print("="*60 + "\n")
+
+    # First factory build pays the one-time parse
+    start = time.perf_counter()
+    factory.build(credentials=credentials)
+    print(f"{'factory (first build)':<28} {(time.perf_counter() - start) * 1000:8.3f} ms")
+
+    baseline = time_builds(
+        "build('calendar', 'v3')",
+        lambda: build('calendar', 'v3', credentials=credentials, cache_discovery=False),
+        rounds
+    )
+    shared = time_builds(
+        "factory.build()",
+        lambda: factory.build(credentials=credentials),
+        rounds
+    )
+
+    print(f"\nSpeedup: {baseline / shared:.1f}x per session")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
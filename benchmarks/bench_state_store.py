@@ -0,0 +1,146 @@
+"""
+Shared state store benchmark
+Routes each session's messages to random web workers, as gunicorn does
+without sticky sessions, and counts what a worker that hasn't seen the
+session before has to redo: lost conversation history, full calendar
+syncs and repeated Gemini parses. Compares a per-worker memory store with
+one SQLite store shared by every worker.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_registry import AgentRegistry
+from calendar_chat import CalendarChatAgent, EventMirror
+from response_cache import ResponseCache
+from state_store import MemoryStateStore, SQLiteStateStore
+
+EVENTS = 200
+QUESTIONS = ["what's the plan for standup?", "who is at the design review?",
+             "anything I should prepare for lunch?", "summarize my week"]
+
+
+def calendar_events() -> list:
+    """A couple of hundred timed events over the next weeks"""
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    events = []
+    for index in range(EVENTS):
+        begin = start + timedelta(hours=3 * index + 1)
+        events.append({'id': f"event{index:04d}", 'summary': f"Meeting {index}",
+                       'start': {'dateTime': begin.isoformat()},
+                       'end': {'dateTime': (begin + timedelta(minutes=30)).isoformat()}})
+    return events
+
+
+class Counters:
+    def __init__(self):
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.model_parses = 0
+
+
+class StubCalendar:
+    """CalendarService stand-in with a real EventMirror and sync tokens"""
+
+    def __init__(self, counters: Counters, events: list):
+        self.counters = counters
+        self.all_events = events
+        self.mirror = EventMirror()
+
+    def timezone(self):
+        return 'UTC'
+
+    def list_events(self, max_results=10, **kwargs):
+        if self.mirror.sync_token is None:
+            self.counters.full_syncs += 1
+            self.mirror.apply(self.all_events)
+            self.mirror.sync_token = "token-1"
+            self.mirror.horizon = datetime.now(timezone.utc) - timedelta(days=30)
+        else:
+            self.counters.incremental_syncs += 1
+        return self.mirror.window(datetime.now(timezone.utc), max_results=max_results)
+
+
+class StubGemini:
+    """GeminiAgent stand-in that caches parses like the real one"""
+
+    def __init__(self, counters: Counters):
+        self.counters = counters
+        self.cache = ResponseCache()
+
+    def parse_calendar_command(self, user_input, calendar_context):
+        if self.cache.get(user_input, calendar_context, 'command') is None:
+            self.counters.model_parses += 1
+            self.cache.put(user_input, calendar_context, '{}', 'command')
+        return {'action': 'unknown'}
+
+    def generate_response(self, prompt, context=""):
+        return "ok"
+
+
+def simulate(shared: bool, workers: int, sessions: int, turns: int) -> dict:
+    """Send every session's turns to random workers and count redone work"""
+    rng = random.Random(5)
+    counters = Counters()
+    events = calendar_events()
+
+    def make_agent(gemini_api_key):
+        return CalendarChatAgent(None, calendar=StubCalendar(counters, events),
+                                 ai=StubGemini(counters), pipelined=False)
+
+    directory = tempfile.mkdtemp()
+    if shared:
+        store = SQLiteStateStore(os.path.join(directory, 'state.db'))
+        registries = [AgentRegistry(make_agent, store=store) for _ in range(workers)]
+    else:
+        registries = [AgentRegistry(make_agent, store=MemoryStateStore())
+                      for _ in range(workers)]
+
+    lost, overhead = 0, 0.0
+    for turn in range(turns):
+        for index in range(sessions):
+            session_id = f"session-{index}"
+            registry = rng.choice(registries)
+            started = time.perf_counter()
+            agent, _ = registry.get(session_id, 'key')
+            overhead += time.perf_counter() - started
+            lost += len(agent.conversation_history) < turn
+            agent.process_query(rng.choice(QUESTIONS))
+            started = time.perf_counter()
+            registry.save(session_id)
+            overhead += time.perf_counter() - started
+
+    requests = sessions * turns
+    return {'requests': requests, 'lost': lost, 'full_syncs': counters.full_syncs,
+            'model_parses': counters.model_parses,
+            'store_ms': overhead / requests * 1000}
+
+
+def main():
+    """Run the state store benchmark"""
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    sessions, turns = 50, 8
+
+    print("="*60)
+    print(f"Sessions spread over {workers} workers ({sessions} sessions x {turns} turns, "
+          f"{EVENTS} events each)")
+    print("="*60 + "\n")
+
+    print(f"{'store':<22}{'history lost':>13}{'full syncs':>12}{'parses':>8}{'store ms/req':>14}")
+    for label, shared in [("memory, per worker", False), ("SQLite, shared", True)]:
+        result = simulate(shared, workers, sessions, turns)
+        print(f"{label:<22}{result['lost']:>13}{result['full_syncs']:>12}"
+              f"{result['model_parses']:>8}{result['store_ms']:>14.2f}")
+    print(f"\n{sessions * turns} requests; a full sync refetches all {EVENTS} events")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
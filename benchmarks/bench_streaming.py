@@ -0,0 +1,101 @@
+"""
+Streaming latency benchmark for the web endpoints
+Sends conversational questions through /api/message and
+/api/message/stream with a stubbed Gemini model that produces its answer
+in timed chunks, and reports time to first text and time to the full
+answer for each.
+"""
+
+import os
+import statistics
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import web_app
+from calendar_chat import CalendarChatAgent
+
+# Seconds before the first chunk and between chunks, scaled by argv[1]
+FIRST_CHUNK = 0.6
+CHUNK_INTERVAL = 0.08
+CHUNKS = 30
+
+
+class StubCalendar:
+    """CalendarService stand-in with an empty calendar"""
+
+    def timezone(self):
+        return 'UTC'
+
+    def list_events(self, **kwargs):
+        return []
+
+
+class StubGemini:
+    """GeminiAgent stand-in that answers conversationally in chunks"""
+
+    def __init__(self, scale: float):
+        self.scale = scale
+
+    def parse_calendar_command(self, user_input, calendar_context):
+        return {'action': 'unknown'}
+
+    def _chunks(self):
+        time.sleep(FIRST_CHUNK * self.scale)
+        for i in range(CHUNKS):
+            if i:
+                time.sleep(CHUNK_INTERVAL * self.scale)
+            yield f"word{i} "
+
+    def generate_response(self, prompt, context=""):
+        return ''.join(self._chunks())
+
+    def generate_response_stream(self, prompt, context=""):
+        yield from self._chunks()
+
+
+def measure(client, path: str, rounds: int) -> tuple:
+    """Return (first text, full answer) latencies in milliseconds"""
+    first, full = [], []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        response = client.post(path, json={'message': 'how does my week look?'},
+                               buffered=False)
+        first_text = None
+        for chunk in response.response:
+            if first_text is None and (b'delta' in chunk or b'"response"' in chunk):
+                first_text = time.perf_counter()
+        end = time.perf_counter()
+        first.append(((first_text or end) - start) * 1000)
+        full.append((end - start) * 1000)
+    return first, full
+
+
+def main():
+    """Run the streaming benchmark"""
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 0.25
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    web_app.chat_agents.register('bench', CalendarChatAgent(
+        None, calendar=StubCalendar(), ai=StubGemini(scale), pipelined=False))
+    client = web_app.app.test_client()
+    with client.session_transaction() as session:
+        session['gemini_api_key'] = 'offline-benchmark'
+        session['session_id'] = 'bench'
+
+    print("="*60)
+    print(f"Perceived reply latency ({rounds} rounds, latency scale {scale})")
+    print("="*60 + "\n")
+
+    for label, path in [("/api/message", '/api/message'),
+                        ("/api/message/stream", '/api/message/stream')]:
+        first, full = measure(client, path, rounds)
+        print(f"{label:<20} first text {statistics.median(first):7.1f} ms   "
+              f"full answer {statistics.median(full):7.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Transport benchmark for CalendarService
+Simulates several chat sessions, each sending a few messages from a pool of
+worker threads, against a local fake Calendar server. It counts the
+connections (TLS handshakes against the real API) each transport opens.
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import google_auth_httplib2
+import httplib2
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calendar_chat import RESOURCE_FACTORY, PooledHttp
+from fake_calendar_server import FakeCalendarServer
+
+SESSIONS = 20
+MESSAGES = 5
+THREADS = 4
+
+
+def run(server: FakeCalendarServer, label: str, make_resource, per_message_http=None):
+    """Send SESSIONS x MESSAGES list calls and report connections opened"""
+    server.reset_counters()
+    resources = [make_resource() for _ in range(SESSIONS)]
+
+    def send(resource):
+        request = resource.events().list(calendarId='primary', maxResults=10)
+        # httplib2.Http is not thread-safe, so threaded callers need their own
+        http = per_message_http() if per_message_http else None
+        return request.execute(http=http)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        list(pool.map(send, [r for r in resources for _ in range(MESSAGES)]))
+    elapsed = time.perf_counter() - start
+
+    print(f"{label:<34} {server.connections:4d} connections "
+          f"for {server.requests} requests ({elapsed * 1000:.0f} ms)")
+    return server.connections
+
+
+def main():
+    """Run the transport benchmark"""
+    server = FakeCalendarServer(events=[{'id': 'e1', 'summary': 'Standup'}]).start()
+    credentials = server.credentials()
+    options = server.client_options()
+
+    print("="*60)
+    print(f"Transport benchmark: {SESSIONS} sessions x {MESSAGES} messages, "
+          f"{THREADS} threads")
+    print("="*60 + "\n")
+
+    try:
+        baseline = run(
+            server, "httplib2, new Http per message",
+            lambda: RESOURCE_FACTORY.build(credentials=credentials, client_options=options),
+            per_message_http=lambda: google_auth_httplib2.AuthorizedHttp(
+                credentials, http=httplib2.Http())
+        )
+        pooled = run(
+            server, "PooledHttp, shared pool",
+            lambda: RESOURCE_FACTORY.build(http=PooledHttp(credentials),
+                                           client_options=options)
+        )
+    finally:
+        server.stop()
+
+    print(f"\nHandshakes per message: {baseline / (SESSIONS * MESSAGES):.2f} -> "
+          f"{pooled / (SESSIONS * MESSAGES):.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
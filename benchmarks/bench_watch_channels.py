@@ -0,0 +1,207 @@
+"""
+Calendar push-notification benchmark, with a local notification simulator
+Replays the POSTs Google sends to /api/calendar/notifications (the 'sync'
+handshake, change notices, retried deliveries and a forged one) while a
+user chats and the calendar changes elsewhere, and compares syncing the
+mirror on every request with syncing on notifications: Calendar API calls,
+channel renewals, and how long a change takes to reach the mirror.
+
+NotificationSimulator can also be pointed at a running server, e.g.
+NotificationSimulator('http://127.0.0.1:5000', channel).changed()
+"""
+
+import os
+import random
+import secrets
+import statistics
+import sys
+import urllib.error
+import urllib.request
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calendar_chat
+import watch_channels
+import web_app
+from bench_events_etag import Clock, FakeCalendar, StubGemini
+from calendar_chat import CalendarChatAgent
+from watch_channels import WatchChannels
+
+NOTIFICATION_PATH = '/api/calendar/notifications'
+# Share of notifications Google delivers twice
+RETRY_RATE = 0.1
+
+
+class NotificationSimulator:
+    """Sends the notification POSTs Google would send for one channel
+
+    target is a Flask test client or the base URL of a running server.
+    """
+
+    def __init__(self, target, channel: dict):
+        self.target = target
+        self.channel = channel
+        self.number = 0
+
+    def headers(self, state: str, number: int, token: str = None) -> dict:
+        return {
+            'X-Goog-Channel-ID': self.channel['id'],
+            'X-Goog-Channel-Token': token or self.channel['token'],
+            'X-Goog-Channel-Expiration': 'Tue, 01 Jan 2030 00:00:00 GMT',
+            'X-Goog-Resource-ID': self.channel['resourceId'],
+            'X-Goog-Resource-URI': 'https://www.googleapis.com/calendar/v3/calendars/primary/events',
+            'X-Goog-Resource-State': state,
+            'X-Goog-Message-Number': str(number),
+        }
+
+    def post(self, headers: dict) -> int:
+        """POST one notification (empty body, like Google's) and return the status"""
+        if isinstance(self.target, str):
+            request = urllib.request.Request(self.target + NOTIFICATION_PATH, data=b'',
+                                             headers=headers, method='POST')
+            try:
+                with urllib.request.urlopen(request) as response:
+                    return response.status
+            except urllib.error.HTTPError as error:
+                return error.code
+        return self.target.post(NOTIFICATION_PATH, headers=headers).status_code
+
+    def handshake(self) -> int:
+        """The 'sync' message Google sends when a channel opens"""
+        self.number += 1
+        return self.post(self.headers('sync', self.number))
+
+    def changed(self) -> int:
+        """A change notice for the watched events"""
+        self.number += 1
+        return self.post(self.headers('exists', self.number))
+
+    def retry(self) -> int:
+        """Deliver the last message again, as Google does after a timeout"""
+        return self.post(self.headers('exists', self.number))
+
+    def forged(self) -> int:
+        """A notification carrying a token the server never issued"""
+        return self.post(self.headers('exists', self.number + 1,
+                                      token=f"{secrets.token_hex(16)}.0"))
+
+
+class WatchableCalendar(FakeCalendar):
+    """FakeCalendar that also opens and stops channels, counting each call"""
+
+    def __init__(self, rng: random.Random, clock: Clock):
+        super().__init__(rng)
+        self.clock = clock
+        self.open_channels = {}
+        self.watch_calls = 0
+
+    def watch(self, address, channel_id, token, ttl=None):
+        self.watch_calls += 1
+        channel = {'id': channel_id, 'resourceId': 'primary-events', 'token': token,
+                   'expiration': str(int((self.clock.now + ttl) * 1000))}
+        self.open_channels[channel_id] = channel
+        return dict(channel)
+
+    def stop_watch(self, channel_id, resource_id):
+        self.watch_calls += 1
+        return self.open_channels.pop(channel_id, None) is not None
+
+
+def chat(push: bool, minutes: int) -> dict:
+    """One user's chat with changes made elsewhere, polling or pushed"""
+    rng = random.Random(5)
+    clock = Clock()
+    calendar_chat.time.monotonic = clock
+    watch_channels.time.time = clock
+    web_app.EVENTS_MAX_AGE = 5.0
+
+    calendar = WatchableCalendar(rng, clock)
+    agent = CalendarChatAgent(None, calendar=calendar, ai=StubGemini(), pipelined=False)
+    web_app.chat_agents.register('bench', agent)
+    channels = None
+    if push:
+        # Short-lived channels, so the run includes renewals
+        channels = WatchChannels('https://chat.example.com' + NOTIFICATION_PATH,
+                                 'benchmark secret', web_app.live_calendar,
+                                 ttl=10 * 60, renew_margin=60)
+    web_app.watch_channels = channels
+    client = web_app.app.test_client()
+    with client.session_transaction() as session:
+        session['gemini_api_key'] = 'benchmark'
+        session['session_id'] = 'bench'
+
+    timeline = []
+    t = 0.0
+    while t < minutes * 60:
+        t += rng.uniform(20, 70)
+        timeline.append((t, 'message'))
+    timeline += [(rng.uniform(0, minutes * 60), 'change') for _ in range(minutes // 2)]
+    timeline += [(float(s), 'renew') for s in range(60, minutes * 60, 60)]
+    timeline.sort()
+
+    simulators = {}
+    statuses = {}
+    lag, pending = [], []
+    client.post('/api/message', json={'message': 'hello'})
+    for at, what in timeline:
+        clock.now = at
+        if what == 'message':
+            client.post('/api/message', json={'message': 'how is my week?'})
+        elif what == 'renew' and channels:
+            channels.renew_due()
+        elif what == 'change':
+            calendar.change_elsewhere()
+            changed = calendar.pending[-1]
+            pending.append((at, changed['id'], changed['etag']))
+            # Google notifies every open channel, including one being replaced
+            for channel in list(calendar.open_channels.values()):
+                simulator = simulators.get(channel['id'])
+                if simulator is None:
+                    simulator = simulators[channel['id']] = NotificationSimulator(client, channel)
+                    statuses.setdefault('handshake', []).append(simulator.handshake())
+                statuses.setdefault('changed', []).append(simulator.changed())
+                if rng.random() < RETRY_RATE:
+                    statuses.setdefault('retry', []).append(simulator.retry())
+        # When did each change reach the mirror?
+        for change in list(pending):
+            changed_at, event_id, etag = change
+            if calendar.mirror.events.get(event_id, {}).get('etag') == etag:
+                lag.append(at - changed_at)
+                pending.remove(change)
+    if simulators:
+        statuses['forged'] = [next(iter(simulators.values())).forged()]
+    if channels:
+        channels.stop()
+
+    return {'api_calls': calendar.api_calls, 'watch_calls': calendar.watch_calls,
+            'lag': lag, 'statuses': statuses,
+            'stats': channels.stats if channels else {}}
+
+
+def main():
+    """Run the push-notification benchmark"""
+    minutes = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+
+    print("="*60)
+    print(f"{minutes} minutes of chatting, {minutes // 2} changes made elsewhere")
+    print("="*60 + "\n")
+    print(f"{'mode':<22}{'sync calls':>11}{'channel calls':>15}{'lag med s':>11}"
+          f"{'lag max s':>11}")
+    results = {}
+    for label, push in [("sync every request", False), ("push notifications", True)]:
+        result = results[label] = chat(push, minutes)
+        lag = result['lag'] or [0.0]
+        print(f"{label:<22}{result['api_calls']:>11}{result['watch_calls']:>15}"
+              f"{statistics.median(lag):>11.1f}{max(lag):>11.1f}")
+
+    pushed = results["push notifications"]
+    print("\nChannel stats:", ", ".join(f"{k} {v}" for k, v in pushed['stats'].items()))
+    print("Webhook statuses:", ", ".join(
+        f"{kind} {sorted(set(codes))}" for kind, codes in pushed['statuses'].items()))
+    print("lag: time from a change elsewhere until the mirror has it")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
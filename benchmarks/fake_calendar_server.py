@@ -0,0 +1,93 @@
+"""
+Local fake Calendar API server for benchmarks
+Serves canned events().list responses over HTTP/1.1 keep-alive and counts
+the TCP connections it accepts. Against the real API every new connection
+is also a new TLS handshake.
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from google.auth.credentials import AnonymousCredentials
+from google.api_core.client_options import ClientOptions
+
+
+class FakeCalendarHandler(BaseHTTPRequestHandler):
+    """Answers every GET with the server's canned event list"""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; don't let Nagle stall them
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = json.dumps({'items': self.server.events}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeCalendarServer(ThreadingHTTPServer):
+    """Threaded fake Calendar API that tracks connections and requests"""
+
+    daemon_threads = True
+
+    def __init__(self, events=None, latency: float = 0.0):
+        super().__init__(('127.0.0.1', 0), FakeCalendarHandler)
+        self.events = events or []
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def endpoint(self) -> str:
+        """Base URL to use as the Calendar api_endpoint"""
+        return f"http://127.0.0.1:{self.server_address[1]}/calendar/v3/"
+
+    def client_options(self) -> ClientOptions:
+        """Client options that point a Resource at this server"""
+        return ClientOptions(api_endpoint=self.endpoint)
+
+    def credentials(self):
+        """Credentials that add no auth header"""
+        return AnonymousCredentials()
+
+    def handle_error(self, request, client_address):
+        """Ignore clients that hang up mid-response, e.g. cancelled requests"""
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+    def reset_counters(self):
+        """Zero the connection and request counters"""
+        with self.lock:
+            self.connections = 0
+            self.requests = 0
+
+    def start(self):
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        self.shutdown()
+        self.server_close()
@@ -3,116 +3,1178 @@ Google Calendar Chat Agent
 An AI-based chat interface for Google Calendar using Gemini API
 """
 
+import asyncio
+import hashlib
+import heapq
+import math
 import os
 import sys
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+import tempfile
+import threading
+import time
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, Iterator, List, Dict, Any, Optional, Tuple
 import json
 
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from google.auth.transport.requests import AuthorizedSession, Request
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from googleapiclient.errors import HttpError
 import google.generativeai as genai
+import httplib2
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+from intent_parser import parse_intent, CONFIDENCE_THRESHOLD
+from datetime_resolver import DateTimeResolver, DEFAULT_DURATION, as_minutes
+from response_cache import ResponseCache
+from context_builder import ContextBuilder, EventAliases, count_tokens
+from event_feed import EventFeed
+from interval_index import IntervalIndex
+from slot_finder import find_slots, parse_working_hours, DAY_PARTS, DEFAULT_LIMIT
+from calendar_tools import (
+    CALENDAR_TOOLS, TOOL_CONFIG, call_to_intent, first_function_call, validate_call
+)
+
 # Load environment variables
 load_dotenv()
 
 # Google Calendar API scopes
 SCOPES = ['https://www.googleapis.com/auth/calendar']
 
+# The user's main calendar, as the API names it
+PRIMARY = 'primary'
+
+# Calendars read alongside the primary one: 'primary' for none, 'selected'
+# for those shown in Google Calendar, 'all', or comma-separated calendar IDs
+CALENDAR_IDS = os.getenv('CALENDAR_IDS', PRIMARY)
+
+# How far back the initial full sync reaches. Windows starting earlier than
+# this are fetched straight from the API instead of the local mirror.
+SYNC_LOOKBACK = timedelta(days=1)
+
+# Access tokens are refreshed in the background this long before they expire
+REFRESH_MARGIN = timedelta(minutes=5)
+# Seconds a caller waits for a refresh already running in another thread
+REFRESH_WAIT = 30.0
+
+# Fetch calendar context and classify intent concurrently in process_query
+PIPELINED = os.getenv('CHAT_PIPELINED', 'False').lower() == 'true'
+
+# Connection pool shared by every CalendarService in the process
+HTTP_POOL_SIZE = int(os.getenv('CALENDAR_HTTP_POOL_SIZE', '10'))
+HTTP_TIMEOUT = float(os.getenv('CALENDAR_HTTP_TIMEOUT', '30'))
+
+# Per-user cache of Gemini responses; similarity matching is off unless a
+# cosine threshold (e.g. 0.9) is set
+RESPONSE_CACHE_TTL = float(os.getenv('GEMINI_CACHE_TTL', '300'))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('GEMINI_CACHE_MAX_BYTES', str(1024 * 1024)))
+RESPONSE_CACHE_SIMILARITY = (float(os.environ['GEMINI_CACHE_SIMILARITY'])
+                             if os.getenv('GEMINI_CACHE_SIMILARITY') else None)
+
+# Parse commands through declared functions instead of JSON in prose, and
+# how many times to ask when the arguments fail validation
+FUNCTION_CALLING = os.getenv('GEMINI_FUNCTION_CALLING', 'True').lower() == 'true'
+TOOL_ATTEMPTS = 2
+
+# Chat turns kept per session in conversation_history
+HISTORY_LIMIT = 20
+
+# Cached parses saved with a session's state, so another worker reuses them
+INTENT_CACHE_KINDS = ('command', 'tool_command')
+
+# Most tokens the calendar context may add to a prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '400'))
+
+# Fixed part of the intent-extraction prompt, built once
+COMMAND_INSTRUCTIONS = """You are a helpful calendar assistant. Analyze the user's request and determine:
+1. The action they want to perform (list, create, delete, update, find_time)
+2. Extract relevant details (date, time, event name, duration, etc.)
+3. Return a JSON response with this structure:
+{
+    "action": "list|create|delete|update|find_time",
+    "summary": "event title",
+    "start_time": "the user's own date and time wording, e.g. next Tue 3pm",
+    "end_time": "the user's own end time wording, if any",
+    "description": "event description",
+    "date": "for find_time, the days to search as the user wrote them, e.g. next week",
+    "time": "for find_time, any time of day or hour range, e.g. afternoon, 2-4pm",
+    "duration_minutes": "for find_time, the meeting length in minutes as a number",
+    "events": [{"summary": "...", "start_time": "...", "end_time": "...", "description": "..."}],
+    "event_ids": ["IDs (e.g. e3) of the events to delete or update"],
+    "confidence": "high|medium|low",
+    "clarification_needed": "question if details are unclear"
+}
+
+Copy dates and times as the user wrote them ("tomorrow at noon", "Fri 3-4pm");
+do not convert them to absolute dates. For updates, "start_time" and "end_time"
+are the new times. Only fill "events" when the user wants several events
+created at once, and "event_ids" when they want events deleted or updated. If
+no calendar context is given, put the titles of those events in "event_ids"
+instead. Use "find_time" when the user wants open time found or asks whether
+they are free.
+
+Current calendar context:
+"""
+
+TOOL_INSTRUCTIONS = ("You are a calendar assistant. Call the one function that carries out "
+                     "the user's request. Copy dates and times as the user wrote them.\n\n"
+                     "Current calendar context:\n")
+
+# Seconds a conflict check may trust the mirror without syncing; every
+# request syncs when it takes its snapshot
+CONFLICT_MAX_AGE = 30.0
+# Most overlapping events fetched when a conflict check can't use the mirror
+CONFLICT_LIMIT = 20
+
+# Free-slot search: the hours meetings may be put in, and the gap to keep
+# clear around existing events
+WORKING_HOURS = parse_working_hours(os.getenv('WORKING_HOURS', '09:00-17:00'))
+MEETING_BUFFER = timedelta(minutes=int(os.getenv('MEETING_BUFFER_MINUTES', '0')))
+# Days of busy time read from the mirror per step of a free-slot search
+SLOT_SEARCH_DAYS = timedelta(days=7)
+
+# The Calendar API accepts at most 50 calls in one batch request
+BATCH_LIMIT = 50
+
+# Named partial-response projections for event reads. None means the full
+# resource.
+EVENT_PROJECTIONS = {
+    'context': ('id', 'summary', 'start', 'end'),
+    'display': ('id', 'etag', 'summary', 'start', 'end', 'description'),
+    'full': None,
+}
+
+# Fields kept in the local mirror: every non-full projection plus what sync,
+# conditional updates and free-slot searches need
+MIRROR_FIELDS = ('id', 'etag', 'status', 'summary', 'description', 'start', 'end',
+                 'transparency')
+
+
+def list_fields(item_fields: Optional[tuple], *extra: str) -> Optional[str]:
+    """Build a fields= mask for an events().list response"""
+    if item_fields is None:
+        return None
+    return ','.join((f"items({','.join(item_fields)})", 'nextPageToken') + extra)
+
+
+def project_event(event: Dict[str, Any], projection: str) -> Dict[str, Any]:
+    """Trim a mirrored event down to a named projection"""
+    fields = EVENT_PROJECTIONS[projection]
+    if fields is None:
+        return event
+    return {key: event[key] for key in fields if key in event}
+
+
+def events_etag(events: List[Dict[str, Any]]) -> str:
+    """Validator for a list of events that changes whenever any of them does
+    
+    Built from each event's own API etag, so it is the same in every worker
+    and costs no serialization.
+    """
+    digest = hashlib.blake2b(digest_size=12)
+    for event in events:
+        marker = event.get('etag') or json.dumps(event, sort_keys=True)
+        digest.update(f"{event.get('id', '')}\0{marker}\0".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def parse_event_time(value: Dict[str, Any]) -> datetime:
+    """Convert an event start/end field into an aware UTC datetime"""
+    if 'dateTime' in value:
+        parsed = datetime.fromisoformat(value['dateTime'].replace('Z', '+00:00'))
+    else:
+        # All-day events only carry a date
+        parsed = datetime.fromisoformat(value['date'])
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def event_span(event: Dict[str, Any]) -> Tuple[str, float, float]:
+    """(id, start, end) of an event in epoch seconds, for IntervalIndex"""
+    return (event['id'], parse_event_time(event['start']).timestamp(),
+            parse_event_time(event['end']).timestamp())
+
+
+def blocks_time(event: Dict[str, Any]) -> bool:
+    """Whether an event makes its time busy: timed and not shown as available"""
+    return 'dateTime' in event.get('start', {}) and event.get('transparency') != 'transparent'
+
+
+def event_time(value: datetime) -> Dict[str, str]:
+    """Calendar API start/end for a datetime, keeping its IANA zone if it has one"""
+    return {
+        'dateTime': value.isoformat(),
+        'timeZone': getattr(value.tzinfo, 'key', 'UTC'),
+    }
+
+
+def format_when(value: datetime) -> str:
+    """Human-readable event time for chat replies"""
+    return f"{value:%a %b %d %Y, %H:%M} {value.tzname() or ''}".rstrip()
+
+
+def as_utc(value: datetime) -> datetime:
+    """Treat naive datetimes as UTC, matching the rest of this module"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class CredentialsManager:
+    """Keeps OAuth tokens in memory and refreshes them off the request path
+    
+    There is one manager per token file in each process. The file is read
+    once. A daemon thread refreshes the access token ahead of expiry, and
+    the file is rewritten atomically only when the token actually changes.
+    Before refreshing, the manager picks up a newer token that another
+    process has already written, so workers don't all refresh at once.
+    The token request runs on a copy outside the lock; threads that need a
+    refresh while one is running wait for it (up to REFRESH_WAIT seconds).
+    """
+    
+    _managers: Dict[str, 'CredentialsManager'] = {}
+    _managers_lock = threading.Lock()
+    
+    def __init__(self, token_path: str = 'token.json'):
+        self.token_path = token_path
+        self._creds: Optional[Credentials] = None
+        self._saved_json: Optional[str] = None
+        self._lock = threading.Lock()
+        # Set while a refresh is running; waiters block on it
+        self._refreshing: Optional[threading.Event] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+    
+    @classmethod
+    def for_token_file(cls, token_path: str = 'token.json') -> 'CredentialsManager':
+        """Get the process-wide manager for a token file"""
+        with cls._managers_lock:
+            key = os.path.abspath(token_path)
+            if key not in cls._managers:
+                cls._managers[key] = cls(token_path)
+            return cls._managers[key]
+    
+    def _read(self) -> Optional[Credentials]:
+        """Read credentials from the token file, if there is one"""
+        if not os.path.exists(self.token_path):
+            return None
+        with open(self.token_path, 'r') as token:
+            creds = Credentials.from_authorized_user_info(json.load(token), SCOPES)
+        # Remember the normalized form so unchanged tokens are never rewritten
+        self._saved_json = creds.to_json()
+        return creds
+    
+    def _write(self):
+        """Atomically write the token file if the token changed since the last write"""
+        token_json = self._creds.to_json()
+        if token_json == self._saved_json:
+            return
+        directory = os.path.dirname(os.path.abspath(self.token_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.token-', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w') as token:
+                token.write(token_json)
+                token.flush()
+                os.fsync(token.fileno())
+            os.replace(tmp_path, self.token_path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+        self._saved_json = token_json
+    
+    def load(self) -> Optional[Credentials]:
+        """Return the shared credentials, refreshing once if they start out expired"""
+        with self._lock:
+            if self._creds is None:
+                self._creds = self._read()
+            creds = self._creds
+            if not (creds and not creds.valid and creds.expired and creds.refresh_token):
+                return creds
+        self._refresh_token()
+        return creds
+    
+    def store(self, creds: Credentials):
+        """Adopt freshly obtained credentials, e.g. after an OAuth login"""
+        with self._lock:
+            self._creds = creds
+            self._write()
+    
+    def _seconds_until_refresh(self) -> float:
+        """How long the refresh thread can sleep"""
+        creds = self._creds
+        if creds is None or creds.expiry is None:
+            return REFRESH_MARGIN.total_seconds()
+        # google-auth keeps expiry as naive UTC
+        due = creds.expiry - REFRESH_MARGIN - datetime.utcnow()
+        return max(due.total_seconds(), 0)
+    
+    def refresh(self):
+        """Refresh the access token now, preferring a newer token already on disk"""
+        with self._lock:
+            creds = self._creds
+            if creds is None or not creds.refresh_token:
+                return
+            on_disk = self._read()
+            if on_disk and on_disk.expiry and creds.expiry and on_disk.expiry > creds.expiry:
+                # Another worker refreshed; copy its token into the shared object
+                creds.token = on_disk.token
+                creds.expiry = on_disk.expiry
+                if creds.valid and self._seconds_until_refresh() > 0:
+                    return
+        self._refresh_token()
+    
+    def _refresh_token(self):
+        """Ask Google for a new access token without holding the lock
+        
+        The first caller refreshes a copy of the credentials and adopts its
+        token; callers arriving meanwhile wait for that refresh instead of
+        starting their own.
+        """
+        copy = None
+        with self._lock:
+            done = self._refreshing
+            if done is None:
+                done = self._refreshing = threading.Event()
+                copy = Credentials.from_authorized_user_info(
+                    json.loads(self._creds.to_json()), SCOPES)
+        if copy is None:
+            done.wait(REFRESH_WAIT)
+            return
+        try:
+            copy.refresh(Request())
+            with self._lock:
+                self._creds.token = copy.token
+                self._creds.expiry = copy.expiry
+                self._write()
+        finally:
+            with self._lock:
+                self._refreshing = None
+            done.set()
+    
+    def _run(self):
+        """Background loop that keeps the access token ahead of expiry"""
+        while not self._stopped.wait(self._seconds_until_refresh()):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Token refresh failed: {str(e)}")
+                # Back off before trying again
+                if self._stopped.wait(30):
+                    break
+    
+    def start(self):
+        """Start the background refresh thread once"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name='token-refresh', daemon=True)
+                self._thread.start()
+    
+    def stop(self):
+        """Stop the background refresh thread"""
+        self._stopped.set()
+
+
+_shared_adapter: Optional[HTTPAdapter] = None
+_shared_adapter_lock = threading.Lock()
+
+
+def shared_http_adapter() -> HTTPAdapter:
+    """Get the process-wide keep-alive connection pool"""
+    global _shared_adapter
+    with _shared_adapter_lock:
+        if _shared_adapter is None:
+            _shared_adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_SIZE,
+                pool_maxsize=HTTP_POOL_SIZE,
+                pool_block=True
+            )
+        return _shared_adapter
+
+
+class PooledHttp:
+    """Thread-safe stand-in for httplib2.Http backed by a pooled requests session
+    
+    googleapiclient only calls request() and expects an (httplib2.Response,
+    bytes) pair back. AuthorizedSession adds the OAuth header, and every
+    instance is mounted on the same bounded urllib3 pool, so connections
+    are kept alive and reused across threads and sessions.
+    """
+    
+    def __init__(self, credentials, adapter: Optional[HTTPAdapter] = None,
+                 timeout: float = HTTP_TIMEOUT):
+        self.session = AuthorizedSession(credentials)
+        adapter = adapter or shared_http_adapter()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.timeout = timeout
+    
+    def request(self, uri, method='GET', body=None, headers=None,
+                redirections=5, connection_type=None):
+        """Send a request the way httplib2.Http.request would"""
+        response = self.session.request(
+            method, uri, data=body, headers=headers, timeout=self.timeout,
+            allow_redirects=redirections > 0
+        )
+        info = {key.lower(): value for key, value in response.headers.items()}
+        # requests has already decoded the body
+        info.pop('content-encoding', None)
+        info['status'] = str(response.status_code)
+        return httplib2.Response(info), response.content
+
+
+_pipeline_pool: Optional[ThreadPoolExecutor] = None
+_pipeline_pool_lock = threading.Lock()
+
+
+def pipeline_pool() -> ThreadPoolExecutor:
+    """Get the process-wide pool used for overlapping calendar fetches"""
+    global _pipeline_pool
+    with _pipeline_pool_lock:
+        if _pipeline_pool is None:
+            _pipeline_pool = ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE,
+                                                thread_name_prefix='pipeline')
+        return _pipeline_pool
+
+
+_fanout_pool: Optional[ThreadPoolExecutor] = None
+
+
+def fanout_pool() -> ThreadPoolExecutor:
+    """Get the process-wide pool that queries several calendars at once
+    
+    Kept apart from pipeline_pool(), whose tasks may wait on this one.
+    """
+    global _fanout_pool
+    with _pipeline_pool_lock:
+        if _fanout_pool is None:
+            _fanout_pool = ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE,
+                                              thread_name_prefix='calendar-fanout')
+        return _fanout_pool
+
+
+class CalendarResourceFactory:
+    """Builds Calendar API Resources from one shared discovery document
+    
+    The document bundled with googleapiclient is read and parsed once per
+    process; each build() call only binds credentials to it.
+    """
+    
+    def __init__(self, service_name: str = 'calendar', version: str = 'v3'):
+        self.service_name = service_name
+        self.version = version
+        self._document: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def document(self) -> Dict[str, Any]:
+        """The parsed discovery document, loaded on first use"""
+        if self._document is None:
+            with self._lock:
+                if self._document is None:
+                    content = get_static_doc(self.service_name, self.version)
+                    if content is None:
+                        raise RuntimeError(
+                            f"No bundled discovery document for {self.service_name} {self.version}")
+                    self._document = json.loads(content)
+        return self._document
+    
+    def build(self, credentials=None, http=None, **kwargs):
+        """Create a Resource bound to the given credentials or http object"""
+        return build_from_document(self.document, credentials=credentials,
+                                   http=http, **kwargs)
+
+
+# Shared by every CalendarService in the process
+RESOURCE_FACTORY = CalendarResourceFactory()
+
+
+class EventMirror:
+    """Local copy of a calendar's events, kept current with sync tokens"""
+    
+    def __init__(self, calendar_id: str = PRIMARY):
+        self.calendar_id = calendar_id
+        self.events: Dict[str, Dict[str, Any]] = {}
+        # The same events by time, for window and overlap queries
+        self.index = IntervalIndex()
+        self.sync_token: Optional[str] = None
+        self.horizon: Optional[datetime] = None
+        # Called after every change, e.g. to drop cached answers
+        self.listeners: List[Callable[[], None]] = []
+        # Bumped on every change, so callers can tell when to re-export
+        self.version = 0
+        self.modified_at = datetime.now(timezone.utc)
+        # time.monotonic() of the last successful sync
+        self.synced_at: Optional[float] = None
+        # While a push channel reports changes, syncs may be this old regardless
+        # of the max_age asked for; it only bounds lost notifications
+        self.push_max_age = 0.0
+    
+    def _changed(self):
+        self.version += 1
+        self.modified_at = datetime.now(timezone.utc)
+        self._notify()
+    
+    def _notify(self):
+        for listener in self.listeners:
+            listener()
+    
+    def reset(self):
+        """Forget everything so the next sync starts from scratch"""
+        self.events.clear()
+        self.index.clear()
+        self.sync_token = None
+        self.horizon = None
+        self.version += 1
+        self.modified_at = datetime.now(timezone.utc)
+        self.synced_at = None
+    
+    def mark_synced(self):
+        self.synced_at = time.monotonic()
+    
+    def mark_stale(self):
+        """Make the next sync() go to the API whatever max_age it is given"""
+        self.synced_at = None
+    
+    def members(self) -> List['EventMirror']:
+        """The single-calendar mirrors behind this one: just itself"""
+        return [self]
+    
+    def calendar_of(self, event_id: str) -> str:
+        """Calendar ID that writes to an event should name"""
+        return self.calendar_id
+    
+    def fresh(self, max_age: float) -> bool:
+        """Whether the last sync happened less than max_age seconds ago"""
+        max_age = max(max_age, self.push_max_age)
+        return self.synced_at is not None and time.monotonic() - self.synced_at < max_age
+    
+    def last_modified(self, time_min: datetime) -> datetime:
+        """Latest moment a window starting at time_min could have changed
+        
+        Either the last change to the mirror, or the last event to end
+        before time_min and so drop out of the window.
+        """
+        ended = self.index.latest_end(as_utc(time_min).timestamp())
+        if ended is None:
+            return self.modified_at
+        return max(self.modified_at, datetime.fromtimestamp(ended, timezone.utc))
+    
+    def export_state(self) -> Dict[str, Any]:
+        """Events, sync token and horizon, JSON-serializable"""
+        return {
+            'events': list(self.events.values()),
+            'sync_token': self.sync_token,
+            'horizon': self.horizon.isoformat() if self.horizon else None,
+            'modified_at': self.modified_at.isoformat(),
+        }
+    
+    def load_state(self, state: Dict[str, Any]):
+        """Take over a mirror exported elsewhere; the next sync is incremental"""
+        # Exported by CalendarMirrors, e.g. before CALENDAR_IDS changed
+        if 'calendars' in state:
+            state = state['calendars'].get(self.calendar_id, {})
+        elif self.calendar_id != PRIMARY:
+            # A single-calendar export holds the primary's events only
+            return
+        if not state.get('sync_token') or not state.get('horizon'):
+            return
+        self.events = {event['id']: event for event in state.get('events', [])}
+        self.index.clear()
+        self.index.update(event_span(event) for event in self.events.values())
+        self.sync_token = state['sync_token']
+        self.horizon = datetime.fromisoformat(state['horizon'])
+        if state.get('modified_at'):
+            self.modified_at = datetime.fromisoformat(state['modified_at'])
+        # Another worker changed it; open sidebars and cached answers must follow
+        self._notify()
+    
+    def covers(self, time_min: datetime) -> bool:
+        """Check whether a window starting at time_min can be served locally"""
+        return self.horizon is not None and as_utc(time_min) >= self.horizon
+    
+    def apply(self, items: List[Dict[str, Any]]):
+        """Apply a page of synced events, dropping cancelled ones"""
+        added, removed = [], []
+        for item in items:
+            if item.get('status') == 'cancelled':
+                self.events.pop(item.get('id'), None)
+                removed.append(item.get('id'))
+            elif self._valid(item):
+                self.events[item['id']] = item
+                added.append(event_span(item))
+        self.index.update(added, removed)
+        if items:
+            self._changed()
+    
+    def _valid(self, event: Dict[str, Any]) -> bool:
+        return bool(event.get('id')) and 'start' in event and 'end' in event
+    
+    def upsert(self, event: Dict[str, Any]):
+        """Insert or replace a single event"""
+        if self._valid(event):
+            self.events[event['id']] = event
+            self.index.add(*event_span(event))
+        self._changed()
+    
+    def remove(self, event_id: str):
+        """Drop a single event"""
+        self.events.pop(event_id, None)
+        self.index.discard(event_id)
+        self._changed()
+    
+    def window(self, time_min: datetime, time_max: Optional[datetime] = None,
+               max_results: int = 10) -> List[Dict[str, Any]]:
+        """Return events overlapping [time_min, time_max) ordered by start time"""
+        return self.overlapping(time_min, time_max, max_results)
+    
+    def overlapping(self, time_min: datetime, time_max: Optional[datetime] = None,
+                    limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Events overlapping [time_min, time_max), ordered by start time
+        
+        Same semantics as the API: timeMin bounds the end, timeMax the start.
+        """
+        end = as_utc(time_max).timestamp() if time_max else math.inf
+        event_ids = self.index.overlapping(as_utc(time_min).timestamp(), end, limit)
+        # A sync on another thread may have dropped some since
+        events = (self.events.get(event_id) for event_id in event_ids)
+        return [event for event in events if event is not None]
+
+
+def merge_events(streams: List[List[Dict[str, Any]]],
+                 limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """k-way merge of per-calendar event lists, each already in start order
+    
+    An event that appears in several calendars (e.g. an invitation also on
+    a team calendar) is kept once.
+    """
+    seen = set()
+    merged = []
+    for event in heapq.merge(*streams, key=lambda event: parse_event_time(event['start'])):
+        if event.get('id') in seen:
+            continue
+        seen.add(event.get('id'))
+        merged.append(event)
+        if limit is not None and len(merged) >= limit:
+            break
+    return merged
+
+
+class CalendarMirrors:
+    """Mirrors of several calendars behind EventMirror's interface
+    
+    Each calendar keeps its own events, interval index and sync token, and
+    is synced on its own. Reads query every mirror and merge the results,
+    already in start order, into one stream. Writes go to the mirror of the
+    calendar holding the event, new events to the primary one. Listeners
+    hear about changes to any of them. push_max_age applies to the primary
+    calendar only, the one a push channel watches.
+    """
+    
+    def __init__(self, mirrors: List[EventMirror]):
+        self.mirrors = mirrors
+        self.primary = mirrors[0]
+        self.listeners: List[Callable[[], None]] = []
+        for mirror in mirrors:
+            mirror.listeners.append(self._notify)
+    
+    def _notify(self):
+        for listener in self.listeners:
+            listener()
+    
+    def members(self) -> List[EventMirror]:
+        """The per-calendar mirrors, primary first"""
+        return list(self.mirrors)
+    
+    def calendar_of(self, event_id: str) -> str:
+        """Calendar holding an event; the primary one if no mirror has it"""
+        return self._holding(event_id).calendar_id
+    
+    def _holding(self, event_id: str) -> EventMirror:
+        return next((mirror for mirror in self.mirrors if event_id in mirror.events),
+                    self.primary)
+    
+    @property
+    def events(self) -> ChainMap:
+        """Every mirrored event by ID, read-only"""
+        return ChainMap(*(mirror.events for mirror in self.mirrors))
+    
+    @property
+    def version(self) -> int:
+        return sum(mirror.version for mirror in self.mirrors)
+    
+    @property
+    def modified_at(self) -> datetime:
+        return max(mirror.modified_at for mirror in self.mirrors)
+    
+    @property
+    def horizon(self) -> Optional[datetime]:
+        horizons = [mirror.horizon for mirror in self.mirrors]
+        return None if None in horizons else max(horizons)
+    
+    @property
+    def push_max_age(self) -> float:
+        return self.primary.push_max_age
+    
+    @push_max_age.setter
+    def push_max_age(self, value: float):
+        self.primary.push_max_age = value
+    
+    def reset(self):
+        for mirror in self.mirrors:
+            mirror.reset()
+    
+    def mark_stale(self):
+        """Push notifications are about the primary calendar"""
+        self.primary.mark_stale()
+    
+    def fresh(self, max_age: float) -> bool:
+        """Whether every calendar synced less than max_age seconds ago"""
+        return all(mirror.fresh(max_age) for mirror in self.mirrors)
+    
+    def covers(self, time_min: datetime) -> bool:
+        """Whether every calendar can serve a window starting at time_min"""
+        return all(mirror.covers(time_min) for mirror in self.mirrors)
+    
+    def last_modified(self, time_min: datetime) -> datetime:
+        return max(mirror.last_modified(time_min) for mirror in self.mirrors)
+    
+    def export_state(self) -> Dict[str, Any]:
+        """Each calendar's EventMirror.export_state(), by calendar ID"""
+        return {'calendars': {mirror.calendar_id: mirror.export_state()
+                              for mirror in self.mirrors}}
+    
+    def load_state(self, state: Dict[str, Any]):
+        """Take over exported mirrors; a single-calendar export is the primary's
+        
+        Calendars missing from the export keep their empty mirror and do a
+        full sync.
+        """
+        for mirror in self.mirrors:
+            mirror.load_state(state)
+    
+    def upsert(self, event: Dict[str, Any]):
+        """Insert or replace an event in the calendar holding it"""
+        self._holding(event.get('id')).upsert(event)
+    
+    def remove(self, event_id: str):
+        """Drop an event from the calendar holding it"""
+        self._holding(event_id).remove(event_id)
+    
+    def window(self, time_min: datetime, time_max: Optional[datetime] = None,
+               max_results: int = 10) -> List[Dict[str, Any]]:
+        return self.overlapping(time_min, time_max, max_results)
+    
+    def overlapping(self, time_min: datetime, time_max: Optional[datetime] = None,
+                    limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Events of every calendar overlapping [time_min, time_max), by start time"""
+        return merge_events([mirror.overlapping(time_min, time_max, limit)
+                             for mirror in self.mirrors], limit)
+
 
 class CalendarService:
     """Handles Google Calendar API operations"""
     
     def __init__(self):
         self.service = None
+        self.credentials = None
+        self.mirror = EventMirror()
+        self._sync_lock = threading.Lock()
+        self._timezone: Optional[str] = None
         self.authenticate()
+        self.use_calendars(CALENDAR_IDS)
     
     def authenticate(self):
         """Authenticate with Google Calendar API using OAuth2"""
-        creds = None
-        
-        # Token file stores user's access and refresh tokens
-        if os.path.exists('token.json'):
-            creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+        # Tokens are shared in memory by every CalendarService in the process
+        manager = CredentialsManager.for_token_file('token.json')
+        creds = manager.load()
         
         # If there are no valid credentials, let the user log in
         if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
-            else:
-                if not os.path.exists('credentials.json'):
-                    print("\n⚠️  Error: credentials.json not found!")
-                    print("Please follow these steps:")
-                    print("1. Go to https://console.cloud.google.com/")
-                    print("2. Create a project or select an existing one")
-                    print("3. Enable Google Calendar API")
-                    print("4. Create OAuth 2.0 credentials (Desktop app)")
-                    print("5. Download the credentials as 'credentials.json'")
-                    print("6. Place it in the project root directory\n")
-                    sys.exit(1)
-                
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    'credentials.json', SCOPES)
-                creds = flow.run_local_server(port=0)
+            if not os.path.exists('credentials.json'):
+                print("\n⚠️  Error: credentials.json not found!")
+                print("Please follow these steps:")
+                print("1. Go to https://console.cloud.google.com/")
+                print("2. Create a project or select an existing one")
+                print("3. Enable Google Calendar API")
+                print("4. Create OAuth 2.0 credentials (Desktop app)")
+                print("5. Download the credentials as 'credentials.json'")
+                print("6. Place it in the project root directory\n")
+                sys.exit(1)
+            
+            flow = InstalledAppFlow.from_client_secrets_file(
+                'credentials.json', SCOPES)
+            creds = flow.run_local_server(port=0)
             
             # Save credentials for future use
-            with open('token.json', 'w') as token:
-                token.write(creds.to_json())
+            manager.store(creds)
         
-        self.service = build('calendar', 'v3', credentials=creds)
+        manager.start()
+        self.credentials = creds
+        self.service = RESOURCE_FACTORY.build(http=PooledHttp(creds))
         print("✅ Successfully authenticated with Google Calendar\n")
     
+    def timezone(self) -> str:
+        """IANA timezone used to read relative dates and times
+        
+        CALENDAR_TIMEZONE overrides the calendar's own setting, which is
+        looked up once and cached.
+        """
+        if self._timezone is None:
+            self._timezone = os.getenv('CALENDAR_TIMEZONE')
+        if self._timezone is None:
+            try:
+                setting = self.service.settings().get(setting='timezone').execute()
+                self._timezone = setting.get('value') or 'UTC'
+            except HttpError as error:
+                print(f"An error occurred: {error}")
+                return 'UTC'
+        return self._timezone
+    
+    def list_calendars(self) -> List[Dict[str, Any]]:
+        """Entries of the user's calendar list: id, summary, primary, selected, accessRole"""
+        calendars = []
+        page_token = None
+        try:
+            while True:
+                result = self.service.calendarList().list(
+                    pageToken=page_token,
+                    fields='items(id,summary,primary,selected,accessRole),nextPageToken'
+                ).execute()
+                calendars.extend(result.get('items', []))
+                page_token = result.get('nextPageToken')
+                if not page_token:
+                    return calendars
+        except HttpError as error:
+            print(f"An error occurred: {error}")
+            return []
+    
+    def use_calendars(self, setting: str = PRIMARY):
+        """Choose the calendars mirrored and read alongside the primary one
+        
+        setting is 'primary', 'selected' (the calendars shown in Google
+        Calendar), 'all', or comma-separated calendar IDs; the first two are
+        looked up with calendarList. Calendars that only share free/busy
+        information can't be listed and are left out. Call this before
+        anything subscribes to the mirror.
+        """
+        setting = setting.strip()
+        if setting in ('selected', 'all'):
+            calendar_ids = [
+                entry['id'] for entry in self.list_calendars()
+                if not entry.get('primary') and entry.get('accessRole') != 'freeBusyReader'
+                and (setting == 'all' or entry.get('selected'))
+            ]
+        else:
+            calendar_ids = [calendar_id.strip() for calendar_id in setting.split(',')
+                            if calendar_id.strip() not in ('', PRIMARY)]
+        if calendar_ids:
+            self.mirror = CalendarMirrors(
+                [self.mirror] + [EventMirror(calendar_id) for calendar_id in calendar_ids])
+    
+    def calendar_ids(self) -> List[str]:
+        """IDs of the calendars read, primary first"""
+        return [mirror.calendar_id for mirror in self.mirror.members()]
+    
+    def _sync_request(self, page_token: Optional[str] = None, **params):
+        """Build one page of a mirror sync query"""
+        params.setdefault('calendarId', PRIMARY)
+        return self.service.events().list(
+            pageToken=page_token,
+            fields=list_fields(MIRROR_FIELDS, 'nextSyncToken'),
+            maxResults=2500,
+            singleEvents=True,
+            **params
+        )
+    
+    def _fetch_pages(self, **params) -> Dict[str, Any]:
+        """Run a sync query across all pages"""
+        items = []
+        page_token = None
+        while True:
+            result = self._sync_request(page_token, **params).execute()
+            items.extend(result.get('items', []))
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return {'items': items, 'nextSyncToken': result.get('nextSyncToken')}
+    
+    def _full_sync(self, mirror: EventMirror):
+        """Download a calendar's event window from scratch and store its sync token"""
+        mirror.reset()
+        horizon = datetime.now(timezone.utc) - SYNC_LOOKBACK
+        result = self._fetch_pages(calendarId=mirror.calendar_id, timeMin=horizon.isoformat())
+        mirror.apply(result['items'])
+        mirror.sync_token = result['nextSyncToken']
+        mirror.horizon = horizon
+        mirror.mark_synced()
+    
+    def _incremental_sync(self, mirror: EventMirror):
+        """Fetch only a calendar's changes since its last sync token"""
+        result = self._fetch_pages(calendarId=mirror.calendar_id, syncToken=mirror.sync_token)
+        mirror.apply(result['items'])
+        mirror.sync_token = result['nextSyncToken']
+        mirror.mark_synced()
+    
+    def sync(self, max_age: float = 0.0) -> bool:
+        """Bring the local event mirror up to date
+        
+        Skips the API call if the mirror was synced less than max_age
+        seconds ago; writes made through this service are already in it.
+        """
+        if self.mirror.fresh(max_age):
+            return True
+        with self._sync_lock:
+            return self._sync(max_age)
+    
+    def sync_changes(self) -> bool:
+        """Sync now even if the mirror looks fresh, e.g. on a push notification"""
+        with self._sync_lock:
+            return self._sync()
+    
+    def _sync(self, max_age: Optional[float] = None) -> bool:
+        """Sync every calendar, or those not synced within max_age; hold the sync lock
+        
+        Calendars sync concurrently, each with its own sync token, so this
+        takes about as long as the slowest one.
+        """
+        stale = [mirror for mirror in self.mirror.members()
+                 if max_age is None or not mirror.fresh(max_age)]
+        if len(stale) <= 1:
+            return all(self._sync_calendar(mirror) for mirror in stale)
+        return all(list(fanout_pool().map(self._sync_calendar, stale)))
+    
+    def _sync_calendar(self, mirror: EventMirror) -> bool:
+        """Sync one calendar's mirror"""
+        try:
+            if mirror.sync_token is None:
+                self._full_sync(mirror)
+                return True
+            try:
+                self._incremental_sync(mirror)
+            except HttpError as error:
+                # 410 GONE means the sync token expired; start over
+                if error.resp.status != 410:
+                    raise
+                self._full_sync(mirror)
+            return True
+        except HttpError as error:
+            print(f"An error occurred: {error}")
+            return False
+    
     def list_events(self, max_results: int = 10, time_min: Optional[datetime] = None, 
-                   time_max: Optional[datetime] = None) -> List[Dict[str, Any]]:
-        """List calendar events"""
+                   time_max: Optional[datetime] = None,
+                   projection: str = 'full', max_age: float = 0.0) -> List[Dict[str, Any]]:
+        """List calendar events, served from the local mirror when possible
+        
+        projection names one of EVENT_PROJECTIONS. Everything except 'full'
+        can be answered from the mirror; 'full' always goes to the API.
+        max_age is passed on to sync().
+        """
+        if time_min is None:
+            time_min = datetime.utcnow()
+        
+        if (projection != 'full' and self.sync(max_age)
+                and self.mirror.covers(time_min)):
+            events = self.mirror.window(time_min, time_max, max_results)
+            return [project_event(event, projection) for event in events]
+        return self._list_remote(max_results, time_min, time_max, projection)
+    
+    def conflicts(self, start_time: datetime, end_time: datetime,
+                  max_age: float = 0.0) -> List[Dict[str, Any]]:
+        """Timed events overlapping [start_time, end_time), e.g. before booking it
+        
+        Answered from the mirror's interval index when it covers the
+        window; all-day events (holidays, birthdays) don't count.
+        """
+        if self.sync(max_age) and self.mirror.covers(start_time):
+            events = self.mirror.overlapping(start_time, end_time)
+        else:
+            events = self._list_remote(CONFLICT_LIMIT, start_time, end_time, 'context')
+        return [event for event in events if 'dateTime' in event.get('start', {})]
+    
+    def free_busy(self, time_min: datetime, time_max: datetime,
+                  max_age: float = 0.0) -> Optional[List[Tuple[datetime, datetime]]]:
+        """Busy intervals in [time_min, time_max), or None if they can't be read
+    
+        Answered from the mirror's interval index when it covers the
+        window, counting only events that block time (see blocks_time());
+        otherwise one freebusy().query call for every calendar read, which
+        applies the same rule.
+        """
+        if self.sync(max_age) and self.mirror.covers(time_min):
+            return [(parse_event_time(event['start']), parse_event_time(event['end']))
+                    for event in self.mirror.overlapping(time_min, time_max)
+                    if blocks_time(event)]
         try:
-            if time_min is None:
-                time_min = datetime.utcnow()
-            
-            time_min_str = time_min.isoformat() + 'Z'
-            time_max_str = time_max.isoformat() + 'Z' if time_max else None
-            
-            events_result = self.service.events().list(
-                calendarId='primary',
-                timeMin=time_min_str,
-                timeMax=time_max_str,
-                maxResults=max_results,
-                singleEvents=True,
-                orderBy='startTime'
+            result = self.service.freebusy().query(body={
+                'timeMin': as_utc(time_min).isoformat(),
+                'timeMax': as_utc(time_max).isoformat(),
+                'items': [{'id': calendar_id} for calendar_id in self.calendar_ids()],
+            }).execute()
+        except HttpError as error:
+            print(f"An error occurred: {error}")
+            return None
+        return [(parse_event_time({'dateTime': period['start']}),
+                 parse_event_time({'dateTime': period['end']}))
+                for calendar in result.get('calendars', {}).values()
+                for period in calendar.get('busy', [])]
+    
+    def find_free_slots(self, first_day: date, end_day: date, duration: timedelta, tz,
+                        max_age: float = 0.0,
+                        **options) -> Optional[List[Tuple[datetime, datetime]]]:
+        """Ranked open slots on days [first_day, end_day); None if busy time is unknown
+        
+        options go to slot_finder.find_slots (working_hours, workdays,
+        buffer, not_before, prefer, limit). From the mirror, busy time is
+        read SLOT_SEARCH_DAYS at a time and the search stops once enough
+        slots are found, so a long range on a busy calendar costs about as
+        much as a week.
+        """
+        options.setdefault('working_hours', WORKING_HOURS)
+        options.setdefault('buffer', MEETING_BUFFER)
+        limit = options.pop('limit', DEFAULT_LIMIT)
+        start = datetime.combine(first_day, datetime.min.time(), tz)
+        local = self.sync(max_age) and self.mirror.covers(start - options['buffer'])
+        step = SLOT_SEARCH_DAYS if local else end_day - first_day
+        
+        slots: List[Tuple[datetime, datetime]] = []
+        day = first_day
+        while day < end_day and len(slots) < limit:
+            stop = min(day + step, end_day)
+            # A day's working hours may run past midnight
+            busy = self.free_busy(
+                datetime.combine(day, datetime.min.time(), tz) - options['buffer'],
+                datetime.combine(stop + timedelta(days=1), datetime.min.time(), tz), max_age)
+            if busy is None:
+                return None
+            slots += find_slots(busy, day, stop, duration, tz, limit=limit - len(slots),
+                                **options)
+            day = stop
+        return slots
+    
+    def _window_request(self, max_results: int, time_min: datetime,
+                        time_max: Optional[datetime], projection: str = 'full',
+                        calendar_id: str = PRIMARY):
+        """Build an events().list query for a time window"""
+        time_min_str = as_utc(time_min).isoformat()
+        time_max_str = as_utc(time_max).isoformat() if time_max else None
+        
+        return self.service.events().list(
+            calendarId=calendar_id,
+            timeMin=time_min_str,
+            timeMax=time_max_str,
+            maxResults=max_results,
+            singleEvents=True,
+            orderBy='startTime',
+            fields=list_fields(EVENT_PROJECTIONS[projection])
+        )
+    
+    def _list_remote(self, max_results: int, time_min: datetime,
+                     time_max: Optional[datetime],
+                     projection: str = 'full') -> List[Dict[str, Any]]:
+        """List calendar events straight from the API
+        
+        With several calendars, each is queried concurrently and the
+        results merged in start order.
+        """
+        calendar_ids = self.calendar_ids()
+        
+        def fetch(calendar_id: str) -> List[Dict[str, Any]]:
+            try:
+                events_result = self._window_request(
+                    max_results, time_min, time_max, projection, calendar_id).execute()
+                return events_result.get('items', [])
+            except HttpError as error:
+                print(f"An error occurred: {error}")
+                return []
+        
+        if len(calendar_ids) == 1:
+            return fetch(calendar_ids[0])
+        return merge_events(list(fanout_pool().map(fetch, calendar_ids)), max_results)
+    
+    def watch(self, address: str, channel_id: str, token: str,
+              ttl: Optional[float] = None) -> Dict[str, Any]:
+        """Open a push-notification channel for changes to the primary calendar's events
+        
+        Google then POSTs to address (an HTTPS URL on a verified domain)
+        whenever events change, echoing token in X-Goog-Channel-Token.
+        Returns the channel, with its 'resourceId' and 'expiration' (ms
+        since the epoch), or {} if it couldn't be opened.
+        """
+        body = {'id': channel_id, 'type': 'web_hook', 'address': address, 'token': token}
+        if ttl:
+            body['params'] = {'ttl': str(int(ttl))}
+        try:
+            return self.service.events().watch(calendarId=PRIMARY, body=body).execute()
+        except HttpError as error:
+            print(f"An error occurred: {error}")
+            return {}
+    
+    def stop_watch(self, channel_id: str, resource_id: str) -> bool:
+        """Close a push-notification channel opened with watch()"""
+        try:
+            self.service.channels().stop(
+                body={'id': channel_id, 'resourceId': resource_id}).execute()
+            return True
+        except HttpError as error:
+            print(f"An error occurred: {error}")
+            return False
+    
+    def get_event(self, event_id: str, projection: str = 'full') -> Dict[str, Any]:
+        """Fetch a single event"""
+        fields = EVENT_PROJECTIONS[projection]
+        try:
+            return self.service.events().get(
+                calendarId=self.mirror.calendar_of(event_id),
+                eventId=event_id,
+                fields=','.join(fields) if fields else None
             ).execute()
-            
-            return events_result.get('items', [])
         except HttpError as error:
             print(f"An error occurred: {error}")
-            return []
+            return {}
+    
+    def _event_body(self, summary: str, start_time: datetime, end_time: datetime,
+                    description: str = "", location: str = "") -> Dict[str, Any]:
+        """Build the request body for a new event"""
+        return {
+            'summary': summary,
+            'location': location,
+            'description': description,
+            'start': event_time(start_time),
+            'end': event_time(end_time),
+        }
+    
+    def _insert_request(self, body: Dict[str, Any]):
+        """Build an events().insert call that returns the mirrored fields"""
+        return self.service.events().insert(
+            calendarId=PRIMARY,
+            body=body,
+            fields=','.join(MIRROR_FIELDS)
+        )
+    
+    def _delete_request(self, event_id: str):
+        """Build an events().delete call"""
+        return self.service.events().delete(
+            calendarId=self.mirror.calendar_of(event_id),
+            eventId=event_id
+        )
     
     def create_event(self, summary: str, start_time: datetime, end_time: datetime,
                     description: str = "", location: str = "") -> Dict[str, Any]:
         """Create a new calendar event"""
         try:
-            event = {
-                'summary': summary,
-                'location': location,
-                'description': description,
-                'start': {
-                    'dateTime': start_time.isoformat(),
-                    'timeZone': 'UTC',
-                },
-                'end': {
-                    'dateTime': end_time.isoformat(),
-                    'timeZone': 'UTC',
-                },
-            }
-            
-            event = self.service.events().insert(
-                calendarId='primary',
-                body=event
-            ).execute()
+            event = self._event_body(summary, start_time, end_time, description, location)
+            event = self._insert_request(event).execute()
             
+            self.mirror.upsert(event)
             return event
         except HttpError as error:
             print(f"An error occurred: {error}")
@@ -121,44 +1183,135 @@ class CalendarService:
     def delete_event(self, event_id: str) -> bool:
         """Delete a calendar event"""
         try:
-            self.service.events().delete(
-                calendarId='primary',
-                eventId=event_id
-            ).execute()
+            self._delete_request(event_id).execute()
+            self.mirror.remove(event_id)
             return True
         except HttpError as error:
             print(f"An error occurred: {error}")
             return False
     
+    def _patch_request(self, event_id: str, fields: Dict[str, Any],
+                       etag: Optional[str] = None):
+        """Build a PATCH for the given fields, guarded by If-Match when an ETag is known"""
+        request = self.service.events().patch(
+            calendarId=self.mirror.calendar_of(event_id),
+            eventId=event_id,
+            body=fields,
+            fields=','.join(MIRROR_FIELDS)
+        )
+        if etag:
+            request.headers['If-Match'] = etag
+        return request
+    
     def update_event(self, event_id: str, **kwargs) -> Dict[str, Any]:
-        """Update an existing calendar event"""
+        """Update an existing calendar event
+        
+        Only the changed fields are sent, using the mirrored ETag as a
+        precondition. The event is fetched again only when that ETag turns
+        out to be stale (412), and the patch is retried once.
+        """
         try:
-            event = self.service.events().get(
-                calendarId='primary',
-                eventId=event_id
-            ).execute()
-            
-            # Update fields
-            for key, value in kwargs.items():
-                if key in event:
-                    event[key] = value
-            
-            updated_event = self.service.events().update(
-                calendarId='primary',
-                eventId=event_id,
-                body=event
-            ).execute()
+            cached = self.mirror.events.get(event_id, {})
+            try:
+                updated_event = self._patch_request(
+                    event_id, kwargs, cached.get('etag')).execute()
+            except HttpError as error:
+                if error.resp.status != 412:
+                    raise
+                current = self.service.events().get(
+                    calendarId=self.mirror.calendar_of(event_id),
+                    eventId=event_id,
+                    fields='etag'
+                ).execute()
+                updated_event = self._patch_request(
+                    event_id, kwargs, current.get('etag')).execute()
             
+            self.mirror.upsert(updated_event)
             return updated_event
         except HttpError as error:
             print(f"An error occurred: {error}")
             return {}
+    
+    def _change_request(self, change: Dict[str, Any]):
+        """Build the API request for a single change without executing it"""
+        action = change.get('action')
+        if action == 'create':
+            body = self._event_body(
+                change['summary'], change['start_time'], change['end_time'],
+                change.get('description', ''), change.get('location', '')
+            )
+            return self._insert_request(body)
+        if action == 'delete':
+            return self._delete_request(change['event_id'])
+        if action == 'update':
+            cached = self.mirror.events.get(change['event_id'], {})
+            return self._patch_request(
+                change['event_id'], change.get('fields', {}), cached.get('etag'))
+        raise ValueError(f"Unknown change action: {action}")
+    
+    def apply_changes(self, changes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Apply several creates, deletes and updates in batched requests
+        
+        Each change is a dict with an 'action' of 'create' (summary,
+        start_time, end_time, optional description and location), 'delete'
+        (event_id) or 'update' (event_id and a 'fields' dict). Changes are sent
+        in groups of up to BATCH_LIMIT per HTTP request.
+        
+        Returns one result per change, in order, with 'ok', 'event' and
+        'error' keys so callers can report partial failures.
+        """
+        results = [
+            {'action': change.get('action'), 'event_id': change.get('event_id'),
+             'ok': False, 'event': None, 'error': None}
+            for change in changes
+        ]
+        
+        def on_response(request_id, response, exception):
+            index = int(request_id)
+            result = results[index]
+            if exception is not None:
+                result['error'] = str(exception)
+                return
+            result['ok'] = True
+            if result['action'] == 'delete':
+                self.mirror.remove(result['event_id'])
+            else:
+                result['event'] = response
+                result['event_id'] = response.get('id')
+                self.mirror.upsert(response)
+        
+        for offset in range(0, len(changes), BATCH_LIMIT):
+            batch = self.service.new_batch_http_request(callback=on_response)
+            for index in range(offset, min(offset + BATCH_LIMIT, len(changes))):
+                try:
+                    batch.add(self._change_request(changes[index]), request_id=str(index))
+                except (KeyError, ValueError) as error:
+                    results[index]['error'] = f"Invalid change: {error}"
+            try:
+                batch.execute()
+            except HttpError as error:
+                print(f"An error occurred: {error}")
+                for result in results[offset:offset + BATCH_LIMIT]:
+                    if not result['ok'] and result['error'] is None:
+                        result['error'] = str(error)
+        
+        return results
+    
+    def create_events(self, events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create several events in batched requests"""
+        return self.apply_changes([dict(event, action='create') for event in events])
+    
+    def delete_events(self, event_ids: List[str]) -> List[Dict[str, Any]]:
+        """Delete several events in batched requests"""
+        return self.apply_changes(
+            [{'action': 'delete', 'event_id': event_id} for event_id in event_ids])
 
 
 class GeminiAgent:
     """AI agent using Gemini API for natural language understanding"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache: Optional[ResponseCache] = None,
+                 function_calling: bool = FUNCTION_CALLING):
         if not api_key:
             print("\n⚠️  Error: GEMINI_API_KEY not found!")
             print("Please set your Gemini API key:")
@@ -169,40 +1322,210 @@ class GeminiAgent:
         
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel('gemini-pro')
+        self.cache = cache or ResponseCache(ttl=RESPONSE_CACHE_TTL,
+                                            max_bytes=RESPONSE_CACHE_MAX_BYTES,
+                                            similarity_threshold=RESPONSE_CACHE_SIMILARITY)
+        self.function_calling = function_calling
+        # Commands parsed, re-asks after invalid output, and parses that gave up
+        self.parse_stats = {'parses': 0, 'retries': 0, 'failures': 0}
+        # Model calls made and the prompt tokens they sent, counted locally
+        self.token_stats = {'calls': 0, 'prompt_tokens': 0}
         print("✅ Successfully initialized Gemini AI\n")
     
-    def generate_response(self, prompt: str, context: str = "") -> str:
-        """Generate a response using Gemini"""
+    @property
+    def retry_rate(self) -> float:
+        """Extra round trips per parsed command, from re-asks or clarification turns"""
+        extra = self.parse_stats['retries'] + self.parse_stats['failures']
+        return extra / max(self.parse_stats['parses'], 1)
+    
+    def _count_prompt(self, full_prompt: str):
+        self.token_stats['calls'] += 1
+        self.token_stats['prompt_tokens'] += count_tokens(full_prompt)
+    
+    def _generate(self, kind: str, prompt: str, context: str, full_prompt: str) -> str:
+        """Call Gemini unless the cache already has an answer for prompt and context"""
+        cached = self.cache.get(prompt, context, kind)
+        if cached is not None:
+            return cached
+        self._count_prompt(full_prompt)
         try:
-            full_prompt = f"{context}\n\n{prompt}" if context else prompt
             response = self.model.generate_content(full_prompt)
-            return response.text
+            return self.cache.put(prompt, context, response.text, kind)
         except Exception as e:
             return f"Error generating response: {str(e)}"
     
-    def parse_calendar_command(self, user_input: str, calendar_context: str) -> Dict[str, Any]:
-        """Parse user input to understand calendar intent"""
-        system_context = """You are a helpful calendar assistant. Analyze the user's request and determine:
-1. The action they want to perform (list, create, delete, update)
-2. Extract relevant details (date, time, event name, duration, etc.)
-3. Return a JSON response with this structure:
-{
-    "action": "list|create|delete|update",
-    "summary": "event title",
-    "start_time": "ISO datetime string",
-    "end_time": "ISO datetime string",
-    "description": "event description",
-    "confidence": "high|medium|low",
-    "clarification_needed": "question if details are unclear"
-}
-
-Current calendar context:
-""" + calendar_context
+    async def _generate_async(self, kind: str, prompt: str, context: str,
+                              full_prompt: str) -> str:
+        """Async counterpart of _generate"""
+        cached = self.cache.get(prompt, context, kind)
+        if cached is not None:
+            return cached
+        self._count_prompt(full_prompt)
+        try:
+            response = await self.model.generate_content_async(full_prompt)
+            return self.cache.put(prompt, context, response.text, kind)
+        except Exception as e:
+            return f"Error generating response: {str(e)}"
+    
+    def generate_response(self, prompt: str, context: str = "") -> str:
+        """Generate a response using Gemini"""
+        full_prompt = f"{context}\n\n{prompt}" if context else prompt
+        return self._generate('answer', prompt, context, full_prompt)
+    
+    async def generate_response_async(self, prompt: str, context: str = "") -> str:
+        """Generate a response using Gemini without blocking the event loop"""
+        full_prompt = f"{context}\n\n{prompt}" if context else prompt
+        return await self._generate_async('answer', prompt, context, full_prompt)
+    
+    def generate_response_stream(self, prompt: str, context: str = "") -> Iterator[str]:
+        """Generate a response using Gemini, yielding text as it is produced"""
+        cached = self.cache.get(prompt, context, 'answer')
+        if cached is not None:
+            yield cached
+            return
         
-        prompt = f"{system_context}\n\nUser request: {user_input}\n\nProvide your analysis as JSON only, no additional text."
+        full_prompt = f"{context}\n\n{prompt}" if context else prompt
+        self._count_prompt(full_prompt)
+        chunks = []
+        try:
+            for chunk in self.model.generate_content(full_prompt, stream=True):
+                if chunk.text:
+                    chunks.append(chunk.text)
+                    yield chunk.text
+        except Exception as e:
+            yield f"Error generating response: {str(e)}"
+            return
+        self.cache.put(prompt, context, ''.join(chunks), 'answer')
+    
+    async def generate_response_stream_async(self, prompt: str,
+                                             context: str = "") -> AsyncIterator[str]:
+        """Async counterpart of generate_response_stream"""
+        cached = self.cache.get(prompt, context, 'answer')
+        if cached is not None:
+            yield cached
+            return
+        
+        full_prompt = f"{context}\n\n{prompt}" if context else prompt
+        self._count_prompt(full_prompt)
+        chunks = []
+        try:
+            response = await self.model.generate_content_async(full_prompt, stream=True)
+            async for chunk in response:
+                if chunk.text:
+                    chunks.append(chunk.text)
+                    yield chunk.text
+        except Exception as e:
+            yield f"Error generating response: {str(e)}"
+            return
+        self.cache.put(prompt, context, ''.join(chunks), 'answer')
+    
+    def _command_prompt(self, user_input: str, calendar_context: str) -> str:
+        """Build the intent-extraction prompt"""
+        return (f"{COMMAND_INSTRUCTIONS}{calendar_context or '(not provided)'}\n\n"
+                f"User request: {user_input}\n\n"
+                "Provide your analysis as JSON only, no additional text.")
+    
+    def _tool_prompt(self, user_input: str, calendar_context: str) -> str:
+        """Build the function-calling prompt; the schema lives in the tool declarations"""
+        return (f"{TOOL_INSTRUCTIONS}{calendar_context or '(not provided)'}\n\n"
+                f"User request: {user_input}")
+    
+    def _read_tool_call(self, response) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Validate the function call in a response
         
-        response = self.generate_response(prompt)
+        Returns the intent, or None and a note telling the model what to fix.
+        """
+        try:
+            call = first_function_call(response)
+        except (AttributeError, ValueError):
+            call = None
+        if call is None:
+            return None, "Reply with a call to one of the declared functions."
+        name, args = call
+        args, errors = validate_call(name, args)
+        if errors:
+            return None, (f"Your call to {name} was invalid: {'; '.join(errors)}. "
+                          "Call it again with corrected arguments.")
+        return call_to_intent(name, args), ""
+    
+    def _parse_failed(self) -> Dict[str, Any]:
+        self.parse_stats['failures'] += 1
+        return {"action": "unknown", "confidence": "low",
+                "clarification_needed": "Could not understand the request"}
+    
+    def _parse_with_tools(self, user_input: str, calendar_context: str) -> Dict[str, Any]:
+        """Parse a command as a validated function call, re-asking once if invalid"""
+        self.parse_stats['parses'] += 1
+        cached = self.cache.get(user_input, calendar_context, 'tool_command')
+        if cached is not None:
+            return json.loads(cached)
         
+        prompt = self._tool_prompt(user_input, calendar_context)
+        for attempt in range(TOOL_ATTEMPTS):
+            if attempt:
+                self.parse_stats['retries'] += 1
+            self._count_prompt(prompt)
+            try:
+                response = self.model.generate_content(prompt, tools=CALENDAR_TOOLS,
+                                                       tool_config=TOOL_CONFIG)
+            except Exception as e:
+                print(f"An error occurred: {e}")
+                break
+            intent, problem = self._read_tool_call(response)
+            if intent is not None:
+                self.cache.put(user_input, calendar_context, json.dumps(intent), 'tool_command')
+                return intent
+            prompt = f"{prompt}\n\n{problem}"
+        return self._parse_failed()
+    
+    async def _parse_with_tools_async(self, user_input: str,
+                                      calendar_context: str) -> Dict[str, Any]:
+        """Async counterpart of _parse_with_tools"""
+        self.parse_stats['parses'] += 1
+        cached = self.cache.get(user_input, calendar_context, 'tool_command')
+        if cached is not None:
+            return json.loads(cached)
+        
+        prompt = self._tool_prompt(user_input, calendar_context)
+        for attempt in range(TOOL_ATTEMPTS):
+            if attempt:
+                self.parse_stats['retries'] += 1
+            self._count_prompt(prompt)
+            try:
+                response = await self.model.generate_content_async(
+                    prompt, tools=CALENDAR_TOOLS, tool_config=TOOL_CONFIG)
+            except Exception as e:
+                print(f"An error occurred: {e}")
+                break
+            intent, problem = self._read_tool_call(response)
+            if intent is not None:
+                self.cache.put(user_input, calendar_context, json.dumps(intent), 'tool_command')
+                return intent
+            prompt = f"{prompt}\n\n{problem}"
+        return self._parse_failed()
+    
+    def parse_calendar_command(self, user_input: str, calendar_context: str) -> Dict[str, Any]:
+        """Parse user input to understand calendar intent"""
+        if self.function_calling:
+            return self._parse_with_tools(user_input, calendar_context)
+        self.parse_stats['parses'] += 1
+        response = self._generate('command', user_input, calendar_context,
+                                  self._command_prompt(user_input, calendar_context))
+        return self._extract_command(response)
+    
+    async def parse_calendar_command_async(self, user_input: str,
+                                           calendar_context: str) -> Dict[str, Any]:
+        """Parse user input to understand calendar intent without blocking"""
+        if self.function_calling:
+            return await self._parse_with_tools_async(user_input, calendar_context)
+        self.parse_stats['parses'] += 1
+        response = await self._generate_async(
+            'command', user_input, calendar_context,
+            self._command_prompt(user_input, calendar_context))
+        return self._extract_command(response)
+    
+    def _extract_command(self, response: str) -> Dict[str, Any]:
+        """Pull the intent JSON out of a model response"""
         # Try to extract JSON from response
         try:
             # Find JSON in the response
@@ -212,20 +1535,86 @@ Current calendar context:
                 json_str = response[start:end]
                 return json.loads(json_str)
             else:
-                return {"action": "unknown", "confidence": "low", 
-                       "clarification_needed": "Could not understand the request"}
+                return self._parse_failed()
         except json.JSONDecodeError:
+            self.parse_stats['failures'] += 1
             return {"action": "unknown", "confidence": "low",
                    "clarification_needed": "Could not parse the request"}
 
 
+class CalendarSnapshot:
+    """Request-scoped view of the upcoming event window
+    
+    The window is fetched once when the snapshot is taken; the formatted
+    text is built on first use and then shared by every handler that needs
+    it during the same query.
+    """
+    
+    def __init__(self, events: List[Dict[str, Any]], formatter, timezone: Optional[str] = None,
+                 builder: Optional[ContextBuilder] = None):
+        self.events = events
+        self.taken_at = datetime.utcnow()
+        self.timezone = timezone
+        self._formatter = formatter
+        self._builder = builder
+        self._formatted: Optional[str] = None
+        self._context: Optional[str] = None
+        self._resolver: Optional[DateTimeResolver] = None
+    
+    @property
+    def formatted(self) -> str:
+        """Event list rendered for display"""
+        if self._formatted is None:
+            self._formatted = self._formatter(self.events)
+        return self._formatted
+    
+    @property
+    def context(self) -> str:
+        """Event list rendered as compact AI context"""
+        if self._context is None:
+            if self._builder is None:
+                self._context = f"Upcoming events:\n{self.formatted}"
+            else:
+                self._context = self._builder.build(self.events, self.resolver.tz,
+                                                    self.resolver.now)
+        return self._context
+    
+    @property
+    def resolver(self) -> DateTimeResolver:
+        """Date/time resolver anchored to this request's clock and timezone"""
+        if self._resolver is None:
+            self._resolver = DateTimeResolver(self.timezone)
+        return self._resolver
+
+
 class CalendarChatAgent:
     """Main chat agent that coordinates calendar and AI operations"""
     
-    def __init__(self, gemini_api_key: str):
-        self.calendar = CalendarService()
-        self.ai = GeminiAgent(gemini_api_key)
+    def __init__(self, gemini_api_key: str, calendar: Optional[CalendarService] = None,
+                 ai: Optional[GeminiAgent] = None, pipelined: bool = PIPELINED):
+        self.calendar = calendar or CalendarService()
+        self.ai = ai or GeminiAgent(gemini_api_key)
         self.conversation_history = []
+        self.pipelined = pipelined
+        self.intent_stats = {'rules': 0, 'llm': 0}
+        self._async_calendar = None
+        self.aliases = EventAliases()
+        self.context_builder = ContextBuilder(self.aliases, CONTEXT_TOKEN_BUDGET)
+        # Mirror and cache versions as of the last export_state()
+        self._exported: Dict[str, int] = {}
+        # Last AgentRegistry.mark_stale() time seen in restore_state()
+        self._calendar_changed = 0.0
+        
+        # Wakes the page's event stream when the calendar changes
+        self.event_feed = EventFeed()
+        
+        # Any write to this user's calendar makes their cached answers stale
+        cache = getattr(self.ai, 'cache', None)
+        mirror = getattr(self.calendar, 'mirror', None)
+        if cache is not None and mirror is not None:
+            mirror.listeners.append(cache.invalidate)
+        if mirror is not None:
+            mirror.listeners.append(self.event_feed.notify)
     
     def format_events(self, events: List[Dict[str, Any]]) -> str:
         """Format events for display and AI context"""
@@ -241,41 +1630,355 @@ class CalendarChatAgent:
         
         return "\n".join(formatted)
     
-    def get_calendar_context(self) -> str:
+    def take_snapshot(self, max_results: int = 10, projection: str = 'context',
+                      max_age: float = 0.0) -> CalendarSnapshot:
+        """Fetch the upcoming event window once for the current request"""
+        events = self.calendar.list_events(max_results=max_results, projection=projection,
+                                           max_age=max_age)
+        return CalendarSnapshot(events, self.format_events, self.calendar.timezone(),
+                                self.context_builder)
+    
+    def get_calendar_context(self, snapshot: Optional[CalendarSnapshot] = None) -> str:
         """Get current calendar state for AI context"""
-        events = self.calendar.list_events(max_results=10)
-        return f"Upcoming events:\n{self.format_events(events)}"
+        if snapshot is None:
+            snapshot = self.take_snapshot()
+        return snapshot.context
     
-    def process_query(self, user_input: str) -> str:
-        """Process user query and execute appropriate action"""
+    def _resolve_event_ids(self, ids: List[str], snapshot: CalendarSnapshot) -> List[str]:
+        """Expand the shortened IDs shown in the context to full event IDs"""
+        resolved = []
+        for short_id in ids:
+            short_id = str(short_id).rstrip('.')
+            if not short_id:
+                continue
+            # Aliases from the compact context map straight to an event
+            alias_target = self.aliases.resolve(short_id)
+            if alias_target:
+                resolved.append(alias_target)
+                continue
+            by_id = [e['id'] for e in snapshot.events if e.get('id', '').startswith(short_id)]
+            # Without calendar context, events are named by title instead
+            by_title = [e['id'] for e in snapshot.events
+                        if e.get('summary', '').lower() == short_id.lower()]
+            partial = [e['id'] for e in snapshot.events
+                       if short_id.lower() in e.get('summary', '').lower()]
+            for matches in (by_id, by_title, partial):
+                if len(matches) == 1:
+                    resolved.append(matches[0])
+                    break
+        return resolved
+    
+    def _conflicts(self, start_time: datetime, end_time: datetime) -> List[Dict[str, Any]]:
+        """Events a new booking would overlap
+        
+        The request's snapshot has just synced the mirror, so this normally
+        makes no API call.
+        """
+        return self.calendar.conflicts(start_time, end_time, max_age=CONFLICT_MAX_AGE)
+    
+    def _conflict_warning(self, clashes: List[Dict[str, Any]], tz) -> str:
+        """Reply lines listing the events a booking overlaps, if any"""
+        if not clashes:
+            return ""
+        lines = ["\n⚠️ This overlaps with:"]
+        for event in clashes:
+            start = parse_event_time(event['start']).astimezone(tz)
+            lines.append(f"- {format_when(start)}: {event.get('summary', 'No title')}")
+        return "\n".join(lines)
+    
+    def _free_at(self, start_time: datetime, end_time: datetime,
+                 snapshot: CalendarSnapshot) -> str:
+        """Say whether one window is free, offering nearby times if it isn't"""
+        tz = snapshot.resolver.tz
+        when = f"{format_when(start_time)} – {end_time:%H:%M}"
+        clashes = self._conflicts(start_time, end_time)
+        if not clashes:
+            return f"✅ You're free {when}."
+        
+        lines = [f"❌ You're busy {when}:"]
+        for event in clashes:
+            start = parse_event_time(event['start']).astimezone(tz)
+            lines.append(f"- {format_when(start)}: {event.get('summary', 'No title')}")
+        day = start_time.date()
+        slots = self.calendar.find_free_slots(
+            day, day + timedelta(days=1), end_time - start_time, tz,
+            max_age=CONFLICT_MAX_AGE, workdays=range(7), not_before=snapshot.resolver.now,
+            prefer=start_time.time(), limit=3, per_day=3)
+        if slots:
+            lines.append("Open that day:")
+            lines += [f"- {format_when(start)} – {end:%H:%M}" for start, end in slots]
+        return "\n".join(lines)
+    
+    def find_time(self, parsed: Dict[str, Any], snapshot: CalendarSnapshot) -> str:
+        """Answer "find me an hour next week" or "am I free at 3?" without Gemini
+        
+        A time of day with no length, or a single time, asks whether that
+        window is free. Otherwise free slots are searched for within working
+        hours (or the part of the day or hour range asked about) over the
+        days named, the next week by default.
+        """
+        resolver = snapshot.resolver
+        phrase = (parsed.get('time') or '').strip().lower()
+        minutes = as_minutes(parsed.get('duration_minutes')) or 0
+        times = None if phrase in DAY_PARTS else resolver.resolve_time(phrase)
+        if times and (times[1] is None or not minutes):
+            window = resolver.resolve(parsed.get('date'), phrase, minutes or None)
+            if window:
+                return self._free_at(*window, snapshot)
+        
+        duration = timedelta(minutes=minutes) if minutes else DEFAULT_DURATION
+        options = {'not_before': resolver.now}
+        if phrase in DAY_PARTS:
+            options['working_hours'] = DAY_PARTS[phrase]
+        elif times and times[1]:
+            options['working_hours'] = times
+        elif times:
+            options['prefer'] = times[0]
+        first_day, end_day = resolver.resolve_range(parsed.get('date'))
+        if end_day - first_day == timedelta(days=1):
+            # A day asked for by name is searched even if it's a weekend
+            options['workdays'] = range(7)
+            span = f"on {first_day:%a %b %d}"
+        elif parsed.get('date') and resolver.resolve_range(None) != (first_day, end_day):
+            span = parsed['date']
+        else:
+            span = f"in the next {(end_day - first_day).days} days"
         
-        # Get current calendar context
-        context = self.get_calendar_context()
+        slots = self.calendar.find_free_slots(first_day, end_day, duration, resolver.tz,
+                                              max_age=CONFLICT_MAX_AGE, **options)
+        total = int(duration.total_seconds() // 60)
+        length = f"{total // 60}-hour" if total % 60 == 0 else f"{total}-minute"
+        if slots is None:
+            return "❌ Couldn't read your calendar to find free time"
+        if not slots:
+            return f"😕 No free {length} slot {span}."
+        lines = [f"📅 Free {length} slots {span}:"]
+        lines += [f"- {format_when(start)} – {end:%H:%M}" for start, end in slots]
+        return "\n".join(lines)
+    
+    def create_many(self, items: List[Dict[str, Any]],
+                    snapshot: Optional[CalendarSnapshot] = None) -> str:
+        """Create several events in one batched round trip"""
+        resolver = snapshot.resolver if snapshot else DateTimeResolver(self.calendar.timezone())
+        default_start = resolver.now.replace(second=0, microsecond=0) + timedelta(hours=1)
+        changes = []
+        for item in items:
+            start_time, end_time = (resolver.resolve_intent(item)
+                                    or (default_start, default_start + timedelta(hours=1)))
+            changes.append({
+                'summary': item.get('summary', 'New Event'),
+                'start_time': start_time,
+                'end_time': end_time,
+                'description': item.get('description', '')
+            })
         
-        # Simple command handling for common requests
-        user_input_lower = user_input.lower()
+        clashes = [self._conflicts(change['start_time'], change['end_time'])
+                   for change in changes]
+        results = self.calendar.create_events(changes)
+        lines = [f"✅ Created {sum(r['ok'] for r in results)} of {len(results)} events"]
+        for change, result, clash in zip(changes, results, clashes):
+            if result['ok']:
+                line = f"- {format_when(change['start_time'])}: {change['summary']}"
+                if clash:
+                    titles = ', '.join(event.get('summary', 'No title') for event in clash)
+                    line += f" (⚠️ overlaps {titles})"
+                lines.append(line)
+            else:
+                lines.append(f"- ❌ {change['summary']}: {result['error']}")
+        return "\n".join(lines)
+    
+    def delete_many(self, event_ids: List[str]) -> str:
+        """Delete several events in one batched round trip"""
+        results = self.calendar.delete_events(event_ids)
+        lines = [f"🗑️ Deleted {sum(r['ok'] for r in results)} of {len(results)} events"]
+        for result in results:
+            if not result['ok']:
+                lines.append(f"- ❌ {result['event_id'][:8]}...: {result['error']}")
+        return "\n".join(lines)
+    
+    def rule_intent(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """Parse the request locally, returning it only if the parse is confident"""
+        intent = parse_intent(user_input)
+        if intent['score'] >= CONFIDENCE_THRESHOLD:
+            return intent
+        return None
+    
+    def _list_days(self, day, days: int, snapshot: CalendarSnapshot) -> str:
+        """List the events on one or more resolved days"""
+        start = datetime.combine(day, datetime.min.time(), snapshot.resolver.tz)
+        events = self.calendar.list_events(max_results=50, time_min=start,
+                                           time_max=start + timedelta(days=days),
+                                           projection='context')
+        label = f"{day:%a %b %d}" if days == 1 else f"the week of {day:%a %b %d}"
+        if not events:
+            return f"You have no events for {label}."
+        return f"Here are your events for {label}:\n\n" + self.format_events(events)
+    
+    def _quick_answer(self, intent: Optional[Dict[str, Any]],
+                      snapshot: CalendarSnapshot) -> Optional[str]:
+        """Answer a confidently parsed request without calling Gemini"""
+        if intent is None:
+            return None
         
         # List events
-        if any(keyword in user_input_lower for keyword in ['list', 'show', 'what', 'upcoming', 'events']):
-            events = self.calendar.list_events(max_results=10)
-            if events:
-                response = "Here are your upcoming events:\n\n" + self.format_events(events)
+        if intent['action'] == 'list':
+            day = snapshot.resolver.resolve_date(intent.get('date'))
+            if day is not None:
+                days = 7 if intent['date'].lower() == 'next week' else 1
+                return self._list_days(day, days, snapshot)
+            if snapshot.events:
+                response = "Here are your upcoming events:\n\n" + snapshot.formatted
             else:
                 response = "You have no upcoming events."
             return response
+        return self._handle_intent(intent, snapshot)
+    
+    def _count_intent(self, source: str):
+        """Track how often Gemini had to parse the request"""
+        self.intent_stats[source] += 1
+    
+    def _remember(self, user_input: str, reply: str):
+        """Record a chat turn, keeping the last HISTORY_LIMIT"""
+        self.conversation_history.append({'user': user_input, 'assistant': reply})
+        del self.conversation_history[:-HISTORY_LIMIT]
+    
+    def export_state(self, changed_only: bool = False) -> Dict[str, Any]:
+        """JSON-serializable state parts another agent for this session can resume from
         
-        # For complex queries, use AI
-        parsed = self.ai.parse_calendar_command(user_input, context)
+        'conversation' is always included; 'mirror' (events and sync token)
+        and 'intent_cache' (parsed commands) only when they changed since the
+        last export if changed_only is set, since they are much larger.
+        """
+        parts = {'conversation': {
+            'conversation_history': list(self.conversation_history),
+            'intent_stats': dict(self.intent_stats),
+            'aliases': dict(self.aliases.by_id),
+        }}
+        mirror = getattr(self.calendar, 'mirror', None)
+        if mirror is not None and (not changed_only
+                                   or mirror.version != self._exported.get('mirror')):
+            self._exported['mirror'] = mirror.version
+            parts['mirror'] = mirror.export_state()
+        cache = getattr(self.ai, 'cache', None)
+        if cache is not None and (not changed_only
+                                  or cache.version != self._exported.get('intent_cache')):
+            self._exported['intent_cache'] = cache.version
+            parts['intent_cache'] = cache.export(INTENT_CACHE_KINDS)
+        return parts
+    
+    def restore_state(self, parts: Dict[str, Any]):
+        """Pick up where another agent for the same session left off"""
+        state = parts.get('conversation', {})
+        self.conversation_history = list(state.get('conversation_history', []))
+        self.intent_stats.update(state.get('intent_stats', {}))
+        self.aliases.load(state.get('aliases', {}))
+        
+        mirror = getattr(self.calendar, 'mirror', None)
+        if mirror is not None and parts.get('mirror'):
+            mirror.load_state(parts['mirror'])
+            self._exported['mirror'] = mirror.version
+        if mirror is not None and parts.get('calendar_changed', 0) > self._calendar_changed:
+            # A push notification reached a worker that couldn't sync this session
+            self._calendar_changed = parts['calendar_changed']
+            mirror.mark_stale()
+        cache = getattr(self.ai, 'cache', None)
+        if cache is not None and parts.get('intent_cache'):
+            cache.load(parts['intent_cache'])
+            self._exported['intent_cache'] = cache.version
+    
+    def token_report(self) -> Dict[str, float]:
+        """Gemini prompt tokens per chat message, counted locally"""
+        messages = sum(self.intent_stats.values())
+        stats = getattr(self.ai, 'token_stats', {'calls': 0, 'prompt_tokens': 0})
+        return {
+            'messages': messages,
+            'gemini_calls': stats['calls'],
+            'prompt_tokens': stats['prompt_tokens'],
+            'tokens_per_message': stats['prompt_tokens'] / max(messages, 1),
+        }
+    
+    def _events_at(self, parsed: Dict[str, Any], snapshot: CalendarSnapshot) -> List[str]:
+        """Find the one snapshot event starting at the intent's date and time
         
-        if parsed.get('action') == 'create':
+        Without a date, "delete my 3pm" means today's.
+        """
+        resolver = snapshot.resolver
+        times = resolver.resolve_time(parsed.get('time'))
+        if times is None:
+            return []
+        if parsed.get('date'):
+            day = resolver.resolve_date(parsed['date'])
+            if day is None:
+                return []
+        else:
+            day = resolver.today
+        matches = []
+        for event in snapshot.events:
+            if not event.get('start', {}).get('dateTime'):
+                continue
+            local = parse_event_time(event['start']).astimezone(resolver.tz)
+            if local.time() == times[0] and local.date() == day:
+                matches.append(event['id'])
+        return matches if len(matches) == 1 else []
+    
+    def _reschedule(self, event_id: str, parsed: Dict[str, Any],
+                    snapshot: CalendarSnapshot) -> Optional[str]:
+        """Move one event to the new times in an update intent"""
+        resolved = snapshot.resolver.resolve_intent(parsed)
+        if resolved is None:
+            return None
+        start_time, end_time = resolved
+        current = next((e for e in snapshot.events if e.get('id') == event_id), {})
+        if (not parsed.get('end_time') and not as_minutes(parsed.get('duration_minutes'))
+                and current.get('start', {}).get('dateTime')
+                and current.get('end', {}).get('dateTime')):
+            # A plain "move it to 3pm" keeps the event's length
+            end_time = start_time + (parse_event_time(current['end'])
+                                     - parse_event_time(current['start']))
+        
+        event = self.calendar.update_event(event_id, start=event_time(start_time),
+                                           end=event_time(end_time))
+        if event:
+            summary = event.get('summary', current.get('summary', 'event'))
+            return (f"✅ Moved event: {summary}\nStart: {format_when(start_time)}\n"
+                    f"End: {format_when(end_time)}")
+        return "❌ Failed to update event"
+    
+    def _handle_intent(self, parsed: Dict[str, Any], snapshot: CalendarSnapshot) -> Optional[str]:
+        """Carry out a parsed intent; None means fall back to conversation"""
+        action = parsed.get('action')
+        if action == 'find_time':
+            return self.find_time(parsed, snapshot)
+        if action == 'create' and len(parsed.get('events') or []) > 1:
+            return self.create_many(parsed['events'], snapshot)
+        
+        if action in ('delete', 'update'):
+            event_ids = self._resolve_event_ids(parsed.get('event_ids') or [], snapshot)
+            if not event_ids and parsed.get('source') == 'rules':
+                # "delete my 3pm" names the event by when it starts
+                event_ids = self._events_at(parsed, snapshot)
+            if event_ids and action == 'delete':
+                return self.delete_many(event_ids)
+            if len(event_ids) == 1:
+                reply = self._reschedule(event_ids[0], parsed, snapshot)
+                if reply:
+                    return reply
+        
+        if action == 'create':
             # Handle event creation
             try:
-                # Extract datetime - simplified version
-                # In production, you'd want more robust parsing
-                summary = parsed.get('summary', 'New Event')
-                # Default to 1 hour from now
-                start_time = datetime.utcnow() + timedelta(hours=1)
-                end_time = start_time + timedelta(hours=1)
+                summary = parsed.get('summary') or 'New Event'
+                resolved = snapshot.resolver.resolve_intent(parsed)
+                if resolved is None and parsed.get('date'):
+                    return f"🤔 What time on {parsed['date']} should I schedule {summary}?"
+                if resolved is None:
+                    # Default to 1 hour from now
+                    start_time = (snapshot.resolver.now.replace(second=0, microsecond=0)
+                                  + timedelta(hours=1))
+                    resolved = start_time, start_time + timedelta(hours=1)
+                start_time, end_time = resolved
+                # Checked against the mirror before booking, at no API cost
+                clashes = self._conflicts(start_time, end_time)
                 
                 event = self.calendar.create_event(
                     summary=summary,
@@ -285,7 +1988,9 @@ class CalendarChatAgent:
                 )
                 
                 if event:
-                    return f"✅ Created event: {summary}\nStart: {start_time}\nEnd: {end_time}"
+                    return (f"✅ Created event: {summary}\nStart: {format_when(start_time)}\n"
+                            f"End: {format_when(end_time)}"
+                            + self._conflict_warning(clashes, snapshot.resolver.tz))
                 else:
                     return "❌ Failed to create event"
             except Exception as e:
@@ -294,14 +1999,177 @@ class CalendarChatAgent:
         # If we need clarification or can't determine action
         if parsed.get('clarification_needed'):
             return f"🤔 {parsed['clarification_needed']}"
+        return None
+    
+    def _conversation_context(self, context: str) -> str:
+        """Context for free-form answers"""
+        return ("You are a calendar assistant. Refer to events by title, not by their "
+                f"e-numbers. Here's the current calendar:\n{context}")
+    
+    def _route(self, user_input: str,
+               snapshot: Optional[CalendarSnapshot] = None) -> Tuple[Optional[str], str]:
+        """Handle a query up to, but not including, a free-form Gemini answer
         
-        # Use AI for general conversation
-        ai_response = self.ai.generate_response(
-            user_input,
-            context=f"You are a calendar assistant. Here's the current calendar:\n{context}"
-        )
+        Returns the reply when a command or quick answer settled it, or None
+        and the context for a conversational reply.
+        """
+        intent = self.rule_intent(user_input)
+        if self.pipelined and snapshot is None and intent is None:
+            return self._route_pipelined(user_input)
+        
+        # Fetch the event window once and share it with every handler below
+        if snapshot is None:
+            snapshot = self.take_snapshot()
+        context = self.get_calendar_context(snapshot)
+        
+        # Unambiguous commands are handled without Gemini
+        answer = self._quick_answer(intent, snapshot)
+        if answer is not None:
+            self._count_intent('rules')
+            return answer, ""
+        
+        # For complex queries, use AI
+        self._count_intent('llm')
+        parsed = self.ai.parse_calendar_command(user_input, context)
+        answer = self._handle_intent(parsed, snapshot)
+        if answer is not None:
+            return answer, ""
+        return None, self._conversation_context(context)
+    
+    def _route_pipelined(self, user_input: str) -> Tuple[Optional[str], str]:
+        """Fetch the calendar and classify the intent at the same time
+        
+        The intent is parsed without calendar context so it doesn't have to
+        wait for the fetch; the two are joined before any action runs, and
+        only the final conversational answer sees both.
+        """
+        pool = pipeline_pool()
+        snapshot_future = pool.submit(self.take_snapshot)
+        self._count_intent('llm')
+        parsed = self.ai.parse_calendar_command(user_input, "")
+        snapshot = snapshot_future.result()
         
-        return ai_response
+        answer = self._handle_intent(parsed, snapshot)
+        if answer is not None:
+            return answer, ""
+        return None, self._conversation_context(snapshot.context)
+    
+    def process_query(self, user_input: str,
+                      snapshot: Optional[CalendarSnapshot] = None) -> str:
+        """Process user query and execute appropriate action"""
+        answer, chat_context = self._route(user_input, snapshot)
+        if answer is None:
+            # Use AI for general conversation
+            answer = self.ai.generate_response(user_input, context=chat_context)
+        self._remember(user_input, answer)
+        return answer
+    
+    def process_query_stream(self, user_input: str,
+                             snapshot: Optional[CalendarSnapshot] = None) -> Iterator[str]:
+        """Like process_query, but yields a conversational answer as it streams in
+        
+        Commands and quick answers are complete before they are sent, so they
+        arrive as a single chunk.
+        """
+        answer, chat_context = self._route(user_input, snapshot)
+        if answer is not None:
+            self._remember(user_input, answer)
+            yield answer
+            return
+        chunks = []
+        for chunk in self.ai.generate_response_stream(user_input, context=chat_context):
+            chunks.append(chunk)
+            yield chunk
+        self._remember(user_input, ''.join(chunks))
+    
+    @property
+    def async_calendar(self):
+        """Non-blocking client sharing this agent's credentials and event mirror"""
+        if self._async_calendar is None:
+            # httpx is only needed by the async pipeline
+            from async_calendar import AsyncCalendarService
+            self._async_calendar = AsyncCalendarService(self.calendar)
+        return self._async_calendar
+    
+    async def aclose(self):
+        """Close the non-blocking client, if one was opened"""
+        if self._async_calendar is not None:
+            calendar, self._async_calendar = self._async_calendar, None
+            await calendar.aclose()
+    
+    async def take_snapshot_async(self, max_results: int = 10, projection: str = 'context',
+                                  max_age: float = 0.0) -> CalendarSnapshot:
+        """Fetch the upcoming event window without blocking the event loop"""
+        events = await self.async_calendar.list_events(
+            max_results=max_results, projection=projection, max_age=max_age)
+        return CalendarSnapshot(events, self.format_events,
+                                await self.async_calendar.timezone(), self.context_builder)
+    
+    async def process_query_async(self, user_input: str,
+                                  snapshot: Optional[CalendarSnapshot] = None) -> str:
+        """Async counterpart of process_query for asyncio-based servers
+        
+        Calendar reads and Gemini calls are awaited, so one event loop can
+        serve many chats, and cancelling the task cancels in-flight requests.
+        Writes are rare and go through the blocking client on a worker thread.
+        """
+        answer = await self._answer_async(user_input, snapshot)
+        self._remember(user_input, answer)
+        return answer
+    
+    async def process_query_stream_async(self, user_input: str,
+                                         snapshot: Optional[CalendarSnapshot] = None
+                                         ) -> AsyncIterator[str]:
+        """Async counterpart of process_query_stream"""
+        answer, chat_context = await self._route_async(user_input, snapshot)
+        if answer is not None:
+            self._remember(user_input, answer)
+            yield answer
+            return
+        chunks = []
+        async for chunk in self.ai.generate_response_stream_async(user_input,
+                                                                  context=chat_context):
+            chunks.append(chunk)
+            yield chunk
+        self._remember(user_input, ''.join(chunks))
+    
+    async def _answer_async(self, user_input: str,
+                            snapshot: Optional[CalendarSnapshot] = None) -> str:
+        """process_query_async without recording the turn"""
+        answer, chat_context = await self._route_async(user_input, snapshot)
+        if answer is not None:
+            return answer
+        return await self.ai.generate_response_async(user_input, context=chat_context)
+    
+    async def _route_async(self, user_input: str, snapshot: Optional[CalendarSnapshot] = None
+                           ) -> Tuple[Optional[str], str]:
+        """Async counterpart of _route"""
+        intent = self.rule_intent(user_input)
+        if self.pipelined and snapshot is None and intent is None:
+            # Overlap the calendar fetch with context-free intent parsing
+            self._count_intent('llm')
+            snapshot, parsed = await asyncio.gather(
+                self.take_snapshot_async(),
+                self.ai.parse_calendar_command_async(user_input, "")
+            )
+            context = self.get_calendar_context(snapshot)
+        else:
+            if snapshot is None:
+                snapshot = await self.take_snapshot_async()
+            context = self.get_calendar_context(snapshot)
+            
+            answer = await asyncio.to_thread(self._quick_answer, intent, snapshot)
+            if answer is not None:
+                self._count_intent('rules')
+                return answer, ""
+            
+            self._count_intent('llm')
+            parsed = await self.ai.parse_calendar_command_async(user_input, context)
+        # Writes go through the blocking client in a thread
+        answer = await asyncio.to_thread(self._handle_intent, parsed, snapshot)
+        if answer is not None:
+            return answer, ""
+        return None, self._conversation_context(context)
     
     def start_chat(self):
         """Start interactive chat session"""
@@ -0,0 +1,201 @@
+"""
+Calendar function declarations for Gemini function calling
+The model picks one of these operations and fills in typed arguments, which
+are validated here and turned into the same intent dicts the JSON prompt
+produces
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+
+_TIME_HINT = "Date and time exactly as the user wrote them, e.g. 'next Tue 3pm'"
+
+_EVENT_PROPERTIES = {
+    'summary': {'type': 'string', 'description': "Event title"},
+    'start_time': {'type': 'string', 'description': _TIME_HINT},
+    'end_time': {'type': 'string', 'description': "End time as the user wrote it, if given"},
+    'duration_minutes': {'type': 'integer', 'description': "Length, if given instead of an end"},
+    'description': {'type': 'string', 'description': "Extra notes for the event"},
+}
+
+FUNCTION_DECLARATIONS = [
+    {
+        'name': 'list_events',
+        'description': "Show the user's events, optionally for one day",
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'date': {'type': 'string', 'description': "Day as the user wrote it, if any"},
+            },
+        },
+    },
+    {
+        'name': 'create_events',
+        'description': "Create one or more calendar events",
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'events': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': _EVENT_PROPERTIES,
+                        'required': ['summary'],
+                    },
+                },
+            },
+            'required': ['events'],
+        },
+    },
+    {
+        'name': 'delete_events',
+        'description': "Delete events, named by the IDs shown in the calendar context "
+                       "(e.g. e3) or by their titles",
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'event_ids': {'type': 'array', 'items': {'type': 'string'}},
+            },
+            'required': ['event_ids'],
+        },
+    },
+    {
+        'name': 'update_event',
+        'description': "Move an existing event to a new time",
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'event_id': {'type': 'string', 'description': "ID from the context, or title"},
+                'start_time': {'type': 'string', 'description': "New start. " + _TIME_HINT},
+                'end_time': {'type': 'string', 'description': "New end, if given"},
+                'duration_minutes': {'type': 'integer'},
+            },
+            'required': ['event_id', 'start_time'],
+        },
+    },
+    {
+        'name': 'find_free_time',
+        'description': "Find open time in the user's calendar, or check whether they are "
+                       "free at a given time",
+        'parameters': {
+            'type': 'object',
+            'properties': {
+                'range': {'type': 'string', 'description': "Days to search as the user wrote "
+                                                           "them, e.g. 'next week', 'Friday'"},
+                'time': {'type': 'string', 'description': "Time of day or hour range, if "
+                                                          "given, e.g. 'afternoon', '2-4pm'"},
+                'duration_minutes': {'type': 'integer', 'description': "Meeting length"},
+            },
+        },
+    },
+    {
+        'name': 'ask_clarification',
+        'description': "Ask the user for missing details before changing the calendar",
+        'parameters': {
+            'type': 'object',
+            'properties': {'question': {'type': 'string'}},
+            'required': ['question'],
+        },
+    },
+    {
+        'name': 'no_calendar_action',
+        'description': "The message is a question or chat that needs no calendar change",
+        'parameters': {'type': 'object', 'properties': {}},
+    },
+]
+
+CALENDAR_TOOLS = [{'function_declarations': FUNCTION_DECLARATIONS}]
+SCHEMAS = {declaration['name']: declaration['parameters']
+           for declaration in FUNCTION_DECLARATIONS}
+
+# Force a function call so there is never prose to scrape
+TOOL_CONFIG = {'function_calling_config': {'mode': 'ANY'}}
+
+
+def _check(value: Any, schema: Dict[str, Any], path: str, errors: List[str]) -> Any:
+    """Validate one value against a schema, returning it with numbers coerced"""
+    expected = schema['type']
+    if expected == 'string':
+        if not isinstance(value, str):
+            errors.append(f"{path} must be a string")
+        elif 'enum' in schema and value not in schema['enum']:
+            errors.append(f"{path} must be one of {schema['enum']}")
+        return value
+    if expected == 'integer':
+        # Function call arguments arrive as floats
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value != int(value):
+            errors.append(f"{path} must be a whole number")
+            return value
+        return int(value)
+    if expected == 'array':
+        if not isinstance(value, list):
+            errors.append(f"{path} must be a list")
+            return value
+        return [_check(item, schema['items'], f"{path}[{i}]", errors)
+                for i, item in enumerate(value)]
+    if expected == 'object':
+        if not isinstance(value, dict):
+            errors.append(f"{path} must be an object")
+            return value
+        properties = schema.get('properties', {})
+        for name in schema.get('required', []):
+            if value.get(name) in (None, '', []):
+                errors.append(f"{path}.{name} is required")
+        return {name: _check(item, properties[name], f"{path}.{name}", errors)
+                for name, item in value.items() if name in properties}
+    return value
+
+
+def validate_call(name: str, args: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """Check a function call against its declaration
+
+    Returns the cleaned arguments (unknown keys dropped, integers coerced)
+    and a list of problems, empty when the call is valid.
+    """
+    if name not in SCHEMAS:
+        return {}, [f"unknown function {name!r}"]
+    errors: List[str] = []
+    cleaned = _check(args or {}, SCHEMAS[name], name, errors)
+    return cleaned, errors
+
+
+def call_to_intent(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    """Translate a validated function call into an intent dict"""
+    if name == 'list_events':
+        return {'action': 'list', 'date': args.get('date'), 'confidence': 'high'}
+    if name == 'create_events':
+        events = args['events']
+        intent = dict(events[0], action='create', confidence='high')
+        if len(events) > 1:
+            intent['events'] = events
+        return intent
+    if name == 'delete_events':
+        return {'action': 'delete', 'event_ids': args['event_ids'], 'confidence': 'high'}
+    if name == 'update_event':
+        intent = {key: value for key, value in args.items() if key != 'event_id'}
+        return dict(intent, action='update', event_ids=[args['event_id']], confidence='high')
+    if name == 'find_free_time':
+        return {'action': 'find_time', 'date': args.get('range'), 'time': args.get('time'),
+                'duration_minutes': args.get('duration_minutes'), 'confidence': 'high'}
+    if name == 'ask_clarification':
+        return {'action': 'unknown', 'confidence': 'low',
+                'clarification_needed': args['question']}
+    return {'action': 'unknown', 'confidence': 'high'}
+
+
+def plain(value: Any) -> Any:
+    """Convert protobuf map and list wrappers from a FunctionCall into dicts and lists"""
+    if hasattr(value, 'items'):
+        return {key: plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)) or type(value).__name__ == 'RepeatedComposite':
+        return [plain(item) for item in value]
+    return value
+
+
+def first_function_call(response) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Name and arguments of the first function call in a model response"""
+    for candidate in getattr(response, 'candidates', None) or []:
+        for part in candidate.content.parts:
+            call = getattr(part, 'function_call', None)
+            if call and call.name:
+                return call.name, plain(call.args)
+    return None
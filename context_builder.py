@@ -0,0 +1,156 @@
+"""
+Compact calendar context for Gemini prompts
+Encodes the event window with relative day headers, local clock times and
+short stable aliases instead of raw ISO timestamps and event IDs, and keeps
+it under a token budget
+"""
+
+import itertools
+import math
+import re
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+# Default cap on tokens spent on calendar context per prompt
+DEFAULT_TOKEN_BUDGET = 400
+MAX_TITLE_LENGTH = 48
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Estimate prompt tokens locally, without a count_tokens API call
+
+    Words count one token per four characters, punctuation one each,
+    which tracks SentencePiece tokenizers closely enough for budgeting.
+    """
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _TOKEN_RE.findall(text))
+
+
+_MORE_COST = count_tokens("(+999 more later)")
+
+
+class EventAliases:
+    """Short, stable names ('e1', 'e2', ...) for event IDs shown to the model
+
+    An event keeps its alias for the lifetime of the agent, so references
+    in earlier turns still resolve after the window moves.
+    """
+
+    def __init__(self):
+        self.by_id: Dict[str, str] = {}
+        self.by_alias: Dict[str, str] = {}
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def alias(self, event_id: str) -> str:
+        """Alias for an event ID, assigning the next one on first sight"""
+        alias = self.by_id.get(event_id)
+        if alias is None:
+            with self._lock:
+                alias = self.by_id.get(event_id)
+                if alias is None:
+                    alias = f"e{next(self._counter)}"
+                    self.by_id[event_id] = alias
+                    self.by_alias[alias] = event_id
+        return alias
+
+    def load(self, by_id: Dict[str, str]):
+        """Restore saved aliases, continuing the numbering after them"""
+        with self._lock:
+            self.by_id.update(by_id)
+            self.by_alias.update({alias: event_id for event_id, alias in by_id.items()})
+            highest = max((int(alias[1:]) for alias in self.by_alias), default=0)
+            self._counter = itertools.count(highest + 1)
+
+    def resolve(self, alias: str) -> Optional[str]:
+        """Event ID behind an alias, if it is one"""
+        return self.by_alias.get(alias.strip().lower())
+
+
+class ContextBuilder:
+    """Renders events as compact, budgeted prompt context
+
+    Example:
+        Today is Thu Oct 15 (America/New_York)
+        Today:
+        e1 16:30-17:00 Standup
+        Tomorrow:
+        e2 all day Offsite
+        Tue Oct 20:
+        e3 12:00-13:30 Lunch with Sam
+    """
+
+    def __init__(self, aliases: EventAliases, budget: int = DEFAULT_TOKEN_BUDGET):
+        self.aliases = aliases
+        self.budget = budget
+
+    @staticmethod
+    def day_label(day, today) -> str:
+        """Relative name for a day: Today, Tomorrow, or a short date"""
+        offset = (day - today).days
+        if offset == 0:
+            return "Today"
+        if offset == 1:
+            return "Tomorrow"
+        if offset == -1:
+            return "Yesterday"
+        label = f"{day:%a %b} {day.day}"
+        return label if day.year == today.year else f"{label} {day.year}"
+
+    def _event_line(self, event: Dict[str, Any], start: datetime, end: datetime,
+                    all_day: bool) -> str:
+        """One event as 'alias time-range title'"""
+        title = ' '.join((event.get('summary') or 'No title').split())
+        if len(title) > MAX_TITLE_LENGTH:
+            title = title[:MAX_TITLE_LENGTH - 1] + "…"
+        if all_day:
+            days = (end.date() - start.date()).days
+            when = "all day" if days <= 1 else f"all day x{days}"
+        else:
+            when = f"{start:%H:%M}-{end:%H:%M}"
+            if end.date() != start.date():
+                when += f"+{(end.date() - start.date()).days}d"
+        return f"{self.aliases.alias(event.get('id', ''))} {when} {title}"
+
+    def build(self, events: List[Dict[str, Any]], tz, now: datetime) -> str:
+        """Render events (sorted by start) in the given timezone"""
+        # Date only, so the context (and cached answers) stay stable all day
+        header = f"Today is {now:%a %b} {now.day} ({getattr(tz, 'key', 'UTC')})"
+        if not events:
+            return f"{header}\nNo upcoming events."
+
+        lines = [header]
+        used = count_tokens(header)
+        current_day = None
+        for index, event in enumerate(events):
+            start, end, all_day = self._times(event, tz)
+            day_header = None
+            if start.date() != current_day:
+                day_header = self.day_label(start.date(), now.date()) + ":"
+            line = self._event_line(event, start, end, all_day)
+            cost = count_tokens(line) + (count_tokens(day_header) if day_header else 0)
+            # Keep room for the "more" line
+            if used + cost + _MORE_COST > self.budget and index > 0:
+                lines.append(f"(+{len(events) - index} more later)")
+                break
+            if day_header:
+                lines.append(day_header)
+                current_day = start.date()
+            lines.append(line)
+            used += cost
+        return "\n".join(lines)
+
+    @staticmethod
+    def _times(event: Dict[str, Any], tz):
+        """Local start, end and whether the event is all-day"""
+        start, end = event.get('start', {}), event.get('end', {})
+        if 'dateTime' in start:
+            return (datetime.fromisoformat(start['dateTime'].replace('Z', '+00:00')).astimezone(tz),
+                    datetime.fromisoformat(end['dateTime'].replace('Z', '+00:00')).astimezone(tz),
+                    False)
+        day = datetime.fromisoformat(start['date']).replace(tzinfo=tz)
+        last = (datetime.fromisoformat(end['date']).replace(tzinfo=tz)
+                if end.get('date') else day + timedelta(days=1))
+        return day, last, True
@@ -0,0 +1,357 @@
+"""
+Natural-language datetime resolver
+Turns date and time phrases ("next Tue", "3-4:30pm", "tomorrow at noon")
+and model-provided ISO strings into concrete, timezone-aware datetimes
+without another model call
+"""
+
+import re
+from datetime import datetime, date, time, timedelta, timezone, tzinfo
+from typing import Dict, Any, Optional, Tuple, Union
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from intent_parser import DATE_RE, TIME_RE, BARE_HOUR_RE, PART_OF_DAY_RE, DURATION_RE, \
+    parse_duration
+
+# Events without an explicit end or duration last this long
+DEFAULT_DURATION = timedelta(hours=1)
+# Days searched for free time when the request doesn't say
+DEFAULT_SEARCH_DAYS = 7
+
+WEEKDAYS = {
+    'mon': 0, 'monday': 0, 'tue': 1, 'tues': 1, 'tuesday': 1, 'wed': 2, 'wednesday': 2,
+    'thu': 3, 'thur': 3, 'thurs': 3, 'thursday': 3, 'fri': 4, 'friday': 4,
+    'sat': 5, 'saturday': 5, 'sun': 6, 'sunday': 6,
+}
+MONTHS = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3,
+    'apr': 4, 'april': 4, 'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
+    'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9, 'oct': 10, 'october': 10,
+    'nov': 11, 'november': 11, 'dec': 12, 'december': 12,
+}
+# Vague parts of the day map to a typical start time
+PARTS_OF_DAY = {'morning': time(9), 'afternoon': time(14), 'evening': time(18),
+                'tonight': time(19)}
+
+_CLOCK_RE = re.compile(
+    r'^(?:(?P<named>noon|midday|midnight)'
+    r'|(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<meridiem>am|pm|a\.m\.|p\.m\.)?)$',
+    re.IGNORECASE
+)
+_RANGE_SPLIT_RE = re.compile(r'\s*(?:-|–|\bto\b|\buntil\b|\btill\b)\s*', re.IGNORECASE)
+_MONTH_DAY_RE = re.compile(r'^(?P<month>[a-z]+)\.?\s+(?P<day>\d{1,2})(?:st|nd|rd|th)?'
+                           r'(?:,?\s+(?P<year>\d{4}))?$', re.IGNORECASE)
+_DAY_MONTH_RE = re.compile(r'^(?P<day>\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<month>[a-z]+)'
+                           r'(?:,?\s+(?P<year>\d{4}))?$', re.IGNORECASE)
+_ORDINAL_RE = re.compile(r'^the\s+(?P<day>\d{1,2})(?:st|nd|rd|th)?$', re.IGNORECASE)
+_SLASH_RE = re.compile(r'^(?P<month>\d{1,2})/(?P<day>\d{1,2})(?:/(?P<year>\d{2,4}))?$')
+_IN_DAYS_RE = re.compile(r'^in\s+(?P<days>\d+)\s+days?$', re.IGNORECASE)
+_WEEKDAY_RE = re.compile(r'^(?:(?P<which>this|next)\s+)?(?P<weekday>[a-z]+)$', re.IGNORECASE)
+_PERIOD_RE = re.compile(r'^(?P<which>this|next)\s+(?P<unit>week|month)$', re.IGNORECASE)
+_LEADING_NUMBER_RE = re.compile(r'^\s*\d+(?:\.\d+)?')
+_NEXT_DAYS_RE = re.compile(r'^(?:in\s+|over\s+|within\s+)?the\s+next\s+'
+                           r'(?P<count>\d+|a|two|three|four)\s+(?P<unit>days?|weeks?|months?)$',
+                           re.IGNORECASE)
+_COUNT_WORDS = {'a': 1, 'two': 2, 'three': 3, 'four': 4}
+
+
+def as_minutes(value: Any) -> Optional[int]:
+    """A duration in minutes from a model reply, which may be a number or a string
+
+    Strings may be "90", "1.5", "90 min" or "an hour"; a leading number
+    without a unit is read as minutes.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(round(value))
+    if not isinstance(value, str):
+        return None
+    duration = DURATION_RE.search(value)
+    if duration:
+        return parse_duration(duration.group('amount'), duration.group('unit'))
+    number = _LEADING_NUMBER_RE.match(value)
+    return int(round(float(number.group(0)))) if number else None
+
+
+def load_timezone(name: Optional[Union[str, tzinfo]]) -> tzinfo:
+    """Look up a timezone by IANA name, falling back to UTC"""
+    if isinstance(name, tzinfo):
+        return name
+    try:
+        return ZoneInfo(name) if name else timezone.utc
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+class DateTimeResolver:
+    """Resolves date and time phrases against one request's clock and timezone
+
+    Relative anchors (today, the current week, the parsed result of each
+    phrase) are computed once and cached on the instance, so create one
+    resolver per request and reuse it for every phrase in that request.
+    """
+
+    def __init__(self, tz: Optional[Union[str, tzinfo]] = None, now: Optional[datetime] = None):
+        self.tz = load_timezone(tz)
+        if now is None:
+            now = datetime.now(self.tz)
+        elif now.tzinfo is None:
+            now = now.replace(tzinfo=self.tz)
+        self.now = now.astimezone(self.tz)
+        self.today = self.now.date()
+        self.week_start = self.today - timedelta(days=self.today.weekday())
+        self._dates: Dict[str, Optional[date]] = {}
+        self._times: Dict[str, Optional[Tuple[time, Optional[time]]]] = {}
+
+    def resolve_date(self, phrase: Optional[str]) -> Optional[date]:
+        """Resolve a date phrase such as 'tomorrow', 'next tue' or 'Oct 3'"""
+        if not phrase:
+            return None
+        key = re.sub(r'\s+', ' ', phrase.strip().lower())
+        if key not in self._dates:
+            self._dates[key] = self._resolve_date(key)
+        return self._dates[key]
+
+    def _resolve_date(self, phrase: str) -> Optional[date]:
+        if phrase in ('today', 'tonight'):
+            return self.today
+        if phrase in ('tomorrow', 'tmrw'):
+            return self.today + timedelta(days=1)
+        if phrase.endswith('day after tomorrow'):
+            return self.today + timedelta(days=2)
+        if phrase == 'next week':
+            return self.week_start + timedelta(weeks=1)
+
+        match = _IN_DAYS_RE.match(phrase)
+        if match:
+            return self.today + timedelta(days=int(match.group('days')))
+
+        match = _WEEKDAY_RE.match(phrase)
+        if match and match.group('weekday') in WEEKDAYS:
+            weekday = WEEKDAYS[match.group('weekday')]
+            if match.group('which') == 'next':
+                # "next Tue" is the Tuesday of next week
+                return self.week_start + timedelta(weeks=1, days=weekday)
+            # A bare weekday is the nearest one from today on
+            return self.today + timedelta(days=(weekday - self.today.weekday()) % 7)
+
+        try:
+            return date.fromisoformat(phrase)
+        except ValueError:
+            pass
+
+        for pattern in (_MONTH_DAY_RE, _DAY_MONTH_RE):
+            match = pattern.match(phrase)
+            if match and match.group('month') in MONTHS:
+                return self._upcoming(MONTHS[match.group('month')], int(match.group('day')),
+                                      match.group('year'))
+
+        match = _SLASH_RE.match(phrase)
+        if match:
+            return self._upcoming(int(match.group('month')), int(match.group('day')),
+                                  match.group('year'))
+
+        match = _ORDINAL_RE.match(phrase)
+        if match:
+            day = int(match.group('day'))
+            month, year = self.today.month, self.today.year
+            if day < self.today.day:
+                month, year = (1, year + 1) if month == 12 else (month + 1, year)
+            return self._safe_date(year, month, day)
+        return None
+
+    def _upcoming(self, month: int, day: int, year: Optional[str]) -> Optional[date]:
+        """A month/day in the given year, or the next one that hasn't passed"""
+        if year:
+            year = int(year)
+            return self._safe_date(year + 2000 if year < 100 else year, month, day)
+        resolved = self._safe_date(self.today.year, month, day)
+        if resolved and resolved < self.today:
+            resolved = self._safe_date(self.today.year + 1, month, day)
+        return resolved
+
+    def resolve_range(self, phrase: Optional[str]) -> Tuple[date, date]:
+        """Days to search for free time, as [first, last + 1)
+
+        Understands 'this week', 'next month', 'the next 2 weeks' and any
+        single day resolve_date() knows; 'next week' is Monday to Sunday.
+        Anything else means the next DEFAULT_SEARCH_DAYS days.
+        """
+        key = re.sub(r'\s+', ' ', (phrase or '').strip().lower())
+        match = _PERIOD_RE.match(key)
+        if match and match.group('unit') == 'week':
+            start = self.week_start + timedelta(weeks=1 if match.group('which') == 'next' else 0)
+            return max(start, self.today), start + timedelta(weeks=1)
+        if match:
+            first = self.today.replace(day=1)
+            if match.group('which') == 'next':
+                first = (first + timedelta(days=32)).replace(day=1)
+            return max(first, self.today), (first + timedelta(days=32)).replace(day=1)
+        match = _NEXT_DAYS_RE.match(key)
+        if match:
+            count = match.group('count')
+            count = int(count) if count.isdigit() else _COUNT_WORDS[count]
+            days = count * {'d': 1, 'w': 7, 'm': 30}[match.group('unit')[0]]
+            return self.today, self.today + timedelta(days=days)
+        day = self.resolve_date(key)
+        if day is not None:
+            return day, day + timedelta(days=1)
+        return self.today, self.today + timedelta(days=DEFAULT_SEARCH_DAYS)
+
+    @staticmethod
+    def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+        try:
+            return date(year, month, day)
+        except ValueError:
+            return None
+
+    def resolve_time(self, phrase: Optional[str]) -> Optional[Tuple[time, Optional[time]]]:
+        """Resolve a time or time range such as '3pm', 'noon' or '3-4:30pm'"""
+        if not phrase:
+            return None
+        key = re.sub(r'\s+', ' ', phrase.strip().lower())
+        if key not in self._times:
+            self._times[key] = self._resolve_time(key)
+        return self._times[key]
+
+    def _resolve_time(self, phrase: str) -> Optional[Tuple[time, Optional[time]]]:
+        if phrase in PARTS_OF_DAY:
+            return PARTS_OF_DAY[phrase], None
+
+        parts = _RANGE_SPLIT_RE.split(phrase, maxsplit=1)
+        clocks = [_CLOCK_RE.match(part) for part in parts]
+        if not all(clocks):
+            return None
+
+        if len(clocks) == 1:
+            return self._clock(clocks[0]), None
+
+        end_meridiem = clocks[1].group('meridiem')
+        end = self._clock(clocks[1])
+        start = self._clock(clocks[0], default_meridiem=end_meridiem)
+        if start > end and clocks[0].group('meridiem') is None and end_meridiem:
+            # "11-1pm" starts in the morning
+            start = self._clock(clocks[0], default_meridiem='am')
+        return start, end
+
+    @staticmethod
+    def _clock(match, default_meridiem: Optional[str] = None) -> time:
+        """Convert one clock reading to a time, guessing am/pm for bare hours"""
+        named = match.group('named')
+        if named:
+            return time(0) if named == 'midnight' else time(12)
+
+        hour = int(match.group('hour')) % 24
+        minute = int(match.group('minute') or 0)
+        meridiem = (match.group('meridiem') or default_meridiem or '').replace('.', '')
+        if meridiem == 'pm' and hour < 12:
+            hour += 12
+        elif meridiem == 'am' and hour == 12:
+            hour = 0
+        elif not meridiem and not match.group('minute') and 1 <= hour <= 7:
+            # A bare "at 3" almost always means the afternoon
+            hour += 12
+        return time(hour, min(minute, 59))
+
+    def resolve(self, date_phrase: Optional[str] = None, time_phrase: Optional[str] = None,
+                duration_minutes: Optional[int] = None) -> Optional[Tuple[datetime, datetime]]:
+        """Combine date, time and duration phrases into a start and end
+
+        Returns None when there is no time to anchor to. A time without a
+        date means the next occurrence of that time.
+        """
+        duration_minutes = as_minutes(duration_minutes)
+        times = self.resolve_time(time_phrase)
+        if times is None and date_phrase and date_phrase.strip().lower() == 'tonight':
+            times = PARTS_OF_DAY['tonight'], None
+        if times is None:
+            return None
+        day = self.resolve_date(date_phrase)
+        start_time, end_time = times
+
+        if day is None:
+            if date_phrase:
+                return None
+            day = self.today
+            if datetime.combine(day, start_time, self.tz) <= self.now:
+                day += timedelta(days=1)
+
+        start = datetime.combine(day, start_time, self.tz)
+        weekday = _WEEKDAY_RE.match(date_phrase.strip().lower()) if date_phrase else None
+        if start <= self.now and weekday and weekday.group('weekday') in WEEKDAYS:
+            # "Thursday at 3" said on Thursday evening means next week
+            day += timedelta(weeks=1)
+            start = datetime.combine(day, start_time, self.tz)
+        if end_time is not None:
+            end = datetime.combine(day, end_time, self.tz)
+            if end <= start:
+                end += timedelta(days=1)
+        elif duration_minutes:
+            end = start + timedelta(minutes=duration_minutes)
+        else:
+            end = start + DEFAULT_DURATION
+        return start, end
+
+    def resolve_phrase(self, text: Optional[str]) -> Optional[Tuple[datetime, datetime]]:
+        """Resolve free text such as 'next Tue 3-4:30pm' or 'tomorrow at noon for 2h'"""
+        if not text:
+            return None
+        date_match = DATE_RE.search(text)
+        time_match = (TIME_RE.search(text) or BARE_HOUR_RE.search(text)
+                      or PART_OF_DAY_RE.search(text))
+        duration = DURATION_RE.search(text)
+        return self.resolve(
+            date_match.group('date') if date_match else None,
+            time_match.group('time') if time_match else None,
+            parse_duration(duration.group('amount'), duration.group('unit')) if duration else None
+        )
+
+    def parse_iso(self, value: Optional[str]) -> Optional[datetime]:
+        """Parse an ISO datetime, reading naive values in the resolver's timezone"""
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=self.tz)
+        return parsed
+
+    def _resolve_end(self, start: datetime, text: Optional[str]) -> Optional[datetime]:
+        """End time from text; one without a date falls on the start's day, or the next"""
+        if not text or DATE_RE.search(text):
+            resolved = self.resolve_phrase(text)
+            return resolved[0] if resolved else None
+        time_match = TIME_RE.search(text) or BARE_HOUR_RE.search(text)
+        times = self.resolve_time(time_match.group('time')) if time_match else None
+        if times is None:
+            return None
+        end = datetime.combine(start.astimezone(self.tz).date(), times[0], self.tz)
+        if end <= start:
+            end += timedelta(days=1)
+        return end
+
+    def resolve_intent(self, intent: Dict[str, Any]) -> Optional[Tuple[datetime, datetime]]:
+        """Resolve the start and end of a parsed create/update intent
+
+        Understands both the rule parser's 'date'/'time' phrases and the
+        ISO (or free text) 'start_time'/'end_time' returned by Gemini.
+        """
+        duration = as_minutes(intent.get('duration_minutes'))
+        if intent.get('date') or intent.get('time'):
+            resolved = self.resolve(intent.get('date'), intent.get('time'), duration)
+            if resolved:
+                return resolved
+
+        start_value = intent.get('start_time')
+        start = self.parse_iso(start_value)
+        if start is None:
+            resolved = self.resolve_phrase(start_value)
+            if resolved is None:
+                return None
+            start = resolved[0]
+        end = self.parse_iso(intent.get('end_time')) or self._resolve_end(start,
+                                                                           intent.get('end_time'))
+        if end is None or end <= start:
+            end = start + (timedelta(minutes=duration) if duration else DEFAULT_DURATION)
+        return start, end
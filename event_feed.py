@@ -0,0 +1,73 @@
+"""
+Event-list change feed for the browser
+Wakes open sidebar streams when a session's event mirror changes, and
+computes the delta between the list a page shows and the current one
+"""
+
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class EventFeed:
+    """Change signal from one event mirror to any number of waiting streams
+
+    notify() is registered as a mirror listener, so it runs on whichever
+    thread wrote to or synced the mirror. Thread-based servers block in
+    wait(); asyncio servers await wait_async(). Either way the waiter gets
+    the feed's version and recomputes the list itself, so bursts of changes
+    collapse into one update.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._condition = threading.Condition()
+        self._async_waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    def notify(self):
+        """Record a change and wake every waiter"""
+        with self._condition:
+            self.version += 1
+            self._condition.notify_all()
+            waiters = list(self._async_waiters)
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def wait(self, seen: int, timeout: float) -> int:
+        """Block until the version moves past seen or timeout passes"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != seen, timeout)
+            return self.version
+
+    async def wait_async(self, seen: int, timeout: float) -> int:
+        """Async counterpart of wait()"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._condition:
+            if self.version != seen:
+                return self.version
+            self._async_waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                self._async_waiters.discard(waiter)
+        return self.version
+
+
+def diff_events(old: List[Dict[str, Any]],
+                new: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Delta that turns the old sidebar list into the new one, None if equal
+
+    'upsert' holds new or changed events, 'remove' the IDs that left the
+    list, and 'order' the IDs of the new list in display order.
+    """
+    before = {event['id']: event for event in old}
+    upsert = [event for event in new if before.get(event['id']) != event]
+    current = {event['id'] for event in new}
+    remove = [event_id for event_id in before if event_id not in current]
+    order = [event['id'] for event in new]
+    if not upsert and not remove and order == [event['id'] for event in old]:
+        return None
+    return {'upsert': upsert, 'remove': remove, 'order': order}
@@ -0,0 +1,304 @@
+"""
+Rule-based intent parser
+Deterministic fast path for unambiguous calendar commands, so they can be
+handled without a Gemini round trip
+"""
+
+import re
+from typing import Dict, Any, Optional
+
+# Intents scoring at least this much are trusted without asking Gemini
+CONFIDENCE_THRESHOLD = 0.75
+
+_WEEKDAY = (r'(?:monday|mon|tuesday|tues|tue|wednesday|wed|thursday|thurs|thur|thu|'
+            r'friday|fri|saturday|sat|sunday|sun)')
+_MONTH = (r'(?:january|jan|february|feb|march|mar|april|apr|may|june|jun|july|jul|'
+          r'august|aug|september|sept|sep|october|oct|november|nov|december|dec)')
+_ORDINAL = r'\d{1,2}(?:st|nd|rd|th)?'
+_CLOCK = r'(?:\d{1,2}(?::\d{2})?\s*(?:am|pm|a\.m\.|p\.m\.)|\d{1,2}:\d{2}|noon|midday|midnight)'
+
+DATE_RE = re.compile(
+    r'\b(?<!:)(?:on\s+)?(?P<date>'
+    r'today|tonight|tomorrow|tmrw|(?:the\s+)?day\s+after\s+tomorrow'
+    rf'|(?:this\s+|next\s+)?{_WEEKDAY}'
+    rf'|{_MONTH}\.?\s+{_ORDINAL}(?:,?\s+\d{{4}})?'
+    rf'|{_ORDINAL}\s+(?:of\s+)?{_MONTH}(?:,?\s+\d{{4}})?'
+    rf'|the\s+{_ORDINAL}'
+    r'|\d{4}-\d{2}-\d{2}'
+    r'|\d{1,2}/\d{1,2}(?:/\d{2,4})?'
+    r'|in\s+\d+\s+days?'
+    r'|next\s+week'
+    r')\b',
+    re.IGNORECASE
+)
+
+TIME_RE = re.compile(
+    r'\b(?:(?:at|from|@)\s+)?(?P<time>'
+    rf'(?:{_CLOCK}|\d{{1,2}}(?=\s*(?:-|–|to|until|till)\s*{_CLOCK}))'
+    rf'(?:\s*(?:-|–|to|until|till)\s*(?:{_CLOCK}|\d{{1,2}}(?::\d{{2}})?))?'
+    r')(?![\w:])',
+    re.IGNORECASE
+)
+
+# "at 3" with no am/pm is still a time, just a less certain one
+BARE_HOUR_RE = re.compile(r'\bat\s+(?P<time>\d{1,2})\b(?!\s*(?:days?|weeks?|people|%))',
+                          re.IGNORECASE)
+
+PART_OF_DAY_RE = re.compile(r'\b(?:in\s+the\s+)?(?P<time>morning|afternoon|evening|tonight)\b',
+                            re.IGNORECASE)
+
+DURATION_RE = re.compile(
+    r'\b(?:for\s+)?(?P<amount>\d+(?:\.\d+)?|an?|one|two|three|half\s+an)\s*-?\s*'
+    r'(?P<unit>hours?|hrs?|h|minutes?|mins?|m)\b(?!\s*(?:am|pm))',
+    re.IGNORECASE
+)
+
+# Requests for open time, or whether a time is open
+FIND_TIME_RE = re.compile(
+    r'\b(?:free|open|available|spare)\s+(?:time|slots?|windows?|spots?|gaps?)\b'
+    r'|\bfind\s+(?:me\s+|us\s+)?(?:some\s+)?(?:time\b|(?:an?\s+)?(?:[\w-]+\s+){0,3}?'
+    r'(?:slots?|windows?|gaps?|spots?|openings?)\b)'
+    r'|\bfind\s+(?:me\s+|us\s+)?(?:an?\s+|\d+\s*-?\s*)(?:hours?|hrs?|minutes?|mins?)\b'
+    r"|\b(?:when|where)\s+(?:am\s+i|i'm|are\s+we|can\s+i\s+(?:fit|squeeze))\b"
+    r"|\b(?:am\s+i|i'm|are\s+we)\s+(?:free|available|busy)\b",
+    re.IGNORECASE
+)
+# Spans of days to search: "this week", "next month", "the next 2 weeks"
+RANGE_RE = re.compile(
+    r'\b(?P<range>(?:this|next)\s+(?:week|month)'
+    r'|(?:(?:in|over|within)\s+)?the\s+next\s+(?:\d+|a|two|three|four)\s+'
+    r'(?:days?|weeks?|months?))\b',
+    re.IGNORECASE
+)
+# "between 2 and 4", "2-4": hour ranges that TIME_RE leaves alone without am/pm
+BARE_RANGE_RE = re.compile(
+    r'\b(?:between\s+)?(?P<time>\d{1,2}(?::\d{2})?\s*(?:-|–|to|and)\s*\d{1,2}(?::\d{2})?'
+    r'(?:\s*(?:am|pm))?)\b(?!\s*(?:days?|weeks?|months?|hours?|hrs?|h|minutes?|mins?|m)\b)',
+    re.IGNORECASE
+)
+# "this afternoon" names today as well as the part of the day
+_THIS_PART_RE = re.compile(r'\b(?:this\s+(?:morning|afternoon|evening)|tonight)\b', re.IGNORECASE)
+_AM_I_RE = re.compile(r'\b(?:am|are)\s+(?:i|we)\b', re.IGNORECASE)
+
+_POLITE = r'^(?:(?:please|pls|hey|ok|okay|can\s+you|could\s+you|would\s+you|'
+_POLITE += r"i\s+want\s+to|i'd\s+like\s+to|i\s+need\s+to|let's|lets)[\s,]+)*"
+
+ACTION_VERBS = {
+    'create': r'create|add|schedule|book|set\s+up|setup|put|plan|arrange|make',
+    'delete': r'delete|remove|cancel|clear|drop|erase|get\s+rid\s+of',
+    'update': r'move|reschedule|rename|change|push|shift|postpone|update|edit',
+}
+LEADING_VERB_RE = {
+    action: re.compile(_POLITE + rf'(?P<verb>{verbs})\b', re.IGNORECASE)
+    for action, verbs in ACTION_VERBS.items()
+}
+ANY_VERB_RE = {
+    action: re.compile(rf'\b(?:{verbs})\b', re.IGNORECASE)
+    for action, verbs in ACTION_VERBS.items()
+}
+
+LIST_LEADING_RE = re.compile(
+    _POLITE + r'(?:show|list|display|view|see|get)\b'
+    r"|^(?:what(?:'s|\s+is|\s+do\s+i\s+have|\s+have\s+i\s+got)|anything)\b"
+    r'.*\b(?:on|calendar|schedule|agenda|planned|coming\s+up|next|today|tomorrow|booked)\b',
+    re.IGNORECASE
+)
+LIST_ANYWHERE_RE = re.compile(
+    r'\b(?:upcoming|agenda|my\s+(?:events|schedule|calendar))\b', re.IGNORECASE)
+# Questions about the events rather than requests to see them
+NOT_LIST_RE = re.compile(r'\b(?:summari[sz]e|summary|free|busy|conflict\w*|prepare|overlap)\b',
+                         re.IGNORECASE)
+
+QUESTION_RE = re.compile(
+    r'\?|^(?:how|why|should|would|when|where|who|is\s+there|am\s+i|do\s+i|can\s+i)\b',
+    re.IGNORECASE)
+# Repeating events need a recurrence rule the fast path can't build
+RECURRENCE_RE = re.compile(
+    r'\b(?:every|each|daily|weekly|biweekly|fortnightly|monthly|yearly|annually|'
+    r'weekdays|recurring|repeat(?:s|ing)?)\b', re.IGNORECASE)
+# Alternatives and negations ("friday or saturday", "not today") need a reading
+ALTERNATIVE_RE = re.compile(r'\b(?:or|not|instead|except|unless)\b', re.IGNORECASE)
+MULTIPLE_RE = re.compile(r'\b(?:and|also|then|plus)\b|,|;|\ball\b|\beverything\b',
+                         re.IGNORECASE)
+
+_FILLER_RE = re.compile(
+    r'^(?:(?:a|an|the|my|new|another)(?:\s+|$))*'
+    r'(?:(?:event|meeting|appointment|entry)\s+(?:called|named|titled|for|about)\s+'
+    r'|(?:called|named|titled)\s+)?',
+    re.IGNORECASE
+)
+_CALENDAR_REF_RE = re.compile(
+    r'\b(?:on|to|in|into|from|off)\s+(?:the|my)\s+(?:calendar|schedule|agenda)\b',
+    re.IGNORECASE)
+_DANGLING_RE = re.compile(r'(?:\s+(?:on|at|for|from|to|in|by|the))+$', re.IGNORECASE)
+_GENERIC_TITLES = {'', 'event', 'events', 'meeting', 'appointment', 'something', 'it',
+                   'that', 'this', 'one', 'entry'}
+
+_NUMBER_WORDS = {'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'half an': 0.5}
+
+
+def parse_duration(amount: str, unit: str) -> int:
+    """Convert a duration phrase into minutes"""
+    amount = amount.lower()
+    value = _NUMBER_WORDS[re.sub(r'\s+', ' ', amount)] if amount[0].isalpha() else float(amount)
+    if unit.lower().startswith('h'):
+        value *= 60
+    return int(round(value))
+
+
+def _extract(pattern, text: str, group: str):
+    """Find the first match of a slot pattern and cut it out of the text"""
+    match = pattern.search(text)
+    if not match:
+        return None, text
+    return match.group(group), text[:match.start()] + ' ' + text[match.end():]
+
+
+def _clean_title(text: str) -> Optional[str]:
+    """Turn what's left after removing verbs and slots into an event title"""
+    text = _CALENDAR_REF_RE.sub(' ', text)
+    text = re.sub(r'\s+', ' ', text).strip(' .,!-')
+    text = _FILLER_RE.sub('', text)
+    text = _DANGLING_RE.sub('', text).strip(' .,!-')
+    if text.lower() in _GENERIC_TITLES:
+        return None
+    return text[0].upper() + text[1:]
+
+
+def _parse_find_time(text: str, intent: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill a 'find_time' intent: the days to search, time of day and length
+
+    'date' holds the span of days ("next week", "tomorrow") and 'time' an
+    optional part of the day or hour range. With a time and no duration the
+    request is whether that time is free.
+    """
+    intent['action'] = 'find_time'
+    intent['date'], remainder = _extract(RANGE_RE, text, 'range')
+    if intent['date'] is None:
+        intent['date'], remainder = _extract(DATE_RE, remainder, 'date')
+    if intent['date'] is None and _THIS_PART_RE.search(text):
+        intent['date'] = 'today'
+    # Hour ranges first, so "between 2 and 4pm" isn't read as just 4pm
+    for pattern in (BARE_RANGE_RE, TIME_RE, BARE_HOUR_RE, PART_OF_DAY_RE):
+        intent['time'], remainder = _extract(pattern, remainder, 'time')
+        if intent['time'] is not None:
+            intent['time'] = re.sub(r'\s+and\s+', '-', intent['time'])
+            break
+    # "am I" would otherwise read as "a m(inute)"
+    duration = DURATION_RE.search(_AM_I_RE.sub(' ', remainder))
+    if duration:
+        intent['duration_minutes'] = parse_duration(duration.group('amount'),
+                                                    duration.group('unit'))
+
+    score = 0.9
+    if LEADING_VERB_RE['create'].match(text) or MULTIPLE_RE.search(remainder):
+        # "book an hour when I'm free" finds and creates; leave it to Gemini
+        score -= 0.4
+    if RECURRENCE_RE.search(text):
+        score -= 0.4
+    intent['score'] = score
+    intent['confidence'] = 'high' if score >= CONFIDENCE_THRESHOLD else 'medium'
+    return intent
+
+
+def parse_intent(text: str) -> Dict[str, Any]:
+    """Parse a chat message into an intent with slot phrases and a score
+
+    The result uses the same keys as GeminiAgent.parse_calendar_command,
+    plus the raw 'date' and 'time' phrases, 'duration_minutes', and a
+    numeric 'score'. Date and time phrases are left unresolved so they can
+    be turned into datetimes against the caller's clock and timezone.
+    """
+    text = text.strip()
+    intent = {
+        'action': 'unknown', 'summary': None, 'date': None, 'time': None,
+        'duration_minutes': None, 'score': 0.0, 'confidence': 'low',
+        'source': 'rules',
+    }
+    if not text:
+        return intent
+    if FIND_TIME_RE.search(text):
+        return _parse_find_time(text, intent)
+
+    leading = [action for action, pattern in LEADING_VERB_RE.items() if pattern.match(text)]
+    mentioned = {action for action, pattern in ANY_VERB_RE.items() if pattern.search(text)}
+    is_question = bool(QUESTION_RE.search(text))
+
+    wants_list = not leading and not NOT_LIST_RE.search(text)
+    if LIST_LEADING_RE.match(text) and wants_list:
+        intent['action'] = 'list'
+        score = 0.9
+    elif LIST_ANYWHERE_RE.search(text) and wants_list and not mentioned:
+        intent['action'] = 'list'
+        score = 0.8
+    elif leading:
+        intent['action'] = leading[0]
+        score = 0.6
+    elif len(mentioned) == 1:
+        intent['action'] = mentioned.pop()
+        score = 0.35
+    else:
+        return intent
+
+    # Pull out the slots, leaving the words that make up the title
+    remainder = text
+    verb = LEADING_VERB_RE.get(intent['action'])
+    if verb is not None:
+        remainder = verb.sub('', remainder, count=1)
+    intent['date'], remainder = _extract(DATE_RE, remainder, 'date')
+    intent['time'], remainder = _extract(TIME_RE, remainder, 'time')
+    vague_time = False
+    if intent['time'] is None:
+        intent['time'], remainder = _extract(BARE_HOUR_RE, remainder, 'time')
+        if intent['time'] is None:
+            intent['time'], remainder = _extract(PART_OF_DAY_RE, remainder, 'time')
+        vague_time = intent['time'] is not None
+    duration = DURATION_RE.search(remainder)
+    if duration:
+        intent['duration_minutes'] = parse_duration(duration.group('amount'),
+                                                    duration.group('unit'))
+        remainder = remainder[:duration.start()] + ' ' + remainder[duration.end():]
+    title = _clean_title(remainder)
+
+    if intent['action'] == 'list':
+        if is_question and not LIST_LEADING_RE.match(text):
+            score -= 0.2
+    else:
+        if len(mentioned) > 1:
+            score -= 0.35
+        if is_question:
+            score -= 0.3
+        if MULTIPLE_RE.search(remainder):
+            # Several events at once are left to Gemini and the batch path
+            score -= 0.4
+        if RECURRENCE_RE.search(text):
+            # "cancel standup every Monday" is about a series; leave it to Gemini
+            score -= 0.4
+
+    if intent['action'] == 'create':
+        intent['summary'] = title
+        score += 0.15 if title else -0.2
+        score += 0.15 if intent['date'] else 0
+        score += (0.05 if vague_time else 0.15) if intent['time'] else 0
+        if not intent['date'] and not intent['time']:
+            score -= 0.1
+    elif intent['action'] == 'delete':
+        intent['summary'] = title
+        if title:
+            intent['event_ids'] = [title]
+        score += 0.3 if title or intent['time'] else -0.2
+    elif intent['action'] == 'update':
+        # Updates need both a target and a change; leave them to Gemini
+        intent['summary'] = title
+        score -= 0.1
+
+    if intent['action'] != 'list' and (DATE_RE.search(remainder) or TIME_RE.search(remainder)
+                                       or ALTERNATIVE_RE.search(remainder)):
+        # A second date or time, or an "or"/"not", left in what would be the
+        # title: only the first of each was taken, maybe the wrong one
+        score = min(score, CONFIDENCE_THRESHOLD - 0.25)
+
+    intent['score'] = round(min(max(score, 0.0), 1.0), 2)
+    intent['confidence'] = ('high' if intent['score'] >= CONFIDENCE_THRESHOLD
+                            else 'medium' if intent['score'] >= 0.5 else 'low')
+    return intent
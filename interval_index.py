@@ -0,0 +1,124 @@
+"""
+Interval index over calendar events
+Sorted arrays searched with bisect, so overlap and range queries over a
+user's mirrored events take O(log n + k) instead of a scan of every event
+"""
+
+import heapq
+import math
+from bisect import bisect_left, insort
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Above this many changes at once, re-sort everything instead of inserting
+BULK_THRESHOLD = 256
+
+Span = Tuple[float, float, str]
+
+
+def duration_class(start: float, end: float) -> int:
+    """Power-of-two bucket of an interval's length in seconds"""
+    return max(0, math.ceil(math.log2(max(end - start, 1.0))))
+
+
+class IntervalIndex:
+    """Intervals keyed by ID, answering "what overlaps [start, end)?"
+
+    Intervals are grouped by duration class, each class a list of
+    (start, end, id) sorted by start. An interval in class c is at most
+    2**c seconds long, so one overlapping [start, end) must start in
+    [start - 2**c, end): two bisects per class bound the candidates, and
+    only intervals starting less than their own length before the window
+    are looked at without matching. Results from the classes are merged
+    in start order, lazily, so a limit stops the work early.
+
+    Times are seconds since the epoch. Inserts and removals are a bisect
+    plus a list shift; large batches re-sort instead.
+    """
+
+    def __init__(self):
+        self._classes: Dict[int, List[Span]] = {}
+        self._spans: Dict[str, Span] = {}
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._spans
+
+    def clear(self):
+        self._classes = {}
+        self._spans = {}
+
+    def add(self, key: str, start: float, end: float):
+        """Insert or move an interval"""
+        self.discard(key)
+        span = (start, end, key)
+        self._spans[key] = span
+        insort(self._classes.setdefault(duration_class(start, end), []), span)
+
+    def discard(self, key: str):
+        """Remove an interval if present"""
+        span = self._spans.pop(key, None)
+        if span is None:
+            return
+        spans = self._classes[duration_class(span[0], span[1])]
+        del spans[bisect_left(spans, span)]
+
+    def update(self, added: Iterable[Tuple[str, float, float]], removed: Iterable[str] = ()):
+        """Apply many inserts and removals, re-sorting once if there are many"""
+        added, removed = list(added), list(removed)
+        if len(added) + len(removed) <= BULK_THRESHOLD:
+            for key in removed:
+                self.discard(key)
+            for key, start, end in added:
+                self.add(key, start, end)
+            return
+        for key in removed:
+            self._spans.pop(key, None)
+        for key, start, end in added:
+            self._spans[key] = (start, end, key)
+        classes: Dict[int, List[Span]] = {}
+        for span in self._spans.values():
+            classes.setdefault(duration_class(span[0], span[1]), []).append(span)
+        for spans in classes.values():
+            spans.sort()
+        # Swap in whole, so readers on other threads see the old or new lists
+        self._classes = classes
+
+    def _overlapping_in(self, duration: int, spans: List[Span],
+                        start: float, end: float) -> Iterator[Span]:
+        low = bisect_left(spans, (start - 2 ** duration,))
+        high = bisect_left(spans, (end,))
+        for span in spans[low:high]:
+            if span[1] > start:
+                yield span
+
+    def latest_end(self, before: float) -> Optional[float]:
+        """Latest end of an interval ending at or before a time, None if none does
+
+        Walks each class back from the last interval starting before
+        `before`, and stops once a start is more than the class's length
+        behind the best end found, since nothing earlier can end later.
+        """
+        best = None
+        for duration, spans in list(self._classes.items()):
+            length = 2 ** duration
+            for index in range(bisect_left(spans, (before,)) - 1, -1, -1):
+                start, end, _ = spans[index]
+                if best is not None and start + length <= best:
+                    break
+                if end <= before and (best is None or end > best):
+                    best = end
+        return best
+
+    def overlapping(self, start: float, end: float = math.inf,
+                    limit: Optional[int] = None) -> List[str]:
+        """IDs of intervals overlapping [start, end), ordered by start
+
+        Same rule as the Calendar API's timeMin/timeMax: an interval
+        matches if it ends after start and starts before end.
+        """
+        runs = [self._overlapping_in(duration, spans, start, end)
+                for duration, spans in list(self._classes.items())]
+        return [span[2] for span in islice(heapq.merge(*runs), limit)]
@@ -0,0 +1,253 @@
+"""
+Gemini response cache
+Reuses answers to repeated or near-identical prompts asked against the same
+calendar context, so they don't cost another model call
+"""
+
+import hashlib
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from intent_parser import DATE_RE, TIME_RE, BARE_HOUR_RE, PART_OF_DAY_RE
+
+DEFAULT_TTL = 300.0
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 1024 * 1024
+
+# Words that carry no meaning of their own in a calendar question
+STOPWORDS = {
+    'a', 'an', 'the', 'i', 'me', 'my', 'do', 'does', 'did', 'have', 'has', 'got', 'is',
+    'are', 'am', 'be', 'was', 'on', 'in', 'at', 'for', 'of', 'to', 'what', 'whats',
+    'show', 'tell', 'list', 'please', 'can', 'could', 'would', 'you', 'any', 'there',
+    'anything', 'some', 'about', 'hey', 'ok', 'okay', 'going', 'happening', 'planned',
+    'scheduled', 'events', 'calendar', 'schedule', 'agenda', 'up', 'coming',
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9:/]+")
+
+Embedding = Dict[str, float]
+
+
+def normalize_prompt(text: str) -> str:
+    """Fold case, punctuation and spacing so trivially different prompts match"""
+    text = text.lower().replace("'", '').replace('’', '')
+    return ' '.join(_TOKEN_RE.findall(text))
+
+
+def context_hash(context: str) -> str:
+    """Short digest of the calendar context a prompt was answered against"""
+    return hashlib.blake2b(context.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def slot_signature(text: str) -> Tuple[str, ...]:
+    """Dates, times and numbers in a prompt, which similar prompts must share
+
+    "What's on today?" and "What's on tomorrow?" embed almost identically
+    but need different answers.
+    """
+    slots = []
+    for pattern in (DATE_RE, TIME_RE, BARE_HOUR_RE, PART_OF_DAY_RE):
+        slots.extend(' '.join(m.group(m.lastgroup).lower().split())
+                     for m in pattern.finditer(text))
+    slots.extend(re.findall(r'\d+', text))
+    return tuple(sorted(set(slots)))
+
+
+def hashed_embedding(text: str, dimensions: int = 512) -> Embedding:
+    """Local bag-of-words embedding: content words plus their character
+    trigrams, hashed into a fixed number of buckets and L2-normalized"""
+    vector: Dict[str, float] = {}
+    for word in normalize_prompt(text).split():
+        if word in STOPWORDS:
+            continue
+        features = [(word, 1.0)]
+        padded = f"#{word}#"
+        features += [(padded[i:i + 3], 0.3) for i in range(len(padded) - 2)]
+        for feature, weight in features:
+            bucket = str(int(hashlib.md5(feature.encode('utf-8')).hexdigest()[:8], 16)
+                         % dimensions)
+            vector[bucket] = vector.get(bucket, 0.0) + weight
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    return {key: value / norm for key, value in vector.items()} if norm else {}
+
+
+def cosine(a: Embedding, b: Embedding) -> float:
+    """Cosine similarity of two normalized sparse embeddings"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(key, 0.0) for key, value in a.items())
+
+
+class CacheEntry:
+    """One cached response and what the similarity tier needs to match it"""
+    __slots__ = ('response', 'stored_at', 'size', 'slots', 'embedding')
+
+    def __init__(self, response: str, slots: Tuple[str, ...],
+                 embedding: Optional[Embedding], size: int):
+        self.response = response
+        self.stored_at = time.monotonic()
+        self.slots = slots
+        self.embedding = embedding
+        self.size = size
+
+
+class ResponseCache:
+    """Two-tier, per-user cache of Gemini responses
+
+    Entries are keyed on (kind, normalized prompt, calendar context hash).
+    The exact tier is a dict lookup; the optional similarity tier compares
+    local embeddings of prompts asked against the same context and the same
+    dates and times, and is only used for the kinds listed in
+    similar_kinds (free-form answers by default, never parsed commands).
+    Entries expire after ttl seconds and the least recently used ones are
+    evicted once max_entries or max_bytes is exceeded. Call invalidate()
+    after any calendar write.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 similarity_threshold: Optional[float] = None,
+                 embed: Callable[[str], Embedding] = hashed_embedding,
+                 similar_kinds: Tuple[str, ...] = ('answer',)):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.similarity_threshold = similarity_threshold
+        self.embed = embed
+        self.similar_kinds = similar_kinds
+        self.entries: 'OrderedDict[Tuple[str, str, str], CacheEntry]' = OrderedDict()
+        self.bytes = 0
+        self.stats = {'exact_hits': 0, 'similar_hits': 0, 'misses': 0,
+                      'evictions': 0, 'expirations': 0, 'invalidations': 0}
+        # Bumped on every change, so callers can tell when to re-export
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def _uses_similarity(self, kind: str) -> bool:
+        return self.similarity_threshold is not None and kind in self.similar_kinds
+
+    def get(self, prompt: str, context: str = "", kind: str = 'answer') -> Optional[str]:
+        """Return a cached response for this prompt and context, if any"""
+        digest = context_hash(context)
+        key = (kind, normalize_prompt(prompt), digest)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and self._expired(key, entry):
+                entry = None
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.stats['exact_hits'] += 1
+                return entry.response
+
+            if self._uses_similarity(kind):
+                match = self._nearest(kind, prompt, digest)
+                if match is not None:
+                    self.entries.move_to_end(match)
+                    self.stats['similar_hits'] += 1
+                    return self.entries[match].response
+
+            self.stats['misses'] += 1
+            return None
+
+    def _nearest(self, kind: str, prompt: str, digest: str) -> Optional[Tuple[str, str, str]]:
+        """Most similar live entry asked against the same context and slots"""
+        embedding = self.embed(prompt)
+        if not embedding:
+            return None
+        slots = slot_signature(prompt)
+        best, best_score = None, self.similarity_threshold
+        for key, entry in list(self.entries.items()):
+            if key[0] != kind or key[2] != digest or entry.slots != slots:
+                continue
+            if self._expired(key, entry) or not entry.embedding:
+                continue
+            score = cosine(embedding, entry.embedding)
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def put(self, prompt: str, context: str, response: str, kind: str = 'answer') -> str:
+        """Store a response and return it"""
+        key = (kind, normalize_prompt(prompt), context_hash(context))
+        embedding = self.embed(prompt) if self._uses_similarity(kind) else None
+        # Rough footprint: the strings plus the sparse embedding
+        size = (len(response.encode('utf-8')) + len(key[1]) + len(key[2])
+                + 64 * len(embedding or ()))
+        if size > self.max_bytes:
+            return response
+
+        with self._lock:
+            self._discard(key)
+            self.entries[key] = CacheEntry(response, slot_signature(prompt), embedding, size)
+            self.bytes += size
+            self.version += 1
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._discard(next(iter(self.entries)))
+                self.stats['evictions'] += 1
+        return response
+
+    def _expired(self, key: Tuple[str, str, str], entry: CacheEntry) -> bool:
+        """Drop an entry that has outlived the TTL"""
+        if time.monotonic() - entry.stored_at < self.ttl:
+            return False
+        self._discard(key)
+        self.stats['expirations'] += 1
+        return True
+
+    def _discard(self, key: Tuple[str, str, str]):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def invalidate(self):
+        """Forget every cached response, e.g. after the calendar changed"""
+        with self._lock:
+            self.entries.clear()
+            self.bytes = 0
+            self.version += 1
+            self.stats['invalidations'] += 1
+
+    def export(self, kinds: Tuple[str, ...]) -> List[Dict[str, Any]]:
+        """Unexpired entries of the given kinds as JSON-serializable dicts"""
+        now = time.monotonic()
+        with self._lock:
+            return [{'kind': key[0], 'prompt': key[1], 'context': key[2],
+                     'response': entry.response, 'slots': list(entry.slots),
+                     'expires_at': time.time() + self.ttl - (now - entry.stored_at)}
+                    for key, entry in self.entries.items()
+                    if key[0] in kinds and now - entry.stored_at < self.ttl]
+
+    def load(self, exported: List[Dict[str, Any]]):
+        """Add entries from export(), possibly made by another process"""
+        now = time.monotonic()
+        with self._lock:
+            for item in exported:
+                remaining = item['expires_at'] - time.time()
+                if remaining <= 0:
+                    continue
+                key = (item['kind'], item['prompt'], item['context'])
+                embedding = self.embed(item['prompt']) if self._uses_similarity(key[0]) else None
+                entry = CacheEntry(item['response'], tuple(item['slots']), embedding,
+                                   len(item['response'].encode('utf-8')) + len(key[1]) + len(key[2])
+                                   + 64 * len(embedding or ()))
+                # Monotonic clocks differ between processes; carry the time left
+                entry.stored_at = now - (self.ttl - remaining)
+                self._discard(key)
+                self.entries[key] = entry
+                self.bytes += entry.size
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._discard(next(iter(self.entries)))
+                self.stats['evictions'] += 1
+
+    def snapshot_stats(self) -> Dict[str, float]:
+        """Counters plus current size and hit rate"""
+        with self._lock:
+            stats = dict(self.stats, entries=len(self.entries), bytes=self.bytes)
+        lookups = stats['exact_hits'] + stats['similar_hits'] + stats['misses']
+        stats['hit_rate'] = ((stats['exact_hits'] + stats['similar_hits']) / lookups
+                             if lookups else 0.0)
+        return stats
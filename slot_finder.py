@@ -0,0 +1,134 @@
+"""
+Free-slot finder
+Computes open meeting times from busy intervals, working hours, buffers
+and a range of days, with no model call
+"""
+
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta, tzinfo
+from typing import Iterable, List, Optional, Tuple
+
+Interval = Tuple[datetime, datetime]
+
+DEFAULT_WORKING_HOURS = (time(9), time(17))
+# Monday to Friday
+DEFAULT_WORKDAYS = (0, 1, 2, 3, 4)
+# Suggested start times are rounded up to a multiple of this
+SLOT_STEP = timedelta(minutes=15)
+DEFAULT_LIMIT = 5
+# Most suggestions taken from any one day, so they span several days
+PER_DAY = 2
+# Hours searched when a request names a part of the day instead of a time
+DAY_PARTS = {'morning': (time(9), time(12)), 'afternoon': (time(12), time(17)),
+             'evening': (time(17), time(21)), 'tonight': (time(18), time(22))}
+
+
+def parse_working_hours(text: str) -> Tuple[time, time]:
+    """Working hours from a setting like '09:00-17:00', or the default if malformed"""
+    try:
+        start, end = (time.fromisoformat(part.strip()) for part in text.split('-'))
+    except ValueError:
+        print(f"Ignoring malformed working hours {text!r}")
+        return DEFAULT_WORKING_HOURS
+    return start, end
+
+
+def merge_busy(busy: Iterable[Interval], buffer: timedelta = timedelta(0)) -> List[Interval]:
+    """Busy intervals sorted, widened by buffer on both sides, and merged"""
+    merged: List[Interval] = []
+    for start, end in sorted((start - buffer, end + buffer) for start, end in busy):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_gaps(merged: List[Interval], starts: List[datetime],
+              window_start: datetime, window_end: datetime) -> List[Interval]:
+    """Free parts of [window_start, window_end)
+
+    merged comes from merge_busy() and starts holds its start times, so the
+    first busy interval that matters is found by bisection.
+    """
+    gaps = []
+    cursor = window_start
+    index = max(bisect_right(starts, window_start) - 1, 0)
+    while index < len(merged) and merged[index][0] < window_end:
+        start, end = merged[index]
+        if end > cursor:
+            if start > cursor:
+                gaps.append((cursor, start))
+            cursor = end
+        index += 1
+    if cursor < window_end:
+        gaps.append((cursor, window_end))
+    return gaps
+
+
+def round_up(moment: datetime, step: timedelta = SLOT_STEP) -> datetime:
+    """Next multiple of step at or after moment, counted from local midnight"""
+    midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    remainder = (moment - midnight) % step
+    return moment if not remainder else moment + (step - remainder)
+
+
+def working_window(day: date, tz: tzinfo,
+                   working_hours: Tuple[time, time]) -> Interval:
+    """Working hours on a day as aware datetimes; an end before the start is the next day"""
+    start = datetime.combine(day, working_hours[0], tz)
+    end = datetime.combine(day, working_hours[1], tz)
+    if end <= start:
+        end = datetime.combine(day + timedelta(days=1), working_hours[1], tz)
+    return start, end
+
+
+def find_slots(busy: Iterable[Interval], first_day: date, end_day: date,
+               duration: timedelta, tz: tzinfo,
+               working_hours: Tuple[time, time] = DEFAULT_WORKING_HOURS,
+               workdays: Tuple[int, ...] = DEFAULT_WORKDAYS,
+               buffer: timedelta = timedelta(0),
+               not_before: Optional[datetime] = None,
+               prefer: Optional[time] = None,
+               limit: int = DEFAULT_LIMIT, per_day: int = PER_DAY) -> List[Interval]:
+    """Ranked free slots of the given length on days [first_day, end_day)
+
+    Slots fall inside working hours on workdays, keep buffer clear of any
+    busy interval, start no earlier than not_before, and start on a
+    SLOT_STEP boundary. A slot is offered at the start of each free gap,
+    and at prefer when that lies in the gap. Sooner days rank first; within
+    a day, slots closest to prefer (if given) come first, then earlier ones.
+    """
+    merged = merge_busy(busy, buffer)
+    starts = [start for start, _ in merged]
+    preferred_minute = prefer.hour * 60 + prefer.minute if prefer is not None else 0
+
+    def rank(start: datetime) -> tuple:
+        if prefer is None:
+            return 0, start
+        local = start.astimezone(tz)
+        return abs(local.hour * 60 + local.minute - preferred_minute), start
+
+    slots: List[Interval] = []
+    day = first_day
+    while day < end_day and len(slots) < limit:
+        if day.weekday() in workdays:
+            window_start, window_end = working_window(day, tz, working_hours)
+            if not_before is not None and not_before > window_start:
+                window_start = not_before
+            candidates = set()
+            for gap_start, gap_end in free_gaps(merged, starts, window_start, window_end):
+                latest = gap_end - duration
+                earliest = round_up(gap_start.astimezone(tz))
+                if earliest > latest:
+                    continue
+                candidates.add(earliest)
+                if prefer is not None:
+                    preferred = round_up(datetime.combine(day, prefer, tz))
+                    if earliest < preferred <= latest:
+                        candidates.add(preferred)
+            for start in sorted(candidates, key=rank)[:per_day]:
+                slots.append((start, start + duration))
+        day += timedelta(days=1)
+    return slots[:limit]
@@ -0,0 +1,230 @@
+"""
+Shared per-session state for chat agents
+Stores what an agent needs to come back warm (conversation, event mirror
+and sync token, intent cache) outside the process, so any web worker can
+serve any session
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Sessions untouched for this long are dropped from the store
+DEFAULT_STATE_TTL = 7 * 24 * 3600
+DEFAULT_MAX_SESSIONS = 1000
+
+
+class StateStore:
+    """Interface for session state backends
+
+    A session's state is a handful of named parts ('conversation',
+    'mirror', 'intent_cache'), each a JSON-serializable value, plus a
+    version number that goes up on every save. Workers compare versions to
+    notice that another worker has moved a session on since they last
+    loaded it.
+
+    A Redis backend maps onto this directly: one hash per session holding
+    the parts as JSON fields plus a 'version' field, written in a MULTI
+    with HSET, HINCRBY version 1 and EXPIRE ttl; load() is HGETALL,
+    version() is HGET version and delete() is DEL.
+    """
+
+    def load(self, session_id: str) -> Tuple[Dict[str, Any], int]:
+        """All saved parts for a session and their version (({}, 0) if none)"""
+        raise NotImplementedError
+
+    def save(self, session_id: str, parts: Dict[str, Any]) -> int:
+        """Replace the given parts, keep the others, and return the new version"""
+        raise NotImplementedError
+
+    def version(self, session_id: str) -> int:
+        """Current version of a session, 0 if nothing is saved"""
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        """Forget a session entirely"""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class MemoryStateStore(StateStore):
+    """In-process store, bounded LRU; only shared by agents in one worker"""
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS,
+                 ttl: float = DEFAULT_STATE_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        # session_id -> (parts, version, saved_at)
+        self.sessions: 'OrderedDict[str, Tuple[Dict[str, Any], int, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, session_id: str) -> Optional[Tuple[Dict[str, Any], int, float]]:
+        entry = self.sessions.get(session_id)
+        if entry is not None and time.time() - entry[2] >= self.ttl:
+            del self.sessions[session_id]
+            return None
+        return entry
+
+    def load(self, session_id: str) -> Tuple[Dict[str, Any], int]:
+        with self._lock:
+            entry = self._live(session_id)
+            if entry is None:
+                return {}, 0
+            # Round-trip through JSON so callers never share mutable state
+            return json.loads(json.dumps(entry[0])), entry[1]
+
+    def save(self, session_id: str, parts: Dict[str, Any]) -> int:
+        encoded = json.loads(json.dumps(parts))
+        with self._lock:
+            entry = self._live(session_id)
+            saved, version = (dict(entry[0]), entry[1]) if entry else ({}, 0)
+            saved.update(encoded)
+            self.sessions[session_id] = (saved, version + 1, time.time())
+            self.sessions.move_to_end(session_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+            return version + 1
+
+    def version(self, session_id: str) -> int:
+        with self._lock:
+            entry = self._live(session_id)
+            return entry[1] if entry else 0
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self.sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+
+class SQLiteStateStore(StateStore):
+    """Store in a SQLite file, shared by every worker on one host
+
+    Uses WAL mode so readers don't block the writer, one connection per
+    thread, and a row per (session, part) so saving the conversation
+    doesn't rewrite a large event mirror.
+    """
+
+    # Run the expiry sweep once per this many saves
+    PRUNE_EVERY = 200
+
+    def __init__(self, path: str, ttl: float = DEFAULT_STATE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._saves = 0
+        with self._connect() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS session_versions (
+                              session_id TEXT PRIMARY KEY,
+                              version INTEGER NOT NULL,
+                              saved_at REAL NOT NULL)""")
+            db.execute("""CREATE TABLE IF NOT EXISTS session_parts (
+                              session_id TEXT NOT NULL,
+                              part TEXT NOT NULL,
+                              value TEXT NOT NULL,
+                              PRIMARY KEY (session_id, part))""")
+
+    def _connect(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl
+
+    def load(self, session_id: str) -> Tuple[Dict[str, Any], int]:
+        db = self._connect()
+        row = db.execute("SELECT version FROM session_versions "
+                         "WHERE session_id = ? AND saved_at >= ?",
+                         (session_id, self._cutoff())).fetchone()
+        if row is None:
+            return {}, 0
+        parts = {part: json.loads(value) for part, value in db.execute(
+            "SELECT part, value FROM session_parts WHERE session_id = ?", (session_id,))}
+        return parts, row[0]
+
+    def save(self, session_id: str, parts: Dict[str, Any]) -> int:
+        rows = [(session_id, part, json.dumps(value)) for part, value in parts.items()]
+        db = self._connect()
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers
+        # saving the same session can't both read the same version
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.executemany("INSERT OR REPLACE INTO session_parts VALUES (?, ?, ?)", rows)
+            db.execute("""INSERT INTO session_versions VALUES (?, 1, ?)
+                          ON CONFLICT(session_id) DO UPDATE
+                          SET version = version + 1, saved_at = excluded.saved_at""",
+                       (session_id, time.time()))
+            version = db.execute("SELECT version FROM session_versions WHERE session_id = ?",
+                                 (session_id,)).fetchone()[0]
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+        self._saves += 1
+        if self._saves % self.PRUNE_EVERY == 0:
+            self.prune()
+        return version
+
+    def version(self, session_id: str) -> int:
+        row = self._connect().execute(
+            "SELECT version FROM session_versions WHERE session_id = ? AND saved_at >= ?",
+            (session_id, self._cutoff())).fetchone()
+        return row[0] if row else 0
+
+    def delete(self, session_id: str):
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("DELETE FROM session_parts WHERE session_id = ?", (session_id,))
+            db.execute("DELETE FROM session_versions WHERE session_id = ?", (session_id,))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def prune(self):
+        """Drop sessions that have outlived the TTL"""
+        db = self._connect()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("""DELETE FROM session_parts WHERE session_id IN
+                          (SELECT session_id FROM session_versions WHERE saved_at < ?)""",
+                       (self._cutoff(),))
+            db.execute("DELETE FROM session_versions WHERE saved_at < ?", (self._cutoff(),))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+    def __len__(self) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM session_versions WHERE saved_at >= ?",
+            (self._cutoff(),)).fetchone()[0]
+
+
+def open_state_store(url: Optional[str] = None, ttl: float = DEFAULT_STATE_TTL,
+                     max_sessions: int = DEFAULT_MAX_SESSIONS) -> StateStore:
+    """Build a store from a URL such as 'memory://' or 'sqlite:///var/chat_state.db'
+
+    Defaults to the CHAT_STATE_STORE environment variable, then memory.
+    """
+    url = url or os.getenv('CHAT_STATE_STORE') or 'memory://'
+    if url.startswith('memory://'):
+        return MemoryStateStore(max_sessions=max_sessions, ttl=ttl)
+    if url.startswith('sqlite:///'):
+        return SQLiteStateStore(url[len('sqlite:///'):], ttl=ttl)
+    raise ValueError(f"Unsupported state store URL: {url!r} "
+                     "(use memory:// or sqlite:///path, or implement StateStore)")
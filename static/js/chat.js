@@ -4,9 +4,17 @@ document.addEventListener('DOMContentLoaded', function() {
     const messageInput = document.getElementById('message-input');
     const chatMessages = document.getElementById('chat-messages');
     const sendBtn = document.getElementById('send-btn');
+    // ETag of the event list on screen, sent back so unchanged lists cost a 304
+    let eventsEtag = null;
+    // Sidebar entries by event ID, so updates only touch what changed
+    const shownEvents = new Map();
+    // Without an event stream the list is revalidated this often (ms), and
+    // a refused stream is tried again after EVENTS_STREAM_RETRY
+    const EVENTS_POLL_INTERVAL = 30000;
+    const EVENTS_STREAM_RETRY = 300000;
 
-    // Load events on page load
-    loadEvents();
+    // Get the event list, then changes to it, pushed from the server
+    watchEvents();
 
     // Handle form submission
     chatForm.addEventListener('submit', async function(e) {
@@ -26,25 +34,10 @@ document.addEventListener('DOMContentLoaded', function() {
         sendBtn.textContent = 'Sending...';
 
         try {
-            // Send message to server
-            const response = await fetch('/api/message', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({ message: message })
-            });
-
-            const data = await response.json();
-
-            if (response.ok) {
-                // Add bot response
-                addMessage(data.response, 'bot');
-                
-                // Refresh events list (server-side can include metadata in future)
-                setTimeout(loadEvents, 1000);
-            } else {
-                addMessage(`Error: ${data.error || 'Something went wrong'}`, 'bot');
+            // Stream the reply, falling back to the plain endpoint if the stream is refused
+            const streamed = await streamMessage(message);
+            if (!streamed) {
+                await sendMessage(message);
             }
         } catch (error) {
             addMessage(`Error: ${error.message}`, 'bot');
@@ -55,6 +48,112 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    // Send a message and show the whole reply once it arrives
+    async function sendMessage(message) {
+        const response = await fetch('/api/message', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ message: message })
+        });
+
+        const data = await response.json();
+
+        if (response.ok) {
+            // Add bot response
+            addMessage(data.response, 'bot');
+        } else {
+            addMessage(`Error: ${data.error || 'Something went wrong'}`, 'bot');
+        }
+    }
+
+    // Send a message and render the reply as Server-Sent Events arrive.
+    // Returns false only if the server never accepted the message, so the
+    // caller can fall back; once it has, the command may already have run
+    // and must not be sent again.
+    async function streamMessage(message) {
+        let response;
+        try {
+            response = await fetch('/api/message/stream', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Accept': 'text/event-stream'
+                },
+                body: JSON.stringify({ message: message })
+            });
+        } catch (error) {
+            return false;
+        }
+        if (!response.ok || !response.body) {
+            return false;
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let text = '';
+        let contentDiv = null;
+
+        while (true) {
+            let chunk;
+            try {
+                chunk = await reader.read();
+            } catch (error) {
+                break;
+            }
+            const { value, done } = chunk;
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // Messages are separated by a blank line
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+                const raw = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                const message = parseEvent(raw);
+                if (!message) continue;
+
+                if (message.event === 'error') {
+                    addMessage(`Error: ${message.data.error || 'Something went wrong'}`, 'bot');
+                    return true;
+                }
+                if (message.event === 'done') {
+                    return true;
+                }
+                if (message.data.delta) {
+                    if (!contentDiv) {
+                        sendBtn.textContent = 'Receiving...';
+                        contentDiv = addMessage('', 'bot');
+                    }
+                    text += message.data.delta;
+                    contentDiv.innerHTML = `<strong>Assistant:</strong> ${formatBotMessage(text)}`;
+                    chatMessages.scrollTop = chatMessages.scrollHeight;
+                }
+            }
+        }
+        // Closed before 'done', e.g. by a proxy or worker timeout
+        addMessage('Error: The reply was interrupted. Check your calendar before ' +
+                   'sending this again, as it may already have been done.', 'bot');
+        return true;
+    }
+
+    // Parse one Server-Sent Events message; comments and keep-alives return null
+    function parseEvent(raw) {
+        let event = 'message';
+        const dataLines = [];
+        raw.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                event = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trim());
+            }
+        });
+        if (dataLines.length === 0) return null;
+        return { event: event, data: JSON.parse(dataLines.join('\n')) };
+    }
+
     // Add message to chat
     function addMessage(content, type) {
         const messageDiv = document.createElement('div');
@@ -74,6 +173,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Scroll to bottom
         chatMessages.scrollTop = chatMessages.scrollHeight;
+        return contentDiv;
     }
 
     // Format bot message (convert newlines to <br>, etc.)
@@ -100,49 +200,147 @@ document.addEventListener('DOMContentLoaded', function() {
     // Load calendar events
     async function loadEvents() {
         const eventsList = document.getElementById('events-list');
-        eventsList.innerHTML = '<div class="loading">Loading events...</div>';
+        // An empty list already on screen is current as of eventsEtag too
+        if (eventsEtag === null && shownEvents.size === 0) {
+            eventsList.innerHTML = '<div class="loading">Loading events...</div>';
+        }
 
         try {
-            const response = await fetch('/api/events');
+            const headers = eventsEtag ? { 'If-None-Match': eventsEtag } : {};
+            // no-store: we revalidate ourselves, so a 304 reaches this code
+            const response = await fetch('/api/events', { headers: headers, cache: 'no-store' });
+            if (response.status === 304) {
+                return;
+            }
             const data = await response.json();
 
             if (response.ok) {
+                eventsEtag = response.headers.get('ETag');
                 displayEvents(data.events);
             } else {
+                eventsEtag = null;
+                shownEvents.clear();
                 eventsList.innerHTML = `<div class="loading">${data.error || 'Error loading events'}</div>`;
             }
         } catch (error) {
+            eventsEtag = null;
+            shownEvents.clear();
             eventsList.innerHTML = `<div class="loading">Error: ${error.message}</div>`;
         }
     }
 
-    // Display events in sidebar
+    // Follow the server's event stream: a full list first, then deltas.
+    // Falls back to a single load if the browser or server can't stream.
+    function watchEvents() {
+        if (!window.EventSource) {
+            pollEvents(null);
+            return;
+        }
+        const source = new EventSource('/api/events/stream');
+        source.addEventListener('events', function(e) {
+            const data = JSON.parse(e.data);
+            eventsEtag = `"${data.etag}"`;
+            displayEvents(data.events);
+        });
+        source.addEventListener('delta', function(e) {
+            applyEventsDelta(JSON.parse(e.data));
+        });
+        source.onerror = function() {
+            // EventSource retries by itself unless the server refused outright,
+            // e.g. with a 503 when it has too many streams open
+            if (source.readyState === EventSource.CLOSED) {
+                pollEvents(EVENTS_STREAM_RETRY);
+            }
+        };
+    }
+
+    // Revalidate the event list every EVENTS_POLL_INTERVAL instead of
+    // streaming it, trying the stream again after retryAfter if given
+    function pollEvents(retryAfter) {
+        loadEvents();
+        const timer = setInterval(loadEvents, EVENTS_POLL_INTERVAL);
+        if (retryAfter) {
+            setTimeout(function() {
+                clearInterval(timer);
+                watchEvents();
+            }, retryAfter);
+        }
+    }
+
+    // Apply an {upsert, remove, order} delta from the event stream
+    function applyEventsDelta(delta) {
+        const changed = new Map(delta.upsert.map(event => [event.id, event]));
+        const events = [];
+        for (const id of delta.order) {
+            const event = changed.get(id) || (shownEvents.get(id) || {}).event;
+            if (!event) {
+                // Out of step with the server; start over
+                eventsEtag = null;
+                loadEvents();
+                return;
+            }
+            events.push(event);
+        }
+        // The list no longer matches the last ETag we were given
+        eventsEtag = null;
+        displayEvents(events);
+    }
+
+    // Display events in sidebar, updating existing entries in place
     function displayEvents(events) {
         const eventsList = document.getElementById('events-list');
         
         if (!events || events.length === 0) {
+            shownEvents.clear();
             eventsList.innerHTML = '<div class="loading">No upcoming events</div>';
             return;
         }
 
-        eventsList.innerHTML = '';
-        
-        events.forEach(event => {
-            const eventDiv = document.createElement('div');
-            eventDiv.className = 'event-item';
-            
-            const timeDiv = document.createElement('div');
-            timeDiv.className = 'event-time';
-            timeDiv.textContent = formatEventTime(event.start);
-            
-            const titleDiv = document.createElement('div');
-            titleDiv.className = 'event-title';
-            titleDiv.textContent = event.summary;
-            
-            eventDiv.appendChild(timeDiv);
-            eventDiv.appendChild(titleDiv);
-            eventsList.appendChild(eventDiv);
+        if (shownEvents.size === 0) {
+            // Drop the loading or empty placeholder
+            eventsList.innerHTML = '';
+        }
+
+        const keep = new Set(events.map(event => event.id));
+        shownEvents.forEach((entry, id) => {
+            if (!keep.has(id)) {
+                entry.node.remove();
+                shownEvents.delete(id);
+            }
         });
+
+        events.forEach((event, index) => {
+            let entry = shownEvents.get(event.id);
+            if (!entry) {
+                entry = { node: createEventNode(), event: null };
+                shownEvents.set(event.id, entry);
+            }
+            if (!entry.event || entry.event.start !== event.start ||
+                    entry.event.summary !== event.summary) {
+                entry.node.querySelector('.event-time').textContent = formatEventTime(event.start);
+                entry.node.querySelector('.event-title').textContent = event.summary;
+            }
+            entry.event = event;
+            const current = eventsList.children[index];
+            if (current !== entry.node) {
+                eventsList.insertBefore(entry.node, current || null);
+            }
+        });
+    }
+
+    function createEventNode() {
+        const eventDiv = document.createElement('div');
+        eventDiv.className = 'event-item';
+        
+        const timeDiv = document.createElement('div');
+        timeDiv.className = 'event-time';
+        
+        const titleDiv = document.createElement('div');
+        titleDiv.className = 'event-title';
+        
+        eventDiv.appendChild(timeDiv);
+        eventDiv.appendChild(titleDiv);
+        return eventDiv;
     }
 
     // Format event time
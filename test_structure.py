@@ -67,13 +67,41 @@ def test_syntax():
     print("\nTesting Python syntax...")
     try:
         import py_compile
-        py_compile.compile('calendar_chat.py', doraise=True)
+        for module in ['calendar_chat.py', 'async_calendar.py', 'intent_parser.py',
+                       'datetime_resolver.py', 'response_cache.py',
+                       'calendar_tools.py', 'context_builder.py', 'agent_registry.py',
+                       'state_store.py', 'asgi_app.py', 'web_common.py',
+                       'event_feed.py', 'watch_channels.py', 'interval_index.py',
+                       'slot_finder.py']:
+            py_compile.compile(module, doraise=True)
         print("✅ Python syntax is valid")
         return True
     except py_compile.PyCompileError as e:
         print(f"❌ Syntax error: {e}")
         return False
 
+def test_intent_parser():
+    """Test that ambiguous commands are left to Gemini"""
+    print("\nTesting intent parser...")
+    from intent_parser import parse_intent, CONFIDENCE_THRESHOLD
+    
+    confident = ['create lunch with Sam tomorrow at noon', 'delete my 3pm']
+    ambiguous = [
+        'schedule dinner friday or saturday at 7pm',
+        'plan trip to the 5th avenue tomorrow at 3pm',
+        'create standup tomorrow at 9am not today',
+        'create standup every day at 9am',
+    ]
+    passed = True
+    for text in confident + ambiguous:
+        score = parse_intent(text)['score']
+        if (score >= CONFIDENCE_THRESHOLD) != (text in confident):
+            print(f"❌ {text!r} scored {score}")
+            passed = False
+    if passed:
+        print("✅ Ambiguous commands fall through to Gemini")
+    return passed
+
 def test_constants():
     """Test that required constants are defined"""
     print("\nTesting constants...")
@@ -122,6 +150,7 @@ def main():
         test_imports,
         test_syntax,
         test_class_structure,
+        test_intent_parser,
         test_constants,
         test_documentation
     ]
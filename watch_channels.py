@@ -0,0 +1,249 @@
+"""
+Google Calendar push notifications for web sessions
+Opens an events().watch channel per session, turns the notification POSTs
+Google sends into incremental syncs of that session's event mirror, and
+replaces channels before they expire
+"""
+
+import hashlib
+import hmac
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+# Channel lifetime asked of Google (it may grant less)
+DEFAULT_CHANNEL_TTL = 24 * 3600
+# Replace a channel this many seconds before it expires
+RENEW_MARGIN = 10 * 60
+# How often the renewal thread looks for channels due
+RENEW_INTERVAL = 60.0
+# After a failed watch() call, wait this long before trying that session again
+OPEN_RETRY = 10 * 60
+# Watched mirrors still sync at least this often, in case a notification is lost
+PUSH_SYNC_MAX_AGE = 300.0
+
+
+class WatchChannels:
+    """One push channel per live session, keyed by session ID
+
+    Each channel carries a token that signs its session ID with secret, so
+    notifications can be checked without any shared table, and forged ones
+    are rejected. calendar_for maps a session ID to its live
+    CalendarService, or None. A notification syncs that calendar's mirror
+    through its sync token, which is what polling did on every request;
+    while the channel is open the mirror skips those polls (see
+    EventMirror.push_max_age).
+
+    The channel table is per process, but Google may deliver a
+    notification to any worker. One for a session that is live in this
+    process syncs it here, whichever worker's channel it came on; otherwise
+    the outcome is 'changed', and the caller records it in the shared state
+    store (AgentRegistry.mark_stale) so the worker serving the session
+    syncs before its next answer.
+    """
+
+    def __init__(self, address: str, secret: str, calendar_for: Callable[[str], Any],
+                 ttl: float = DEFAULT_CHANNEL_TTL, renew_margin: float = RENEW_MARGIN,
+                 sync_max_age: float = PUSH_SYNC_MAX_AGE):
+        self.address = address
+        self.calendar_for = calendar_for
+        self.ttl = ttl
+        self.renew_margin = renew_margin
+        self.sync_max_age = sync_max_age
+        self._key = hashlib.blake2b(secret.encode('utf-8'), digest_size=32).digest()
+        # session_id -> channel as returned by watch(), plus 'token' and 'message'
+        self.channels: Dict[str, Dict[str, Any]] = {}
+        self.stats = {'opened': 0, 'renewed': 0, 'failed': 0, 'synced': 0, 'changed': 0,
+                      'duplicate': 0, 'ignored': 0, 'rejected': 0}
+        self._retry_at: Dict[str, float] = {}
+        self._opening = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def token(self, session_id: str) -> str:
+        """Channel token naming a session, signed so it can't be forged"""
+        mac = hashlib.blake2b(session_id.encode('utf-8'), key=self._key, digest_size=16)
+        return f"{session_id}.{mac.hexdigest()}"
+
+    def session_for(self, token: str) -> Optional[str]:
+        """The session a channel token was issued for, None if it's not ours"""
+        session_id, _, _ = token.rpartition('.')
+        if session_id and hmac.compare_digest(self.token(session_id), token):
+            return session_id
+        return None
+
+    def _expired(self, channel: Dict[str, Any], margin: float = 0.0) -> bool:
+        return time.time() + margin >= int(channel.get('expiration', 0)) / 1000
+
+    def _open(self, session_id: str, calendar) -> Optional[Dict[str, Any]]:
+        """Ask Google for a new channel; None if it refused"""
+        token = self.token(session_id)
+        channel = calendar.watch(self.address, uuid.uuid4().hex, token, self.ttl)
+        if not channel.get('resourceId'):
+            return None
+        channel.setdefault('expiration', str(int((time.time() + self.ttl) * 1000)))
+        return dict(channel, token=token, message=0)
+
+    def ensure(self, session_id: str, calendar) -> bool:
+        """Make sure a session's calendar is watched; cheap when it already is"""
+        now = time.monotonic()
+        with self._lock:
+            channel = self.channels.get(session_id)
+            if channel is not None and not self._expired(channel):
+                # The agent may have been rebuilt since the channel was opened
+                calendar.mirror.push_max_age = self.sync_max_age
+                return True
+            if session_id in self._opening or now < self._retry_at.get(session_id, 0):
+                return False
+            self._opening.add(session_id)
+        self.start()
+
+        # watch() is an API call; don't hold the lock over it
+        try:
+            channel = self._open(session_id, calendar)
+        finally:
+            with self._lock:
+                self._opening.discard(session_id)
+        with self._lock:
+            if channel is None:
+                self._retry_at[session_id] = now + OPEN_RETRY
+                self.stats['failed'] += 1
+                return False
+            self.channels[session_id] = channel
+            self._retry_at.pop(session_id, None)
+            self.stats['opened'] += 1
+        calendar.mirror.push_max_age = self.sync_max_age
+        return True
+
+    def close(self, session_id: str, calendar=None):
+        """Stop watching a session, e.g. on logout"""
+        with self._lock:
+            channel = self.channels.pop(session_id, None)
+            self._retry_at.pop(session_id, None)
+        if channel is None or calendar is None:
+            return
+        calendar.mirror.push_max_age = 0.0
+        calendar.stop_watch(channel['id'], channel['resourceId'])
+
+    def receive(self, headers: Mapping[str, str]) -> Tuple[str, Optional[str]]:
+        """Handle one notification POST by its X-Goog-* headers
+
+        Returns (outcome, session_id) where outcome is 'synced',
+        'changed' (the session isn't live here, or its sync failed, so it
+        must be synced elsewhere or later), 'duplicate' (a retry of a
+        message already handled), 'ignored' (the initial 'sync' message)
+        or 'rejected' (a token we didn't issue).
+        """
+        session_id = self.session_for(headers.get('X-Goog-Channel-Token', ''))
+        if session_id is None:
+            self.stats['rejected'] += 1
+            return 'rejected', None
+        channel_id = headers.get('X-Goog-Channel-ID')
+        try:
+            number = int(headers.get('X-Goog-Message-Number', 0))
+        except ValueError:
+            number = 0
+
+        with self._lock:
+            # Message numbers are per channel; those of another worker's
+            # channel, or of one replaced by renewal, can't be checked here
+            channel = self.channels.get(session_id)
+            if channel is not None and channel['id'] == channel_id:
+                if number and number <= channel['message']:
+                    self.stats['duplicate'] += 1
+                    return 'duplicate', session_id
+                channel['message'] = max(channel['message'], number)
+        if headers.get('X-Goog-Resource-State') == 'sync':
+            self.stats['ignored'] += 1
+            return 'ignored', session_id
+
+        calendar = self.calendar_for(session_id)
+        if calendar is None or not calendar.sync_changes():
+            if calendar is not None:
+                calendar.mirror.mark_stale()
+            self.stats['changed'] += 1
+            return 'changed', session_id
+        self.stats['synced'] += 1
+        return 'synced', session_id
+
+    def renew_due(self) -> int:
+        """Replace channels close to expiry; return how many were renewed
+
+        Channels can't be extended, so a new one is opened first and the
+        old one stopped after; notifications from both are harmless in
+        between. Channels of sessions no longer live are forgotten.
+        """
+        with self._lock:
+            due = [(session_id, channel) for session_id, channel in self.channels.items()
+                   if self._expired(channel, self.renew_margin)]
+        renewed = 0
+        for session_id, old in due:
+            calendar = self.calendar_for(session_id)
+            channel = self._open(session_id, calendar) if calendar is not None else None
+            with self._lock:
+                current = self.channels.get(session_id) is old
+                if current and channel is not None:
+                    self.channels[session_id] = channel
+                    self.stats['renewed'] += 1
+                    renewed += 1
+                elif current and (calendar is None or self._expired(old)):
+                    del self.channels[session_id]
+                    self.stats['failed'] += calendar is not None
+            if channel is None:
+                if current and calendar is not None and self._expired(old):
+                    calendar.mirror.push_max_age = 0.0
+            elif current:
+                calendar.stop_watch(old['id'], old['resourceId'])
+            else:
+                # Closed meanwhile (e.g. logout); don't resurrect it
+                calendar.stop_watch(channel['id'], channel['resourceId'])
+        return renewed
+
+    def _run(self):
+        """Background loop that renews channels ahead of expiry"""
+        while not self._stopped.wait(RENEW_INTERVAL):
+            try:
+                self.renew_due()
+            except Exception as e:
+                print(f"Channel renewal failed: {str(e)}")
+
+    def start(self):
+        """Start the background renewal thread once"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(
+                    target=self._run, name='channel-renewal', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Stop the background renewal thread"""
+        self._stopped.set()
+
+
+def open_watch_channels(calendar_for: Callable[[str], Any],
+                        address: Optional[str] = None) -> Optional[WatchChannels]:
+    """Channels for the WATCH_WEBHOOK_URL endpoint, or None if push is off
+
+    The URL must be HTTPS on a domain verified for the Google Cloud project,
+    e.g. https://chat.example.com/api/calendar/notifications.
+
+    Channel tokens are keyed on WATCH_CHANNEL_SECRET, or FLASK_SECRET_KEY
+    without it. Any worker may receive a notification, so the key must be
+    the same in all of them: a per-process random key would reject most
+    notifications, and push refuses to start without one.
+    """
+    address = address or os.getenv('WATCH_WEBHOOK_URL')
+    if not address:
+        return None
+    secret = os.getenv('WATCH_CHANNEL_SECRET') or os.getenv('FLASK_SECRET_KEY')
+    if not secret:
+        raise RuntimeError("WATCH_WEBHOOK_URL is set but neither WATCH_CHANNEL_SECRET "
+                           "nor FLASK_SECRET_KEY is; set one, the same in every worker")
+    return WatchChannels(
+        address, secret, calendar_for,
+        ttl=float(os.getenv('WATCH_CHANNEL_TTL', str(DEFAULT_CHANNEL_TTL))),
+        sync_max_age=float(os.getenv('WATCH_SYNC_MAX_AGE', str(PUSH_SYNC_MAX_AGE))))
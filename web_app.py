@@ -6,12 +6,20 @@ A web-based interface for the AI chat agent
 import os
 import sys
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import (
+    Flask, Response, render_template, request, jsonify, session, redirect, url_for,
+    stream_with_context
+)
 from dotenv import load_dotenv
 import secrets
 
 # Import the chat agent classes
-from calendar_chat import CalendarService, GeminiAgent, CalendarChatAgent
+from calendar_chat import CalendarService, GeminiAgent, CalendarChatAgent, events_etag
+from watch_channels import open_watch_channels
+from web_common import (
+    EVENTS_MAX_AGE, EVENT_STREAM_HEARTBEAT, SSE_HEADERS, EventStream, StreamSlots,
+    format_events, not_modified, open_agent_registry, sse, streams_full
+)
 
 # Load environment variables
 load_dotenv()
@@ -19,20 +27,32 @@ load_dotenv()
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', secrets.token_hex(16))
 
-# Store chat agents per session
-# NOTE: In production, use Redis or a database for session storage
-# This in-memory storage is only suitable for development/demo purposes
-chat_agents = {}
+# Store chat agents per session, bounded in number and idle time
+chat_agents = open_agent_registry()
+# Drop idle agents even when no requests come in
+chat_agents.start()
+
+# Each open page's event stream holds a worker thread for its whole life;
+# keep this below the server's thread count so other requests still run
+event_streams = StreamSlots(int(os.getenv('MAX_EVENT_STREAMS', '8')))
+
+
+def live_calendar(session_id: str):
+    """CalendarService of a session's live agent, None if it isn't live here"""
+    return getattr(chat_agents.peek(session_id), 'calendar', None)
+
+
+# Calendar push notifications, when WATCH_WEBHOOK_URL points at
+# /api/calendar/notifications; without them the mirror is polled per request
+watch_channels = open_watch_channels(live_calendar)
 
 
 def get_or_create_agent(session_id: str, gemini_api_key: str):
     """Get existing agent or create new one for session"""
-    if session_id not in chat_agents:
-        try:
-            chat_agents[session_id] = CalendarChatAgent(gemini_api_key)
-        except Exception as e:
-            return None, str(e)
-    return chat_agents[session_id], None
+    agent, error = chat_agents.get(session_id, gemini_api_key)
+    if agent is not None and watch_channels:
+        watch_channels.ensure(session_id, agent.calendar)
+    return agent, error
 
 
 @app.route('/')
@@ -97,6 +117,7 @@ def send_message():
     # Process the message
     try:
         response = agent.process_query(user_message)
+        chat_agents.save(session['session_id'])
         return jsonify({
             'response': response,
             'timestamp': datetime.utcnow().isoformat()
@@ -107,6 +128,46 @@ def send_message():
         return jsonify({'error': 'Failed to process your message. Please try again.'}), 500
 
 
+@app.route('/api/message/stream', methods=['POST'])
+def stream_message():
+    """Handle chat messages, streaming the reply as Server-Sent Events
+    
+    Sends 'data' messages with a text 'delta' as the answer is generated,
+    then a 'done' event, or an 'error' event if processing fails.
+    """
+    if 'gemini_api_key' not in session or 'session_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    data = request.get_json()
+    user_message = data.get('message', '').strip()
+    
+    if not user_message:
+        return jsonify({'error': 'Empty message'}), 400
+    
+    agent, error = get_or_create_agent(session['session_id'], session['gemini_api_key'])
+    if error:
+        app.logger.error(f"Agent creation error: {error}")
+        return jsonify({'error': 'Failed to initialize calendar agent'}), 500
+    
+    session_id = session['session_id']
+    
+    def generate():
+        # Flush the headers right away so the browser starts reading
+        yield ": stream open\n\n"
+        try:
+            for delta in agent.process_query_stream(user_message):
+                yield sse({'delta': delta})
+            chat_agents.save(session_id)
+            yield sse({'timestamp': datetime.utcnow().isoformat()}, event='done')
+        except Exception as e:
+            app.logger.error(f"Error processing message: {str(e)}")
+            yield sse({'error': 'Failed to process your message. Please try again.'},
+                      event='error')
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers=SSE_HEADERS)
+
+
 @app.route('/api/events')
 def get_events():
     """Get calendar events"""
@@ -120,29 +181,96 @@ def get_events():
         return jsonify({'error': 'Failed to initialize calendar agent'}), 500
     
     try:
-        events = agent.calendar.list_events(max_results=10)
-        formatted_events = []
-        for event in events:
-            formatted_events.append({
-                'id': event.get('id'),
-                'summary': event.get('summary', 'No title'),
-                'start': event['start'].get('dateTime', event['start'].get('date')),
-                'end': event['end'].get('dateTime', event['end'].get('date')),
-                'description': event.get('description', '')
-            })
-        return jsonify({'events': formatted_events})
+        snapshot = agent.take_snapshot(projection='display', max_age=EVENTS_MAX_AGE)
+        chat_agents.save(session['session_id'])
+        etag = events_etag(snapshot.events)
+        mirror = getattr(agent.calendar, 'mirror', None)
+        last_modified = mirror.last_modified(datetime.utcnow()) if mirror else None
+        if not_modified(request, etag, last_modified):
+            response = Response(status=304)
+        else:
+            response = jsonify({'events': format_events(snapshot.events)})
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = last_modified
+        # Let the browser keep a copy, but check with us before using it
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     except Exception as e:
         # Log the full error for debugging but return generic message to user
         app.logger.error(f"Error fetching events: {str(e)}")
         return jsonify({'error': 'Failed to fetch calendar events. Please try again.'}), 500
 
 
+@app.route('/api/events/stream')
+def stream_events():
+    """Push changes to the sidebar event list as Server-Sent Events (see EventStream)"""
+    if 'gemini_api_key' not in session or 'session_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    agent, error = get_or_create_agent(session['session_id'], session['gemini_api_key'])
+    if error:
+        app.logger.error(f"Agent creation error: {error}")
+        return jsonify({'error': 'Failed to initialize calendar agent'}), 500
+    session_id = session['session_id']
+    if not event_streams.acquire():
+        return streams_full()
+    
+    def generate():
+        stream = EventStream(chat_agents, session_id, agent)
+        seen = agent.event_feed.version
+        try:
+            snapshot = agent.take_snapshot(projection='display', max_age=EVENTS_MAX_AGE)
+        except Exception as e:
+            app.logger.error(f"Error fetching events: {str(e)}")
+            yield sse({'error': 'Failed to fetch calendar events.'}, event='error')
+            return
+        yield stream.first(snapshot)
+        
+        while stream.running():
+            seen = agent.event_feed.wait(seen, EVENT_STREAM_HEARTBEAT)
+            if not stream.running():
+                return
+            # Only reads the mirror; syncing is left to the requests that need it
+            yield stream.update(agent.take_snapshot(projection='display',
+                                                    max_age=float('inf')))
+    
+    response = Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+    # Runs when the stream ends or the browser goes away
+    response.call_on_close(event_streams.release)
+    return response
+
+
+@app.route('/api/calendar/notifications', methods=['POST'])
+def calendar_notification():
+    """Receive a Google Calendar push notification and sync the affected session
+    
+    Google only looks at the status: anything but 2xx is retried with
+    backoff, so notifications we can't use are still acknowledged.
+    """
+    if watch_channels is None:
+        return '', 404
+    
+    outcome, session_id = watch_channels.receive(request.headers)
+    if outcome == 'rejected':
+        return '', 403
+    if outcome == 'synced':
+        # Other workers pick the synced mirror up from the state store
+        chat_agents.save(session_id)
+    elif outcome == 'changed':
+        # Not live here; the worker serving it syncs on its next request
+        chat_agents.mark_stale(session_id)
+    return '', 200
+
+
 @app.route('/logout')
 def logout():
     """Clear session and logout"""
     session_id = session.get('session_id')
-    if session_id and session_id in chat_agents:
-        del chat_agents[session_id]
+    if session_id:
+        if watch_channels:
+            watch_channels.close(session_id, live_calendar(session_id))
+        chat_agents.remove(session_id)
     
     session.clear()
     return redirect(url_for('index'))
@@ -159,6 +287,10 @@ if __name__ == '__main__':
     # Get debug mode from environment variable (default to False for security)
     debug_mode = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
     
-    # For production, use a proper WSGI server like gunicorn
-    # Example: gunicorn -w 4 -b 0.0.0.0:5000 web_app:app
+    # For production, use a proper WSGI server like gunicorn with threaded
+    # workers: every open page keeps one thread busy on /api/events/stream, so
+    # sync workers would stall other requests behind a few open tabs. Set
+    # MAX_EVENT_STREAMS below --threads (pages past it poll instead), e.g.
+    # MAX_EVENT_STREAMS=8 gunicorn -w 4 --worker-class gthread --threads 16 \
+    #     -b 0.0.0.0:5000 web_app:app
     app.run(debug=debug_mode, host='127.0.0.1', port=5000)
@@ -0,0 +1,145 @@
+"""
+Shared pieces of the web front ends
+Registry setup, Server-Sent Events formatting, the sidebar's event list
+and its revalidation, and the event stream's messages, used by both
+web_app.py (Flask) and asgi_app.py (Quart)
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from calendar_chat import CalendarChatAgent, CalendarSnapshot, events_etag
+from agent_registry import AgentRegistry
+from state_store import open_state_store
+from event_feed import diff_events
+
+# Seconds /api/events may serve the event mirror without asking Google for changes
+EVENTS_MAX_AGE = float(os.getenv('EVENTS_MAX_AGE', '5'))
+# Event streams send a keep-alive this often, and reconnect after their lifetime
+EVENT_STREAM_HEARTBEAT = 20.0
+EVENT_STREAM_LIFETIME = 300.0
+# Response headers of every Server-Sent Events stream; nginx must not buffer them
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+# Pages told to poll /api/events when the event streams are all taken
+# wait this long before trying to stream again
+EVENT_STREAM_RETRY_AFTER = 300
+
+
+def open_agent_registry(
+        on_evict: Optional[Callable[[str, Any], None]] = None) -> AgentRegistry:
+    """Chat agents per session, bounded in number and idle time
+
+    Their state lives in CHAT_STATE_STORE; the default (memory://) is per
+    process, so with several gunicorn workers use e.g. sqlite:///chat_state.db
+    to let any worker serve any session.
+    """
+    return AgentRegistry(
+        CalendarChatAgent,
+        max_agents=int(os.getenv('CHAT_MAX_AGENTS', '100')),
+        idle_ttl=float(os.getenv('CHAT_AGENT_IDLE_TTL', '1800')),
+        store=open_state_store(),
+        on_evict=on_evict
+    )
+
+
+def sse(data: dict, event: str = "") -> str:
+    """Format one Server-Sent Events message"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+def format_events(events: list) -> list:
+    """Events as the sidebar shows them"""
+    return [{
+        'id': event.get('id'),
+        'summary': event.get('summary', 'No title'),
+        'start': event['start'].get('dateTime', event['start'].get('date')),
+        'end': event['end'].get('dateTime', event['end'].get('date')),
+        'description': event.get('description', '')
+    } for event in events]
+
+
+def not_modified(request, etag: str, last_modified) -> bool:
+    """Whether the client's copy of the event list is still current
+
+    request is Flask's or Quart's; both parse the conditional headers the
+    same way. If-None-Match wins over If-Modified-Since, as in RFC 9110.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    return bool(since and last_modified and last_modified.replace(microsecond=0) <= since)
+
+
+class StreamSlots:
+    """Bound on the event streams open in this process at once
+
+    Each open page holds one; past limit, /api/events/stream answers 503
+    and the page polls /api/events instead.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.open = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Take a slot if one is free"""
+        with self._lock:
+            if self.open >= self.limit:
+                return False
+            self.open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.open = max(self.open - 1, 0)
+
+
+def streams_full() -> tuple:
+    """The 503 answer for an event stream over the limit"""
+    return ('', 503, {'Retry-After': str(EVENT_STREAM_RETRY_AFTER)})
+
+
+class EventStream:
+    """Messages of one /api/events/stream response, without the waiting
+
+    The route sends first() with a snapshot, then, while running(), waits on
+    the agent's event feed for up to EVENT_STREAM_HEARTBEAT seconds and
+    sends update() with a snapshot read from the mirror: a 'delta' message
+    (see event_feed.diff_events) if the list changed, a keep-alive comment
+    otherwise. The stream ends after EVENT_STREAM_LIFETIME seconds, or when
+    the session's agent is replaced, and the browser reconnects on its own.
+    """
+
+    def __init__(self, registry: AgentRegistry, session_id: str, agent,
+                 lifetime: float = EVENT_STREAM_LIFETIME):
+        self.registry = registry
+        self.session_id = session_id
+        self.agent = agent
+        self.deadline = time.monotonic() + lifetime
+        self.events: List[Dict[str, Any]] = []
+
+    def first(self, snapshot: CalendarSnapshot) -> str:
+        """The whole list, with the ETag /api/events would give it"""
+        self.events = format_events(snapshot.events)
+        return "retry: 3000\n" + sse({'events': self.events,
+                                      'etag': events_etag(snapshot.events)}, event='events')
+
+    def running(self) -> bool:
+        """Whether to keep waiting for changes"""
+        return (time.monotonic() < self.deadline
+                and self.registry.peek(self.session_id) is self.agent)
+
+    def update(self, snapshot: CalendarSnapshot) -> str:
+        """What changed since the last message"""
+        current = format_events(snapshot.events)
+        delta = diff_events(self.events, current)
+        if not delta:
+            # Also catches closed connections between changes
+            return ": keep-alive\n\n"
+        self.events = current
+        return sse(delta, event='delta')